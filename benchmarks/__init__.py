@@ -0,0 +1,12 @@
+"""
+Microbenchmarks for the pipeline's hot pure-Python/pandas functions.
+
+Every case runs on fixed synthetic inputs (seeded, no database) at the
+sizes in SIZES. Results are saved as JSON, and compare flags any case
+that got slower than a stored baseline by more than a tolerance:
+
+    python -m benchmarks run --output benchmarks/baselines/local.json
+    python -m benchmarks compare benchmarks/baselines/local.json --tolerance 0.25
+
+See benchmarks/cases.py for the cases and benchmarks/runner.py for timing.
+"""
@@ -0,0 +1,147 @@
+"""
+Benchmark cases and their synthetic inputs.
+
+A case's setup(n) builds the inputs for size n (rows, records or
+locations, as the case describes) outside the timed region and returns
+the zero-argument callable that is timed. Inputs come from a fixed seed,
+so every run and every machine times the same work.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+SEED = 2026
+SIZES: Dict[str, int] = {"10": 10, "1k": 1_000, "100k": 100_000}
+START_DATE = date(2025, 1, 1)
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    setup: Callable[[int], Callable[[], Any]]
+    unit: str  # what n counts
+
+
+def daily_frame(n_rows: int, days_per_location: int) -> pd.DataFrame:
+    """n_rows of daily_aggregates-like data, days_per_location per location."""
+    rng = np.random.default_rng(SEED)
+    days = max(1, min(n_rows, days_per_location))
+    n_locations = max(1, n_rows // days)
+    location_id = np.repeat(np.arange(1, n_locations + 1), days)[:n_rows]
+    offsets = np.tile(np.arange(days), n_locations)[:n_rows]
+    return pd.DataFrame({
+        "location_id": location_id,
+        "date": pd.Timestamp(START_DATE) + pd.to_timedelta(offsets, unit="D"),
+        "max_aqi": rng.integers(5, 250, size=len(location_id)),
+    })
+
+
+def airnow_records(n: int) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(SEED)
+    pollutants = ["PM2.5", "O3", "PM10"]
+    return [
+        {
+            "DateObserved": (START_DATE + timedelta(days=i // 72)).isoformat(),
+            "HourObserved": (i // 3) % 24,
+            "LocalTimeZone": "PST",
+            "ReportingArea": "Portland",
+            "StateCode": "OR",
+            "Latitude": 45.5,
+            "Longitude": -122.6,
+            "ParameterName": pollutants[i % 3],
+            "AQI": int(aqi),
+            "Category": {"Number": 1, "Name": "Good"},
+        }
+        for i, aqi in enumerate(rng.integers(5, 250, size=n))
+    ]
+
+
+def forecast_rows(n: int) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(SEED)
+    return [
+        {
+            "location_id": i + 1,
+            "location_name": f"Location {i + 1}",
+            "target_date": START_DATE,
+            "forecast_aqi": int(aqi),
+            "model_name": "random_forest_v1",
+        }
+        for i, aqi in enumerate(rng.integers(5, 250, size=n))
+    ]
+
+
+# --- cases (stage modules imported in setup, like the CLI) --------------------
+
+def _normalize_observations(n: int):
+    from src.ingest.airnow_client import normalize_observations
+    records = airnow_records(n)
+    return lambda: normalize_observations(1, records)
+
+
+def _build_features(n: int):
+    from src.models.train_ml_model import build_features
+    df = daily_frame(n, days_per_location=100)
+    return lambda: build_features(df)
+
+
+def _build_forecast_features(n: int):
+    from src.forecast_and_notify import build_forecast_features
+    df = daily_frame(n, days_per_location=10)  # the forecast step's 10-day window
+    return lambda: build_forecast_features(df)
+
+
+def _baseline_predict(strategy: str):
+    def setup(n: int):
+        from src.models.baseline_model import NaiveAQIForecastModel
+        history = daily_frame(n, days_per_location=100)
+        model = NaiveAQIForecastModel(strategy=strategy)
+        model.fit(history)
+        return lambda: model.predict(history)
+    return setup
+
+
+_FOREST: Dict[str, Any] = {}
+
+
+def _fitted_forest():
+    """One small fixed forest shared by every size, fit once per process."""
+    if "rf" not in _FOREST:
+        from sklearn.ensemble import RandomForestRegressor
+        from src.models.train_ml_model import FEATURE_COLUMNS, build_features
+
+        train = build_features(daily_frame(5_000, days_per_location=100))
+        rf = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=1)
+        rf.fit(train[FEATURE_COLUMNS], train["target"])
+        _FOREST["rf"] = rf
+    return _FOREST["rf"]
+
+
+def _forest_distribution(n: int):
+    from src.models.probabilistic import forecast_distribution
+    from src.models.train_ml_model import FEATURE_COLUMNS
+
+    rng = np.random.default_rng(SEED)
+    X = pd.DataFrame(rng.uniform(5, 250, size=(n, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    forest = _fitted_forest()
+    return lambda: forecast_distribution(forest, X, threshold=100)
+
+
+def _api_forecasts_json(n: int):
+    from src.api.forecasts import forecast_list
+    rows = forecast_rows(n)
+    return lambda: forecast_list.dump_json(forecast_list.validate_python(rows))
+
+
+CASES: Tuple[Case, ...] = (
+    Case("normalize_observations", _normalize_observations, "records"),
+    Case("build_features", _build_features, "rows"),
+    Case("build_forecast_features", _build_forecast_features, "rows"),
+    Case("baseline_predict_ewma", _baseline_predict("ewma"), "rows"),
+    Case("baseline_predict_seasonal_naive", _baseline_predict("seasonal_naive"), "rows"),
+    Case("baseline_predict_climatology", _baseline_predict("climatology"), "rows"),
+    Case("forest_distribution", _forest_distribution, "rows"),
+    Case("api_forecasts_json", _api_forecasts_json, "forecasts"),
+)
@@ -0,0 +1,219 @@
+"""
+Time the benchmark cases and compare runs against a JSON baseline.
+
+    python -m benchmarks run [--size 10 1k] [-k build] [--output FILE]
+    python -m benchmarks compare BASELINE [CURRENT] [--tolerance 0.25]
+
+Each case/size is called once to warm up, then in a loop long enough
+(judged from a second, warm call) to take about TARGET_REPEAT_SECONDS,
+and that is repeated REPEATS times. The minimum
+per-call time is what compare uses (it is the least noisy), the median
+is kept for reference. compare exits 1 when any case is slower than the
+baseline by more than the tolerance; without CURRENT it runs the cases
+in the baseline first.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from benchmarks.cases import CASES, SIZES
+
+REPEATS = 5
+TARGET_REPEAT_SECONDS = 0.2
+MAX_LOOPS = 10_000
+DEFAULT_TOLERANCE = 0.25
+# Differences below this are timer and scheduler noise, not regressions.
+NOISE_FLOOR_SECONDS = 50e-6
+
+
+def result_key(case: str, size: str) -> str:
+    return f"{case}/{size}"
+
+
+def time_callable(func: Callable[[], Any], repeats: int = REPEATS) -> Dict[str, float]:
+    """Per-call seconds (min and median over repeats) for func."""
+    func()  # warm-up: first calls pay for imports, caches and allocation
+    start = time.perf_counter()
+    func()  # sizes the loop
+    single = time.perf_counter() - start
+    loops = max(1, min(MAX_LOOPS, int(TARGET_REPEAT_SECONDS / max(single, 1e-9))))
+    if single > 1.0:
+        repeats = min(repeats, 3)
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+    return {
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "loops": loops,
+        "repeats": repeats,
+    }
+
+
+def _versions() -> Dict[str, str]:
+    versions = {"python": platform.python_version()}
+    for module in ("numpy", "pandas", "sklearn", "pydantic"):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            pass
+    return versions
+
+
+def run_benchmarks(
+    sizes: Sequence[str] = tuple(SIZES),
+    keyword: Optional[str] = None,
+    only: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Run the matching cases. only restricts to specific result keys (used
+    by compare to rerun exactly what the baseline has).
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    for case in CASES:
+        if keyword and keyword not in case.name:
+            continue
+        for size in sizes:
+            key = result_key(case.name, size)
+            if only is not None and key not in only:
+                continue
+            func = case.setup(SIZES[size])
+            results[key] = time_callable(func)
+            print(f"  {key:<45} {_format_seconds(results[key]['min_s']):>10}")
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "versions": _versions(),
+        },
+        "results": results,
+    }
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[Tuple[str, Optional[float], Optional[float], str]]:
+    """
+    (key, baseline seconds, current seconds, status) per case, where status
+    is "ok", "faster", "slower" (beyond tolerance) or "missing".
+    """
+    base, cur = baseline["results"], current["results"]
+    rows = []
+    for key in sorted(set(base) | set(cur)):
+        if key not in base or key not in cur:
+            before = base.get(key, {}).get("min_s")
+            after = cur.get(key, {}).get("min_s")
+            rows.append((key, before, after, "missing"))
+            continue
+        before, after = base[key]["min_s"], cur[key]["min_s"]
+        if after - before > max(before * tolerance, NOISE_FLOOR_SECONDS):
+            status = "slower"
+        elif before - after > max(before * tolerance, NOISE_FLOOR_SECONDS):
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((key, before, after, status))
+    return rows
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.2f} s"
+
+
+def _load(path: Path) -> Dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save(data: Dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"✅ Saved benchmark results to {path}")
+
+
+def _run(args) -> int:
+    print("Running benchmarks...")
+    data = run_benchmarks(args.size, args.keyword)
+    if args.output:
+        _save(data, Path(args.output))
+    return 0
+
+
+def _compare(args) -> int:
+    baseline = _load(Path(args.baseline))
+    if args.current:
+        current = _load(Path(args.current))
+    else:
+        print("Running the baseline's benchmarks...")
+        sizes = sorted({key.split("/")[1] for key in baseline["results"]}, key=SIZES.get)
+        current = run_benchmarks(sizes, args.keyword, only=list(baseline["results"]))
+        if args.output:
+            _save(current, Path(args.output))
+
+    if args.keyword:
+        baseline = {**baseline, "results": {
+            k: v for k, v in baseline["results"].items() if args.keyword in k.split("/")[0]
+        }}
+
+    icons = {"ok": "✅", "faster": "🚀", "slower": "❌", "missing": "⚠️ "}
+    rows = compare_results(baseline, current, args.tolerance)
+    print(f"\n{'case':<45} {'baseline':>10} {'current':>10}  change")
+    for key, before, after, status in rows:
+        change = f"{(after / before - 1) * 100:+.0f}%" if before and after else ""
+        print(f"{icons[status]} {key:<43} {_format_seconds(before):>10} {_format_seconds(after):>10}  {change}")
+
+    slower = [key for key, _, _, status in rows if status == "slower"]
+    if slower:
+        print(f"\n❌ {len(slower)} case(s) slower than baseline by more than {args.tolerance:.0%}.")
+        return 1
+    print(f"\n✅ No case slower than baseline by more than {args.tolerance:.0%}.")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the benchmarks.")
+    run.add_argument("--size", nargs="+", default=list(SIZES), choices=list(SIZES))
+    run.add_argument("-k", "--keyword", help="Only cases whose name contains this.")
+    run.add_argument("--output", help="Write results to this JSON file.")
+    run.set_defaults(handler=_run)
+
+    compare = sub.add_parser("compare", help="Compare results against a baseline.")
+    compare.add_argument("baseline", help="Baseline results JSON.")
+    compare.add_argument("current", nargs="?", help="Results JSON to compare (default: run now).")
+    compare.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                         help="Allowed slowdown as a fraction (default: %(default)s).")
+    compare.add_argument("-k", "--keyword", help="Only cases whose name contains this.")
+    compare.add_argument("--output", help="Also save the fresh run to this JSON file.")
+    compare.set_defaults(handler=_compare)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,24 @@
+from typing import Optional
+
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from sqlalchemy import text
 
+from src.dashboard_queries import (
+    read_accuracy,
+    read_daily_aggregates,
+    read_forecast_vs_actual,
+    read_latest_forecasts,
+    read_locations,
+)
 from src.db.connection import get_engine
 
 st.set_page_config(page_title="Oregon AQI Dashboard", layout="wide")
 
 AQI_THRESHOLD = 100
+# Ranges longer than this are plotted from weekly rollups computed in SQL.
+ROLLUP_AFTER_DAYS = 90
 
 
 def aqi_label(aqi: int) -> str:
@@ -21,42 +32,43 @@ def aqi_label(aqi: int) -> str:
 @st.cache_data(ttl=300)
 def load_locations() -> pd.DataFrame:
     with get_engine().connect() as conn:
-        return pd.read_sql(
-            text("SELECT id, name FROM locations ORDER BY name"), conn
-        )
+        return read_locations(conn)
+
+
+@st.cache_data(ttl=300)
+def load_latest_date() -> Optional[pd.Timestamp]:
+    with get_engine().connect() as conn:
+        latest = conn.execute(text("SELECT MAX(date) FROM daily_aggregates")).scalar_one()
+    return None if latest is None else pd.Timestamp(latest)
+
+
+@st.cache_data(ttl=300)
+def load_daily_aggregates(location_id: Optional[int], cutoff: pd.Timestamp, weekly: bool) -> pd.DataFrame:
+    with get_engine().connect() as conn:
+        return read_daily_aggregates(conn, location_id, cutoff.date(), weekly)
 
 
 @st.cache_data(ttl=300)
-def load_daily_aggregates() -> pd.DataFrame:
-    sql = text("""
-        SELECT da.location_id, l.name, da.date, da.max_aqi, da.mean_aqi,
-               da.min_aqi, da.is_interpolated
-        FROM daily_aggregates da
-        JOIN locations l ON l.id = da.location_id
-        ORDER BY l.name, da.date
-    """)
+def load_latest_forecasts(location_id: Optional[int]) -> pd.DataFrame:
     with get_engine().connect() as conn:
-        return pd.read_sql(sql, conn, parse_dates=["date"])
+        return read_latest_forecasts(conn, location_id)
 
 
 @st.cache_data(ttl=300)
-def load_forecasts() -> pd.DataFrame:
-    sql = text("""
-        SELECT f.location_id, l.name, f.target_date, f.forecast_aqi, f.model_name
-        FROM forecasts f
-        JOIN locations l ON l.id = f.location_id
-        ORDER BY l.name, f.target_date
-    """)
+def load_forecast_vs_actual(location_id: Optional[int], cutoff: pd.Timestamp) -> pd.DataFrame:
     with get_engine().connect() as conn:
-        return pd.read_sql(sql, conn, parse_dates=["target_date"])
+        return read_forecast_vs_actual(conn, location_id, cutoff.date())
 
 
-# --- Load ---
-locations   = load_locations()
-df_agg      = load_daily_aggregates()
-df_forecast = load_forecasts()
+@st.cache_data(ttl=300)
+def load_accuracy(location_id: Optional[int]) -> pd.DataFrame:
+    with get_engine().connect() as conn:
+        return read_accuracy(conn, location_id)
+
 
 # --- Sidebar ---
+locations = load_locations()
+
 st.sidebar.title("Filters")
 location_options = ["All"] + sorted(locations["name"].tolist())
 selected = st.sidebar.selectbox("Location", location_options)
@@ -65,13 +77,20 @@ date_range = st.sidebar.slider(
     min_value=7, max_value=180, value=60, step=7,
 )
 
-cutoff = df_agg["date"].max() - pd.Timedelta(days=date_range)
-df_agg_filtered = df_agg[df_agg["date"] >= cutoff].copy()
-if selected != "All":
-    df_agg_filtered = df_agg_filtered[df_agg_filtered["name"] == selected]
-    df_forecast_filtered = df_forecast[df_forecast["name"] == selected]
-else:
-    df_forecast_filtered = df_forecast.copy()
+location_id = (
+    None if selected == "All"
+    else int(locations.loc[locations["name"] == selected, "id"].iloc[0])
+)
+weekly = date_range > ROLLUP_AFTER_DAYS
+
+# --- Load (filtered in SQL, cached per location / cutoff) ---
+latest_date = load_latest_date()
+if latest_date is None:
+    st.info("No daily aggregates yet. Run ingestion + aggregation first.")
+    st.stop()
+
+cutoff = latest_date - pd.Timedelta(days=date_range)
+df_agg_filtered = load_daily_aggregates(location_id, cutoff, weekly)
 
 # --- Title ---
 st.title("Oregon AQI Forecasting Dashboard")
@@ -79,13 +98,7 @@ st.caption(f"Data refreshes every 5 minutes. Showing last {date_range} days.")
 
 # --- Forecast cards ---
 st.subheader("Tomorrow's Forecast")
-latest = (
-    df_forecast_filtered
-    .sort_values("target_date")
-    .groupby("name")
-    .last()
-    .reset_index()
-)
+latest = load_latest_forecasts(location_id)
 
 if latest.empty:
     st.info("No forecasts available yet.")
@@ -104,15 +117,13 @@ else:
 st.divider()
 
 # --- Historical trend ---
-st.subheader("Historical Max AQI")
-
-df_real   = df_agg_filtered[~df_agg_filtered["is_interpolated"]]
-df_interp = df_agg_filtered[df_agg_filtered["is_interpolated"]]
+st.subheader("Historical Max AQI" + (" (weekly max)" if weekly else ""))
 
 fig = go.Figure()
-for loc_name in sorted(df_agg_filtered["name"].unique()):
-    real   = df_real[df_real["name"] == loc_name]
-    interp = df_interp[df_interp["name"] == loc_name]
+for loc_name, loc in df_agg_filtered.groupby("name", sort=True):
+    estimated = loc["is_interpolated"].to_numpy()
+    real   = loc[~estimated]
+    interp = loc[estimated]
 
     fig.add_trace(go.Scatter(
         x=real["date"], y=real["max_aqi"],
@@ -142,21 +153,13 @@ st.divider()
 # --- Forecast accuracy ---
 st.subheader("Forecast vs Actual")
 
-df_accuracy = df_forecast_filtered.merge(
-    df_agg[["name", "date", "max_aqi"]].rename(columns={"max_aqi": "actual_aqi"}),
-    left_on=["name", "target_date"],
-    right_on=["name", "date"],
-    how="inner",
-).drop(columns="date")
+df_accuracy = load_forecast_vs_actual(location_id, cutoff)
 
 if df_accuracy.empty:
     st.info("Not enough overlapping forecast and actual data to compare yet.")
 else:
-    df_accuracy = df_accuracy[df_accuracy["target_date"] >= cutoff]
-
     fig2 = go.Figure()
-    for loc_name in sorted(df_accuracy["name"].unique()):
-        loc = df_accuracy[df_accuracy["name"] == loc_name].sort_values("target_date")
+    for loc_name, loc in df_accuracy.groupby("name", sort=True):
         fig2.add_trace(go.Scatter(
             x=loc["target_date"], y=loc["actual_aqi"],
             mode="lines", name=f"{loc_name} actual",
@@ -175,13 +178,15 @@ else:
     )
     st.plotly_chart(fig2, use_container_width=True)
 
-    mae = (df_accuracy["forecast_aqi"] - df_accuracy["actual_aqi"]).abs().mean()
-    st.caption(f"Mean Absolute Error (visible range, all locations): **{mae:.1f} AQI points**")
+    summary = load_accuracy(location_id)
+    if not summary.empty:
+        st.caption("Rolling accuracy (forecast − actual, AQI points)")
+        st.dataframe(summary.round(1), use_container_width=True, hide_index=True)
 
 st.divider()
 
 # --- Raw data ---
-with st.expander("Raw daily aggregates"):
+with st.expander("Raw weekly rollups" if weekly else "Raw daily aggregates"):
     st.dataframe(
         df_agg_filtered.sort_values(["name", "date"], ascending=[True, False]),
         use_container_width=True,
@@ -2,13 +2,9 @@
 cd /d C:\Users\steve\Documents\aqi-forecasting-pipeline
 call .venv\Scripts\activate.bat
 
-echo [1/3] Ingesting AirNow data...
-python -m src.ingest.ingest_airnow
-
-echo [2/3] Building daily aggregates...
-python -m src.features.build_features
-
-echo [3/3] Forecasting and notifying...
-python -m src.forecast_and_notify
+rem One process runs every stage as a dependency graph (see src\orchestrate.py);
+rem stages whose inputs have not changed since their last run are skipped.
+echo Running pipeline...
+python -m src.orchestrate %*
 
 echo Pipeline run complete.
@@ -9,13 +9,9 @@ mkdir -p "$LOG_DIR"
 
 cd "$PIPELINE_DIR"
 
-echo "[$(date '+%Y-%m-%d %H:%M:%S')] [1/3] Ingesting AirNow data..."
-"$VENV_PYTHON" -m src.ingest.ingest_airnow
-
-echo "[$(date '+%Y-%m-%d %H:%M:%S')] [2/3] Building daily aggregates..."
-"$VENV_PYTHON" -m src.features.build_features
-
-echo "[$(date '+%Y-%m-%d %H:%M:%S')] [3/3] Forecasting and notifying..."
-"$VENV_PYTHON" -m src.forecast_and_notify
+# One process runs every stage as a dependency graph (see src/orchestrate.py);
+# stages whose inputs have not changed since their last run are skipped.
+echo "[$(date '+%Y-%m-%d %H:%M:%S')] Running pipeline..."
+"$VENV_PYTHON" -m src.orchestrate "$@"
 
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] Pipeline run complete."
@@ -20,6 +20,11 @@ CREATE TABLE IF NOT EXISTS observations (
     CONSTRAINT uq_obs_location_time_pollutant UNIQUE (location_id, timestamp_utc, pollutant)
 );
 
+-- Time-range scans: aggregation's recent window and src.retention's
+-- archive cutoff. Older rows live in Parquet under AQI_ARCHIVE_DIR.
+CREATE INDEX IF NOT EXISTS ix_observations_timestamp
+    ON observations (timestamp_utc);
+
 -- Daily aggregates per location
 CREATE TABLE IF NOT EXISTS daily_aggregates (
     id SERIAL PRIMARY KEY,
@@ -28,16 +33,43 @@ CREATE TABLE IF NOT EXISTS daily_aggregates (
     max_aqi INTEGER,
     mean_aqi DOUBLE PRECISION,
     min_aqi INTEGER,
+    -- Per-pollutant values from the same aggregation pass (NULL when the
+    -- pollutant wasn't reported that day); see src/features/build_features.py
+    pm25_max_aqi INTEGER,
+    pm25_mean_aqi DOUBLE PRECISION,
+    pm25_min_aqi INTEGER,
+    ozone_max_aqi INTEGER,
+    ozone_mean_aqi DOUBLE PRECISION,
+    ozone_min_aqi INTEGER,
+    pm10_max_aqi INTEGER,
+    pm10_mean_aqi DOUBLE PRECISION,
+    pm10_min_aqi INTEGER,
+    -- Pollutant of the day's highest reading
+    dominant_pollutant TEXT,
     is_interpolated BOOLEAN NOT NULL DEFAULT FALSE,
+    -- Last time the aggregate values changed; drives incremental backfill
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     CONSTRAINT uq_daily_location_date UNIQUE (location_id, date)
 );
 
+CREATE INDEX IF NOT EXISTS ix_daily_aggregates_updated_at
+    ON daily_aggregates (updated_at);
+
+-- High-water marks for incremental jobs (e.g. backfill_interpolate)
+CREATE TABLE IF NOT EXISTS pipeline_watermarks (
+    name TEXT PRIMARY KEY,
+    watermark TIMESTAMPTZ NOT NULL
+);
+
 -- Alert state: tracks which locations are currently in an active alert
 CREATE TABLE IF NOT EXISTS alert_state (
     location_id INTEGER PRIMARY KEY REFERENCES locations(id),
     in_alert BOOLEAN NOT NULL DEFAULT FALSE,
     alert_started_at TIMESTAMPTZ,
-    last_forecast_aqi INTEGER
+    last_forecast_aqi INTEGER,
+    -- Number of alert / all-clear transitions so far; part of each
+    -- notification's idempotency key, so a re-alert is a new event
+    transition_seq INTEGER NOT NULL DEFAULT 0
 );
 
 -- Forecasts (next-day or multi-day)
@@ -47,6 +79,133 @@ CREATE TABLE IF NOT EXISTS forecasts (
     target_date DATE NOT NULL,
     forecast_aqi INTEGER NOT NULL,
     model_name TEXT,
+    -- Days from the last observed aggregate to target_date
+    horizon_days INTEGER NOT NULL DEFAULT 1,
+    -- Spread of the per-tree forecasts and P(AQI >= alert threshold);
+    -- NULL for models without an ensemble.
+    forecast_q10 DOUBLE PRECISION,
+    forecast_q50 DOUBLE PRECISION,
+    forecast_q90 DOUBLE PRECISION,
+    exceedance_prob DOUBLE PRECISION,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     CONSTRAINT uq_forecast_location_date_model UNIQUE (location_id, target_date, model_name)
 );
+
+-- Per-location alert email subscribers (ALERT_EMAIL also receives everything)
+CREATE TABLE IF NOT EXISTS alert_subscribers (
+    id SERIAL PRIMARY KEY,
+    location_id INTEGER NOT NULL REFERENCES locations(id),
+    email TEXT NOT NULL,
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    CONSTRAINT uq_subscriber_location_email UNIQUE (location_id, email)
+);
+
+-- Alert / all-clear events waiting for the delivery worker
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    event_type TEXT NOT NULL,                 -- 'alert' or 'all_clear'
+    location_id INTEGER NOT NULL REFERENCES locations(id),
+    payload JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',   -- 'pending', 'sent' or 'failed'
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    sent_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS ix_outbox_pending
+    ON notification_outbox (next_attempt_at)
+    WHERE status = 'pending';
+
+-- One row per (event, recipient) delivered, so retries never resend
+CREATE TABLE IF NOT EXISTS notification_deliveries (
+    outbox_id BIGINT NOT NULL REFERENCES notification_outbox(id),
+    recipient TEXT NOT NULL,
+    delivered_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (outbox_id, recipient)
+);
+
+-- Pipeline telemetry: one row per run (stages launched together share
+-- AQI_RUN_ID) and one row per stage execution
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    run_id TEXT PRIMARY KEY,
+    host TEXT,
+    started_at TIMESTAMPTZ NOT NULL,
+    finished_at TIMESTAMPTZ,
+    status TEXT NOT NULL DEFAULT 'running'   -- 'running', 'success' or 'failed'
+);
+
+CREATE TABLE IF NOT EXISTS stage_metrics (
+    id BIGSERIAL PRIMARY KEY,
+    run_id TEXT NOT NULL REFERENCES pipeline_runs(run_id),
+    stage TEXT NOT NULL,
+    started_at TIMESTAMPTZ NOT NULL,
+    finished_at TIMESTAMPTZ NOT NULL,
+    duration_s DOUBLE PRECISION NOT NULL,
+    rows_read BIGINT NOT NULL DEFAULT 0,
+    rows_written BIGINT NOT NULL DEFAULT 0,
+    api_calls INTEGER NOT NULL DEFAULT 0,
+    retries INTEGER NOT NULL DEFAULT 0,
+    peak_memory_mb DOUBLE PRECISION,
+    status TEXT NOT NULL,
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS ix_stage_metrics_stage_started
+    ON stage_metrics (stage, started_at DESC);
+
+-- Tell API processes to rebuild their in-memory location index
+CREATE OR REPLACE FUNCTION notify_locations_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('locations_changed', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_locations_changed ON locations;
+CREATE TRIGGER trg_locations_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON locations
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_locations_changed();
+
+-- Forecast error per (location, target_date, model, horizon), filled
+-- incrementally by src/evaluate_forecasts.py as actuals land
+CREATE TABLE IF NOT EXISTS forecast_evaluations (
+    location_id INTEGER NOT NULL REFERENCES locations(id),
+    target_date DATE NOT NULL,
+    model_name TEXT NOT NULL,
+    horizon_days INTEGER NOT NULL,
+    forecast_aqi INTEGER NOT NULL,
+    actual_aqi INTEGER NOT NULL,
+    error INTEGER NOT NULL,                  -- forecast - actual
+    exceedance_prob DOUBLE PRECISION,
+    evaluated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (location_id, model_name, horizon_days, target_date)
+);
+
+-- Rolling accuracy over the window_days calendar days ending at end_date,
+-- the latest evaluated target date (days without an evaluation don't count)
+CREATE TABLE IF NOT EXISTS forecast_accuracy (
+    location_id INTEGER NOT NULL REFERENCES locations(id),
+    model_name TEXT NOT NULL,
+    horizon_days INTEGER NOT NULL,
+    window_days INTEGER NOT NULL,
+    end_date DATE NOT NULL,
+    n INTEGER NOT NULL,
+    mae DOUBLE PRECISION NOT NULL,
+    rmse DOUBLE PRECISION NOT NULL,
+    bias DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (location_id, model_name, horizon_days, window_days)
+);
+
+CREATE INDEX IF NOT EXISTS ix_forecasts_created_at ON forecasts (created_at);
+
+-- Input signal seen by each stage's last successful orchestrator run;
+-- src/orchestrate.py skips a stage while its signal is unchanged
+CREATE TABLE IF NOT EXISTS pipeline_stage_state (
+    stage TEXT PRIMARY KEY,
+    signal TEXT,
+    completed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,6 @@
+"""`python -m src <command>`: same as the `aqi` script."""
+import sys
+
+from src.cli import main
+
+sys.exit(main())
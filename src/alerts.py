@@ -1,49 +1,232 @@
+import json
 import os
 import smtplib
 from email.message import EmailMessage
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from src.db.migrations import relation_exists
 
 ALERT_EMAIL = os.getenv("ALERT_EMAIL")
 ALERT_EMAIL_PASSWORD = os.getenv("ALERT_EMAIL_PASSWORD")
-SMTP_HOST = "smtp.gmail.com"
-SMTP_PORT = 587
+# Point these at a local stand-in (e.g. `python -m aiosmtpd -n -l localhost:1025`
+# with SMTP_STARTTLS=false) to exercise delivery without sending real mail.
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() not in ("0", "false", "no")
+
+EVENT_ALERT = "alert"
+EVENT_ALL_CLEAR = "all_clear"
+
+
+class SMTPSession:
+    """
+    One SMTP connection reused for every message sent inside the `with` block.
+
+    STARTTLS and login happen once per session instead of once per message.
+    If the server drops the connection mid-session, the next send reconnects
+    once before giving up.
+    """
 
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        sender: Optional[str] = ALERT_EMAIL,
+        password: Optional[str] = ALERT_EMAIL_PASSWORD,
+        starttls: bool = SMTP_STARTTLS,
+        timeout: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._smtp: Optional[smtplib.SMTP] = None
 
-def _send_email(subject: str, body: str) -> None:
-    if not ALERT_EMAIL or not ALERT_EMAIL_PASSWORD:
-        print("⚠️  Email credentials not configured — skipping notification.")
-        return
+    def __enter__(self) -> "SMTPSession":
+        self._connect()
+        return self
 
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = ALERT_EMAIL
-    msg["To"] = ALERT_EMAIL
-    msg.set_content(body)
+    def __exit__(self, *exc) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                self._smtp.close()
+            self._smtp = None
 
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as smtp:
-        smtp.starttls()
-        smtp.login(ALERT_EMAIL, ALERT_EMAIL_PASSWORD)
-        smtp.send_message(msg)
-    print(f"📧 Email sent: {subject}")
+    def _connect(self) -> None:
+        self._smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            self._smtp.starttls()
+        if self.password:
+            self._smtp.login(self.sender, self.password)
 
+    def send(self, to: str, subject: str, body: str) -> None:
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = self.sender
+        msg["To"] = to
+        msg.set_content(body)
 
-def send_alert_email(location_name: str, forecast_aqi: int, target_date, threshold: int) -> None:
-    subject = f"⚠️ AQI Alert: {location_name} forecast {forecast_aqi}"
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._connect()
+            self._smtp.send_message(msg)
+
+
+def build_alert_message(payload: Dict[str, Any]) -> Tuple[str, str]:
+    subject = f"⚠️ AQI Alert: {payload['location_name']} forecast {payload['forecast_aqi']}"
     body = (
-        f"Air quality alert for {location_name}.\n\n"
-        f"Forecast AQI: {forecast_aqi}\n"
-        f"Target date: {target_date}\n"
-        f"Threshold: {threshold}\n\n"
-        f"Monitor conditions at https://www.airnow.gov/"
+        f"Air quality alert for {payload['location_name']}.\n\n"
+        f"Forecast AQI: {payload['forecast_aqi']}\n"
+        f"Target date: {payload['target_date']}\n"
+        f"Threshold: {payload['threshold']}\n"
     )
-    _send_email(subject, body)
+    if payload.get("exceedance_prob") is not None:
+        body += f"Chance of exceeding threshold: {payload['exceedance_prob']:.0%}\n"
+    body += "\nMonitor conditions at https://www.airnow.gov/"
+    return subject, body
 
 
-def send_all_clear_email(location_name: str, forecast_aqi: int, target_date, threshold: int) -> None:
-    subject = f"✅ AQI All-Clear: {location_name}"
+def build_all_clear_message(payload: Dict[str, Any]) -> Tuple[str, str]:
+    subject = f"✅ AQI All-Clear: {payload['location_name']}"
     body = (
-        f"Air quality has returned to acceptable levels for {location_name}.\n\n"
-        f"Forecast AQI: {forecast_aqi}\n"
-        f"Target date: {target_date}\n"
-        f"Now below threshold of {threshold}.\n"
+        f"Air quality has returned to acceptable levels for {payload['location_name']}.\n\n"
+        f"Forecast AQI: {payload['forecast_aqi']}\n"
+        f"Target date: {payload['target_date']}\n"
+        f"Now below threshold of {payload['threshold']}.\n"
     )
-    _send_email(subject, body)
+    return subject, body
+
+
+def build_message(event_type: str, payload: Dict[str, Any]) -> Tuple[str, str]:
+    if event_type == EVENT_ALERT:
+        return build_alert_message(payload)
+    if event_type == EVENT_ALL_CLEAR:
+        return build_all_clear_message(payload)
+    raise ValueError(f"Unknown notification event type: {event_type}")
+
+
+def build_digest_message(events: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """
+    One email summarizing several alert / all-clear events, used when many
+    locations cross the threshold in the same run.
+    """
+    alerts = [e["payload"] for e in events if e["event_type"] == EVENT_ALERT]
+    clears = [e["payload"] for e in events if e["event_type"] == EVENT_ALL_CLEAR]
+
+    subject = f"AQI update: {len(alerts)} alert(s), {len(clears)} all-clear(s)"
+    lines = []
+    if alerts:
+        lines.append("New alerts:")
+        for p in sorted(alerts, key=lambda p: -p["forecast_aqi"]):
+            lines.append(f"  ⚠️ {p['location_name']}: forecast AQI {p['forecast_aqi']} on {p['target_date']}")
+        lines.append("")
+    if clears:
+        lines.append("Back below threshold:")
+        for p in sorted(clears, key=lambda p: p["location_name"]):
+            lines.append(f"  ✅ {p['location_name']}: forecast AQI {p['forecast_aqi']} on {p['target_date']}")
+        lines.append("")
+    lines.append("Monitor conditions at https://www.airnow.gov/")
+    return subject, "\n".join(lines)
+
+
+def idempotency_key(event_type: str, location_id: int, target_date, transition_seq: int) -> str:
+    """
+    Key of one alert_state transition. transition_seq counts the location's
+    transitions, so a retried transition maps to the same key while a
+    genuine re-alert (alert, all-clear, alert again for the same target
+    date) gets a new one.
+    """
+    return f"{event_type}:{location_id}:{target_date}:{transition_seq}"
+
+
+def enqueue_notifications(conn, events: List[Dict[str, Any]]) -> int:
+    """
+    Write alert / all-clear events to notification_outbox on conn.
+
+    Call this inside the transaction that changes alert_state, so an event
+    is queued if and only if the state transition commits. Each event needs
+    event_type, location_id, target_date, transition_seq (the location's
+    alert_state.transition_seq after this transition) and a
+    JSON-serializable payload.
+    Events whose idempotency key is already queued are ignored.
+    Returns the number of events newly queued.
+    """
+    if not events:
+        return 0
+
+    result = conn.execute(text("""
+        INSERT INTO notification_outbox (idempotency_key, event_type, location_id, payload)
+        SELECT *
+        FROM unnest(
+            CAST(:keys AS text[]),
+            CAST(:event_types AS text[]),
+            CAST(:location_ids AS integer[]),
+            CAST(:payloads AS jsonb[])
+        )
+        ON CONFLICT (idempotency_key) DO NOTHING
+    """), {
+        "keys": [
+            idempotency_key(e["event_type"], e["location_id"], e["target_date"], e["transition_seq"])
+            for e in events
+        ],
+        "event_types": [e["event_type"] for e in events],
+        "location_ids": [int(e["location_id"]) for e in events],
+        "payloads": [json.dumps(e["payload"], default=str) for e in events],
+    })
+    return result.rowcount
+
+
+def ensure_notification_tables(conn) -> None:
+    """
+    Create the outbox and subscriber tables on databases initialized before
+    they were part of schema.sql. Only what the catalog says is missing is
+    created (src.db.migrations).
+    """
+    if not relation_exists(conn, "alert_subscribers"):
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS alert_subscribers (
+                id SERIAL PRIMARY KEY,
+                location_id INTEGER NOT NULL REFERENCES locations(id),
+                email TEXT NOT NULL,
+                active BOOLEAN NOT NULL DEFAULT TRUE,
+                CONSTRAINT uq_subscriber_location_email UNIQUE (location_id, email)
+            )
+        """))
+    if not relation_exists(conn, "notification_outbox"):
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS notification_outbox (
+                id BIGSERIAL PRIMARY KEY,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                event_type TEXT NOT NULL,
+                location_id INTEGER NOT NULL REFERENCES locations(id),
+                payload JSONB NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                last_error TEXT,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                sent_at TIMESTAMPTZ
+            )
+        """))
+    if not relation_exists(conn, "ix_outbox_pending"):
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_outbox_pending
+            ON notification_outbox (next_attempt_at)
+            WHERE status = 'pending'
+        """))
+    if not relation_exists(conn, "notification_deliveries"):
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS notification_deliveries (
+                outbox_id BIGINT NOT NULL REFERENCES notification_outbox(id),
+                recipient TEXT NOT NULL,
+                delivered_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (outbox_id, recipient)
+            )
+        """))
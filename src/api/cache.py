@@ -0,0 +1,128 @@
+"""
+In-process cache of serialized API responses.
+
+Forecasts change once per pipeline run, so /forecasts/latest is built
+once, encoded to JSON bytes and served from a dict until
+insert_forecasts commits and NOTIFYs FORECASTS_CHANNEL. A background
+listener thread then drops the cached entries. The same thread can serve
+other in-process caches (see start_invalidation_listener).
+
+- Concurrent misses for the same key coalesce: one request builds the
+  entry while the others await a per-key asyncio.Lock and reuse the
+  result.
+- A build that overlaps an invalidation is returned to its caller but
+  not stored, so a stale body is never cached past a NOTIFY.
+- Entries also expire after CACHE_TTL_SECONDS, a safety net for
+  notifications missed while the listener was reconnecting.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+from src.db.notify import NotificationListener
+
+CACHE_TTL_SECONDS = 300.0
+LISTEN_POLL_SECONDS = 5.0
+RECONNECT_SECONDS = 10.0
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    built_at: float
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header value covers etag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+class ResponseCache:
+    def __init__(self, ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, CachedResponse] = {}
+        self._key_locks: Dict[str, asyncio.Lock] = {}
+        # Guards entries/generation against the listener thread.
+        self._guard = threading.Lock()
+        self._generation = 0
+
+    def _fresh(self, entry: Optional[CachedResponse]) -> bool:
+        return entry is not None and time.monotonic() - entry.built_at < self.ttl_seconds
+
+    async def get_or_build(
+        self,
+        key: str,
+        build: Callable[[], Awaitable[bytes]],
+    ) -> CachedResponse:
+        entry = self._entries.get(key)
+        if self._fresh(entry):
+            return entry
+
+        async with self._key_locks.setdefault(key, asyncio.Lock()):
+            entry = self._entries.get(key)
+            if self._fresh(entry):
+                return entry
+
+            generation = self._generation
+            body = await build()
+            entry = CachedResponse(body=body, etag=make_etag(body), built_at=time.monotonic())
+            with self._guard:
+                if generation == self._generation:
+                    self._entries[key] = entry
+            return entry
+
+    def invalidate(self) -> None:
+        with self._guard:
+            self._generation += 1
+            self._entries.clear()
+
+
+def run_invalidation_listener(
+    handlers: Dict[str, Callable[[], None]],
+    stop: threading.Event,
+) -> None:
+    """
+    Call handlers[channel]() whenever channel is notified, until stop is set.
+
+    Every handler is also called after each (re)connect, since
+    notifications sent while disconnected are lost.
+    """
+    while not stop.is_set():
+        try:
+            with NotificationListener(handlers) as listener:
+                for invalidate in handlers.values():
+                    invalidate()
+                while not stop.is_set():
+                    for channel in {note.channel for note in listener.poll(LISTEN_POLL_SECONDS)}:
+                        handlers[channel]()
+        except Exception as exc:
+            print(f"⚠️  Invalidation listener lost its connection: {exc}")
+            stop.wait(RECONNECT_SECONDS)
+
+
+def start_invalidation_listener(handlers: Dict[str, Callable[[], None]]) -> threading.Event:
+    """
+    Start the listener in a daemon thread, sharing one connection across
+    all channels. Set the returned event to stop it.
+    """
+    stop = threading.Event()
+    threading.Thread(
+        target=run_invalidation_listener,
+        args=(handlers, stop),
+        name="invalidation-listener",
+        daemon=True,
+    ).start()
+    return stop
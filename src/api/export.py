@@ -0,0 +1,252 @@
+"""
+/export/{dataset}: stream raw tables to partners as NDJSON, CSV or Arrow.
+
+Rows are read through a server-side cursor (AsyncConnection.stream) in
+batches of EXPORT_BATCH_ROWS, and each batch is encoded and sent as one
+chunk of the response before the next is fetched. Memory use depends on
+the batch size only, not on the size of the export.
+
+Arrow output is an IPC *stream* (schema first, then one record batch per
+chunk) so it can be consumed incrementally with pyarrow.ipc.open_stream.
+It needs pyarrow installed; the other formats do not.
+
+observations exports only the hot table, i.e. the last
+OBSERVATION_RETENTION_DAYS days; older rows live in the Parquet archive
+(src.retention) and are read with read_observations or straight from
+the files.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+
+from src.db.async_connection import get_async_engine
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow export is optional
+    pa = None
+
+EXPORT_BATCH_ROWS = 5000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+router = APIRouter()
+
+
+@dataclass(frozen=True)
+class ExportDataset:
+    table: str
+    time_col: str
+    time_type: str  # "date" or "timestamptz"
+    # (column, arrow type name) in output order
+    columns: Tuple[Tuple[str, str], ...]
+    order_by: str
+
+
+DATASETS: Dict[str, ExportDataset] = {
+    "observations": ExportDataset(
+        table="observations",
+        time_col="timestamp_utc",
+        time_type="timestamptz",
+        columns=(
+            ("location_id", "int32"),
+            ("timestamp_utc", "timestamp"),
+            ("aqi", "int32"),
+            ("category", "string"),
+            ("pollutant", "string"),
+        ),
+        order_by="location_id, timestamp_utc, pollutant",
+    ),
+    "daily_aggregates": ExportDataset(
+        table="daily_aggregates",
+        time_col="date",
+        time_type="date",
+        columns=(
+            ("location_id", "int32"),
+            ("date", "date"),
+            ("max_aqi", "int32"),
+            ("mean_aqi", "float64"),
+            ("min_aqi", "int32"),
+            ("is_interpolated", "bool"),
+        ),
+        order_by="location_id, date",
+    ),
+    "forecasts": ExportDataset(
+        table="forecasts",
+        time_col="target_date",
+        time_type="date",
+        columns=(
+            ("location_id", "int32"),
+            ("target_date", "date"),
+            ("model_name", "string"),
+            ("forecast_aqi", "int32"),
+            ("forecast_q10", "float64"),
+            ("forecast_q50", "float64"),
+            ("forecast_q90", "float64"),
+            ("exceedance_prob", "float64"),
+            ("created_at", "timestamp"),
+        ),
+        order_by="location_id, target_date, model_name",
+    ),
+}
+
+
+def export_sql(dataset: ExportDataset, has_start: bool, has_end: bool, has_locations: bool) -> str:
+    where = []
+    if has_locations:
+        where.append("location_id = ANY(:location_ids)")
+    if has_start:
+        where.append(f"{dataset.time_col} >= :start")
+    if has_end:
+        where.append(f"{dataset.time_col} <= :end")
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    columns = ", ".join(name for name, _ in dataset.columns)
+    return f"SELECT {columns} FROM {dataset.table} {where_sql} ORDER BY {dataset.order_by}"
+
+
+# --- encoders: each turns a batch of row tuples into bytes ------------------
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class NDJSONEncoder:
+    def __init__(self, names: Sequence[str]):
+        self.names = list(names)
+
+    def header(self) -> bytes:
+        return b""
+
+    def batch(self, rows: List[tuple]) -> bytes:
+        return "".join(
+            json.dumps(dict(zip(self.names, row)), default=_json_default) + "\n"
+            for row in rows
+        ).encode()
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class CSVEncoder:
+    def __init__(self, names: Sequence[str]):
+        self.names = list(names)
+
+    def _encode(self, rows) -> bytes:
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator="\n").writerows(rows)
+        return buf.getvalue().encode()
+
+    def header(self) -> bytes:
+        return self._encode([self.names])
+
+    def batch(self, rows: List[tuple]) -> bytes:
+        return self._encode(rows)
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class ArrowEncoder:
+    def __init__(self, dataset: ExportDataset):
+        types = {
+            "int32": pa.int32(),
+            "float64": pa.float64(),
+            "bool": pa.bool_(),
+            "string": pa.string(),
+            "date": pa.date32(),
+            "timestamp": pa.timestamp("us", tz="UTC"),
+        }
+        self.schema = pa.schema([(name, types[kind]) for name, kind in dataset.columns])
+        self._sink = io.BytesIO()
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def _drain(self) -> bytes:
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate(0)
+        return data
+
+    def header(self) -> bytes:
+        return self._drain()  # the schema message
+
+    def batch(self, rows: List[tuple]) -> bytes:
+        columns = list(zip(*rows))
+        self._writer.write_batch(pa.record_batch(
+            [pa.array(col, type=field.type) for col, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+        return self._drain()
+
+    def footer(self) -> bytes:
+        self._writer.close()  # end-of-stream marker
+        return self._drain()
+
+
+def make_encoder(fmt: str, dataset: ExportDataset):
+    names = [name for name, _ in dataset.columns]
+    if fmt == "ndjson":
+        return NDJSONEncoder(names)
+    if fmt == "csv":
+        return CSVEncoder(names)
+    return ArrowEncoder(dataset)
+
+
+async def stream_export(sql: str, params: Dict[str, Any], encoder) -> AsyncIterator[bytes]:
+    yield encoder.header()
+    async with get_async_engine().connect() as conn:
+        result = await conn.stream(text(sql), params)
+        async for rows in result.partitions(EXPORT_BATCH_ROWS):
+            yield encoder.batch([tuple(row) for row in rows])
+    yield encoder.footer()
+
+
+def _bind_time(dataset: ExportDataset, value: Optional[datetime]) -> Any:
+    if value is not None and dataset.time_type == "date":
+        return value.date()
+    return value
+
+
+@router.get("/export/{dataset}")
+async def export_dataset(
+    dataset: Literal["observations", "daily_aggregates", "forecasts"],
+    format: Literal["ndjson", "csv", "arrow"] = "ndjson",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    location_id: List[int] = Query(default=[]),
+):
+    """
+    Stream a table for a time range and optional set of locations.
+    Repeat location_id to export several locations.
+    """
+    if format == "arrow" and pa is None:
+        raise HTTPException(status_code=501, detail="Arrow export requires pyarrow on the server.")
+
+    spec = DATASETS[dataset]
+    sql = export_sql(spec, start is not None, end is not None, bool(location_id))
+    params: Dict[str, Any] = {}
+    if location_id:
+        params["location_ids"] = location_id
+    if start is not None:
+        params["start"] = _bind_time(spec, start)
+    if end is not None:
+        params["end"] = _bind_time(spec, end)
+
+    extension = {"ndjson": "ndjson", "csv": "csv", "arrow": "arrows"}[format]
+    return StreamingResponse(
+        stream_export(sql, params, make_encoder(format, spec)),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{extension}"'},
+    )
@@ -0,0 +1,233 @@
+"""
+Forecast response models, the latest-forecast query shared by the
+forecast endpoints, POST /forecasts/query and GET /forecasts/accuracy.
+"""
+from datetime import date
+from itertools import groupby
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import APIRouter
+from pydantic import BaseModel, Field, TypeAdapter, model_validator
+from sqlalchemy import text
+
+from src.db.async_connection import get_async_engine
+
+MAX_QUERY_LOCATIONS = 1000
+
+router = APIRouter()
+
+
+class ForecastOut(BaseModel):
+    location_id: int
+    location_name: str
+    target_date: date
+    forecast_aqi: int
+    model_name: str
+
+
+# Validates and encodes a whole forecast list in one call.
+forecast_list = TypeAdapter(List[ForecastOut])
+
+
+def latest_forecasts_sql(filtered: bool) -> str:
+    """
+    Latest forecast per location: for each location_id, the rows with the
+    most recent target_date in the forecasts table, one per model. Rows
+    are fully ordered so the cached body and its ETag only change with
+    the data. With filtered=True only the locations in :location_ids are
+    read.
+    """
+    location_filter = "WHERE location_id = ANY(:location_ids)" if filtered else ""
+    return f"""
+        SELECT
+            f.location_id,
+            l.name AS location_name,
+            f.target_date,
+            f.forecast_aqi,
+            f.model_name
+        FROM forecasts f
+        JOIN (
+            SELECT location_id, MAX(target_date) AS max_date
+            FROM forecasts
+            {location_filter}
+            GROUP BY location_id
+        ) latest
+          ON f.location_id = latest.location_id
+         AND f.target_date = latest.max_date
+        JOIN locations l
+          ON l.id = f.location_id
+        ORDER BY f.location_id, f.model_name;
+    """
+
+
+async def fetch_latest_forecasts(
+    conn,
+    location_ids: Optional[Sequence[int]] = None,
+) -> List[Dict[str, Any]]:
+    """Run the latest-forecast query on an async connection."""
+    if location_ids is None:
+        result = await conn.execute(text(latest_forecasts_sql(filtered=False)))
+    else:
+        result = await conn.execute(
+            text(latest_forecasts_sql(filtered=True)),
+            {"location_ids": [int(i) for i in location_ids]},
+        )
+    return [dict(row) for row in result.mappings().all()]
+
+
+class ForecastQuery(BaseModel):
+    location_ids: List[int] = Field(..., min_length=1, max_length=MAX_QUERY_LOCATIONS)
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    model_name: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_range(self) -> "ForecastQuery":
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValueError("end_date must not be before start_date")
+        return self
+
+
+class ForecastPoint(BaseModel):
+    target_date: date
+    model_name: Optional[str]
+    forecast_aqi: int
+    forecast_q10: Optional[float] = None
+    forecast_q50: Optional[float] = None
+    forecast_q90: Optional[float] = None
+    exceedance_prob: Optional[float] = None
+
+
+class LocationForecasts(BaseModel):
+    location_id: int
+    location_name: str
+    forecasts: List[ForecastPoint]
+
+
+def forecast_query_sql(query: ForecastQuery) -> str:
+    """
+    One statement for all requested locations. The filters sit in the
+    LEFT JOIN so known locations without matching forecasts still appear.
+    """
+    conditions = ["f.location_id = l.id"]
+    if query.start_date is not None:
+        conditions.append("f.target_date >= :start_date")
+    if query.end_date is not None:
+        conditions.append("f.target_date <= :end_date")
+    if query.model_name is not None:
+        conditions.append("f.model_name = :model_name")
+
+    return f"""
+        SELECT
+            l.id AS location_id,
+            l.name AS location_name,
+            f.target_date,
+            f.model_name,
+            f.forecast_aqi,
+            f.forecast_q10,
+            f.forecast_q50,
+            f.forecast_q90,
+            f.exceedance_prob
+        FROM locations l
+        LEFT JOIN forecasts f
+          ON {" AND ".join(conditions)}
+        WHERE l.id = ANY(:location_ids)
+        ORDER BY l.id, f.target_date, f.model_name
+    """
+
+
+def group_by_location(rows: List[Dict[str, Any]]) -> List[LocationForecasts]:
+    """Fold rows sorted by location_id into one entry per location."""
+    grouped: List[LocationForecasts] = []
+    for (loc_id, name), loc_rows in groupby(rows, key=lambda r: (r["location_id"], r["location_name"])):
+        grouped.append(LocationForecasts(
+            location_id=loc_id,
+            location_name=name,
+            forecasts=[ForecastPoint(**{k: r[k] for k in ForecastPoint.model_fields})
+                       for r in loc_rows if r["target_date"] is not None],
+        ))
+    return grouped
+
+
+@router.post("/forecasts/query", response_model=List[LocationForecasts])
+async def query_forecasts(query: ForecastQuery):
+    """
+    Forecasts for many locations over a target date range, grouped by
+    location. Unknown location ids are left out of the response.
+    """
+    params: Dict[str, Any] = {"location_ids": sorted(set(query.location_ids))}
+    for name in ("start_date", "end_date", "model_name"):
+        if getattr(query, name) is not None:
+            params[name] = getattr(query, name)
+
+    async with get_async_engine().connect() as conn:
+        rows = (await conn.execute(text(forecast_query_sql(query)), params)).mappings().all()
+
+    return group_by_location(rows)
+
+
+class ForecastAccuracyOut(BaseModel):
+    location_id: int
+    location_name: str
+    model_name: str
+    horizon_days: int
+    window_days: int
+    end_date: date
+    n: int
+    mae: float
+    rmse: float
+    bias: float
+
+
+def accuracy_sql(has_location: bool, has_model: bool, has_window: bool) -> str:
+    """
+    Rolling summaries materialized by src.evaluate_forecasts; one row per
+    (location, model, horizon, window), so the cost is the rows returned.
+    """
+    where = []
+    if has_location:
+        where.append("a.location_id = :location_id")
+    if has_model:
+        where.append("a.model_name = :model_name")
+    if has_window:
+        where.append("a.window_days = :window_days")
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    return f"""
+        SELECT
+            a.location_id,
+            l.name AS location_name,
+            a.model_name,
+            a.horizon_days,
+            a.window_days,
+            a.end_date,
+            a.n,
+            a.mae,
+            a.rmse,
+            a.bias
+        FROM forecast_accuracy a
+        JOIN locations l ON l.id = a.location_id
+        {where_sql}
+        ORDER BY a.location_id, a.model_name, a.horizon_days, a.window_days
+    """
+
+
+@router.get("/forecasts/accuracy", response_model=List[ForecastAccuracyOut])
+async def get_forecast_accuracy(
+    location_id: Optional[int] = None,
+    model_name: Optional[str] = None,
+    window_days: Optional[int] = None,
+):
+    """
+    Rolling MAE, RMSE and bias (forecast - actual) per location, model and
+    forecast horizon over the last window_days evaluated days.
+    """
+    params: Dict[str, Any] = {}
+    for name, value in (("location_id", location_id), ("model_name", model_name),
+                        ("window_days", window_days)):
+        if value is not None:
+            params[name] = value
+
+    sql = accuracy_sql(location_id is not None, model_name is not None, window_days is not None)
+    async with get_async_engine().connect() as conn:
+        rows = (await conn.execute(text(sql), params)).mappings().all()
+    return [dict(row) for row in rows]
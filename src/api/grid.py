@@ -0,0 +1,138 @@
+"""
+/grid: the interpolated AQI surfaces written by src.grid.
+
+    GET /grid/{source}                        grid metadata
+    GET /grid/{source}/value?lat=..&lon=..    AQI of the cell containing a point
+    GET /grid/{source}/tiles/{z}/{x}/{y}.npy  256 x 256 web-map (XYZ) tile
+
+source is "observations" or "forecasts". Tiles are int16 AQI in .npy
+format (read with numpy.load), row 0 at the tile's northern edge, with
+NODATA for pixels outside the grid. Tiles that miss the grid are 404.
+
+Each grid is memory-mapped, so a tile reads only the cells it covers.
+The mapping is reopened when the grid's metadata file changes on disk,
+and the ETag (the grid's created_at) changes with it.
+
+The handlers are plain functions, so FastAPI runs the file access in its
+thread pool instead of on the event loop.
+"""
+import io
+import threading
+from typing import Any, Dict, Literal, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+
+from src.api.cache import etag_matches
+from src.grid import GRID_PATH, GridSpec, grid_paths, load_grid, spec_from_meta
+
+TILE_SIZE = 256
+MAX_ZOOM = 16
+NODATA = -1
+
+Source = Literal["observations", "forecasts"]
+
+router = APIRouter()
+
+
+class GridStore:
+    """Open grids by source, reloaded when their metadata file changes."""
+
+    def __init__(self, grid_dir=GRID_PATH):
+        self.grid_dir = grid_dir
+        self._grids: Dict[str, Tuple[int, np.ndarray, Dict[str, Any], GridSpec]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, source: str) -> Tuple[np.ndarray, Dict[str, Any], GridSpec]:
+        _, meta_path = grid_paths(source, self.grid_dir)
+        try:
+            mtime = meta_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"No {source} grid has been built yet")
+
+        with self._lock:
+            cached = self._grids.get(source)
+            if cached is None or cached[0] != mtime:
+                try:
+                    grid, meta = load_grid(source, self.grid_dir)
+                except (OSError, ValueError):
+                    # Caught between the .npy and .json renames; the next request retries.
+                    raise HTTPException(status_code=503, detail=f"The {source} grid is being rebuilt")
+                cached = (mtime, grid, meta, spec_from_meta(meta))
+                self._grids[source] = cached
+        return cached[1], cached[2], cached[3]
+
+
+grid_store = GridStore()
+
+
+def tile_coordinates(z: int, x: int, y: int, size: int = TILE_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """Pixel-centre latitudes (north to south) and longitudes of a Web Mercator tile."""
+    n = 2 ** z
+    offsets = (np.arange(size) + 0.5) / size
+    lons = (x + offsets) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+    return lats, lons
+
+
+def render_tile(grid: np.ndarray, spec: GridSpec, z: int, x: int, y: int) -> Optional[np.ndarray]:
+    """int16 tile sampled from grid (nearest cell), or None if it misses the grid."""
+    lats, lons = tile_coordinates(z, x, y)
+    rows, cols, inside = spec.cells(lats[:, None], lons[None, :])
+    if not inside.any():
+        return None
+    values = np.rint(grid[rows, cols]).astype(np.int16)
+    values[~inside] = NODATA
+    return values
+
+
+@router.get("/grid/{source}")
+def get_grid_metadata(source: Source):
+    """Bounds, resolution, shape and timestamps of a grid, plus its tile URL."""
+    _, meta, _ = grid_store.get(source)
+    return {**meta, "nodata": NODATA, "tiles": f"/grid/{source}/tiles/{{z}}/{{x}}/{{y}}.npy"}
+
+
+@router.get("/grid/{source}/value")
+def get_grid_value(
+    source: Source,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+):
+    """Interpolated AQI of the grid cell containing (lat, lon)."""
+    grid, meta, spec = grid_store.get(source)
+    rows, cols, inside = spec.cells([lat], [lon])
+    if not inside[0]:
+        raise HTTPException(status_code=404, detail="Point is outside the grid")
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "aqi": round(float(grid[rows[0], cols[0]]), 1),
+        "as_of": meta["as_of"],
+    }
+
+
+@router.get("/grid/{source}/tiles/{z}/{x}/{y}.npy")
+def get_grid_tile(
+    source: Source,
+    z: int,
+    x: int,
+    y: int,
+    if_none_match: Optional[str] = Header(default=None),
+):
+    """A TILE_SIZE x TILE_SIZE int16 tile as .npy bytes."""
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="No such tile")
+    grid, meta, spec = grid_store.get(source)
+
+    etag = f'"{source}-{meta["created_at"]}-{z}-{x}-{y}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    tile = render_tile(grid, spec, z, x, y)
+    if tile is None:
+        raise HTTPException(status_code=404, detail="Tile is outside the grid")
+    buffer = io.BytesIO()
+    np.save(buffer, tile)
+    return Response(buffer.getvalue(), media_type="application/octet-stream", headers=headers)
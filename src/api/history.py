@@ -0,0 +1,218 @@
+"""
+/locations/{id}/history: recent AQI history for one location.
+
+Two resolutions:
+  - daily   rows of daily_aggregates (aqi = max_aqi)
+  - hourly  observations, one point per timestamp (aqi = max over pollutants)
+
+Pages are keyset-paginated on the timestamp: the response carries
+next_cursor, which the client passes back as `after` to continue. Each
+page is one index range scan on (location_id, time), however deep the
+client has paged.
+
+With max_points set, the whole [start, end] range is returned in one
+response, downsampled in SQL by min/max bucketing: the range is split
+into max_points / 2 equal time buckets and only the lowest and highest
+point of each bucket is kept, so spikes survive. The API never holds
+more than max_points rows, whatever the length of the range.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import text
+
+from src.db.async_connection import get_async_engine
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+MAX_POINTS_LIMIT = 5000
+
+router = APIRouter()
+
+
+class HistoryPoint(BaseModel):
+    timestamp: datetime
+    aqi: Optional[int] = None
+    mean_aqi: Optional[float] = None
+    min_aqi: Optional[int] = None
+    is_interpolated: Optional[bool] = None
+
+
+class HistoryPage(BaseModel):
+    location_id: int
+    resolution: str
+    downsampled: bool
+    points: List[HistoryPoint]
+    next_cursor: Optional[datetime] = None
+
+
+@dataclass(frozen=True)
+class HistorySource:
+    select: str      # SELECT ... FROM ... producing t, aqi, mean_aqi, min_aqi, is_interpolated
+    time_col: str    # indexed column to range-scan and order by
+    time_type: str   # SQL type of time_col
+    group_by: str = ""
+
+
+SOURCES: Dict[str, HistorySource] = {
+    "daily": HistorySource(
+        select="""
+            SELECT date::timestamp AS t, max_aqi AS aqi, mean_aqi, min_aqi, is_interpolated
+            FROM daily_aggregates
+        """,
+        time_col="date",
+        time_type="date",
+    ),
+    "hourly": HistorySource(
+        select="""
+            SELECT timestamp_utc AS t, MAX(aqi) AS aqi,
+                   NULL::double precision AS mean_aqi, NULL::integer AS min_aqi,
+                   NULL::boolean AS is_interpolated
+            FROM observations
+        """,
+        time_col="timestamp_utc",
+        time_type="timestamptz",
+        group_by="GROUP BY timestamp_utc",
+    ),
+}
+
+
+def _bind_time(source: HistorySource, value: Optional[datetime]) -> Any:
+    if value is None or source.time_type != "date":
+        return value
+    return value.date() if isinstance(value, datetime) else value
+
+
+def points_sql(source: HistorySource, start, end, after) -> str:
+    """The source's points for one location, filtered to the requested range."""
+    where = ["location_id = :location_id"]
+    if start is not None:
+        where.append(f"{source.time_col} >= :start")
+    if end is not None:
+        where.append(f"{source.time_col} <= :end")
+    if after is not None:
+        where.append(f"{source.time_col} > :after")
+    return f"{source.select} WHERE {' AND '.join(where)} {source.group_by}"
+
+
+def page_sql(source: HistorySource, start, end, after) -> str:
+    return f"""
+        {points_sql(source, start, end, after)}
+        ORDER BY {source.time_col}
+        LIMIT :limit
+    """
+
+
+def downsample_sql(source: HistorySource, start, end, after) -> str:
+    """
+    Min/max bucketing. Ranges with at most :max_points points come back
+    unchanged. Every row carries n, the number of points before
+    downsampling.
+    """
+    return f"""
+        WITH pts AS (
+            {points_sql(source, start, end, after)}
+        ),
+        stats AS (
+            SELECT COUNT(*) AS n, MIN(t) AS lo, MAX(t) AS hi FROM pts
+        ),
+        bucketed AS (
+            SELECT
+                pts.*,
+                s.n,
+                LEAST(
+                    FLOOR(
+                        EXTRACT(EPOCH FROM pts.t - s.lo) * :buckets
+                        / GREATEST(EXTRACT(EPOCH FROM s.hi - s.lo), 1)
+                    ),
+                    :buckets - 1
+                ) AS bucket
+            FROM pts CROSS JOIN stats s
+        ),
+        ranked AS (
+            SELECT
+                *,
+                ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY aqi NULLS LAST, t) AS low_rank,
+                ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY aqi DESC NULLS LAST, t) AS high_rank
+            FROM bucketed
+        )
+        SELECT t, aqi, mean_aqi, min_aqi, is_interpolated, n
+        FROM ranked
+        WHERE n <= :max_points OR low_rank = 1 OR high_rank = 1
+        ORDER BY t
+    """
+
+
+@router.get("/locations/{location_id}/history", response_model=HistoryPage)
+async def get_location_history(
+    location_id: int,
+    resolution: Literal["daily", "hourly"] = "daily",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    after: Optional[datetime] = Query(
+        default=None, description="next_cursor from the previous page."
+    ),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    max_points: Optional[int] = Query(
+        default=None, ge=2, le=MAX_POINTS_LIMIT,
+        description="Downsample the whole range to at most this many points.",
+    ),
+):
+    """
+    AQI history for one location, oldest first.
+    """
+    source = SOURCES[resolution]
+    params: Dict[str, Any] = {
+        "location_id": location_id,
+        "start": _bind_time(source, start),
+        "end": _bind_time(source, end),
+        "after": _bind_time(source, after),
+    }
+
+    if max_points is not None:
+        sql = downsample_sql(source, start, end, after)
+        params.update(max_points=max_points, buckets=max(max_points // 2, 1))
+    else:
+        sql = page_sql(source, start, end, after)
+        params["limit"] = limit + 1  # one extra row tells us whether a next page exists
+
+    async with get_async_engine().connect() as conn:
+        exists = (await conn.execute(
+            text("SELECT 1 FROM locations WHERE id = :location_id"),
+            {"location_id": location_id},
+        )).scalar_one_or_none()
+        if exists is None:
+            raise HTTPException(status_code=404, detail=f"Location {location_id} not found")
+
+        rows = (await conn.execute(
+            text(sql),
+            {k: v for k, v in params.items() if v is not None},
+        )).mappings().all()
+
+    next_cursor = None
+    downsampled = False
+    if max_points is not None:
+        downsampled = bool(rows) and rows[0]["n"] > max_points
+    elif len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1]["t"]
+
+    return HistoryPage(
+        location_id=location_id,
+        resolution=resolution,
+        downsampled=downsampled,
+        points=[
+            HistoryPoint(
+                timestamp=row["t"],
+                aqi=row["aqi"],
+                mean_aqi=row["mean_aqi"],
+                min_aqi=row["min_aqi"],
+                is_interpolated=row["is_interpolated"],
+            )
+            for row in rows
+        ],
+        next_cursor=next_cursor,
+    )
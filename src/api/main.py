@@ -1,26 +1,61 @@
-from datetime import date
-from typing import List
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
-from fastapi import FastAPI
-from pydantic import BaseModel
-from sqlalchemy import text
+from fastapi import FastAPI, Header, Response
+from fastapi.responses import PlainTextResponse
 
-from src.db.connection import get_engine
+from src.db.async_connection import dispose_async_engine, get_async_engine
+from src.db.notify import FORECASTS_CHANNEL, LOCATIONS_CHANNEL, ensure_locations_trigger
 from src.config.settings import print_settings_summary
+from src.profiling import profiled, profiling_enabled
+from src.telemetry import render_prometheus
+from src.api.cache import ResponseCache, etag_matches, start_invalidation_listener
+from src.api import export, forecasts, grid, history, nearest
+from src.api.forecasts import ForecastOut, fetch_latest_forecasts, forecast_list
+
+LATEST_FORECASTS_KEY = "forecasts/latest"
+
+forecast_cache = ResponseCache()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_async_engine()
+    try:
+        ensure_locations_trigger()
+    except Exception as exc:
+        # The location index still refreshes on its TTL without the trigger.
+        print(f"⚠️  Could not install the locations trigger: {exc}")
+    stop_listener = start_invalidation_listener({
+        FORECASTS_CHANNEL: forecast_cache.invalidate,
+        LOCATIONS_CHANNEL: nearest.location_index.invalidate,
+    })
+    try:
+        yield
+    finally:
+        stop_listener.set()
+        await dispose_async_engine()
+
 
 app = FastAPI(
     title="Oregon AQI Forecasting API",
     description="Serves air quality forecasts from the PostgreSQL database.",
     version="0.1.0",
+    lifespan=lifespan,
 )
+if profiling_enabled():
+    @app.middleware("http")
+    async def profile_request(request, call_next):
+        # Covers the handler up to the first response bytes; streamed
+        # bodies (e.g. /export) are produced after this returns.
+        with profiled(f"api-{request.method}-{request.url.path}"):
+            return await call_next(request)
 
-
-class ForecastOut(BaseModel):
-    location_id: int
-    location_name: str
-    target_date: date
-    forecast_aqi: int
-    model_name: str
+app.include_router(forecasts.router)
+app.include_router(history.router)
+app.include_router(export.router)
+app.include_router(nearest.router)
+app.include_router(grid.router)
 
 
 @app.get("/health")
@@ -31,51 +66,37 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Pipeline stage telemetry in the Prometheus text exposition format.
+    """
+    async with get_async_engine().connect() as conn:
+        body = await conn.run_sync(render_prometheus)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+async def build_latest_forecasts() -> bytes:
+    """
+    Query the latest forecast per location and encode it as JSON bytes.
+    """
+    async with get_async_engine().connect() as conn:
+        rows = await fetch_latest_forecasts(conn)
+
+    return forecast_list.dump_json(forecast_list.validate_python(rows))
+
+
 @app.get("/forecasts/latest", response_model=List[ForecastOut])
-def get_latest_forecasts():
+async def get_latest_forecasts(if_none_match: Optional[str] = Header(default=None)):
     """
     Return the latest forecast per location from the database.
 
-    For each location_id, we find the most recent target_date in the forecasts table.
+    The encoded response is cached until the pipeline writes new forecasts.
+    Clients that send back the ETag get 304 Not Modified while it is unchanged.
     """
-    engine = get_engine()
-
-    sql = text(
-        """
-        SELECT
-            f.location_id,
-            l.name AS location_name,
-            f.target_date,
-            f.forecast_aqi,
-            f.model_name
-        FROM forecasts f
-        JOIN (
-            SELECT location_id, MAX(target_date) AS max_date
-            FROM forecasts
-            GROUP BY location_id
-        ) latest
-          ON f.location_id = latest.location_id
-         AND f.target_date = latest.max_date
-        JOIN locations l
-          ON l.id = f.location_id
-        ORDER BY f.location_id;
-        """
-    )
-
-    with engine.connect() as conn:
-        result = conn.execute(sql)
-        rows = result.fetchall()
-
-    forecasts: List[ForecastOut] = []
-    for row in rows:
-        forecasts.append(
-            ForecastOut(
-                location_id=row.location_id,
-                location_name=row.location_name,
-                target_date=row.target_date,
-                forecast_aqi=row.forecast_aqi,
-                model_name=row.model_name,
-            )
-        )
-
-    return forecasts
+    entry = await forecast_cache.get_or_build(LATEST_FORECASTS_KEY, build_latest_forecasts)
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
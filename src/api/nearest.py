@@ -0,0 +1,147 @@
+"""
+/forecasts/nearest: latest forecasts for the k locations closest to a point.
+
+The locations table is held in memory as a src.spatial.LocationIndex
+(KD-tree), so the lookup itself takes microseconds. Only the forecasts
+of the k matches are then read from the database.
+
+The index is rebuilt lazily on the first request after the locations
+trigger NOTIFYs LOCATIONS_CHANNEL, and at least every INDEX_TTL_SECONDS
+in case a notification was missed. Concurrent requests that find the
+index stale share a single rebuild.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Query
+from pydantic import BaseModel
+from sqlalchemy import text
+
+from src.db.async_connection import get_async_engine
+from src.spatial import LocationIndex
+
+INDEX_TTL_SECONDS = 600.0
+MAX_K = 50
+
+# One row per location: the newest forecast for its latest target date.
+# Several models forecast the same date; the most recently written wins,
+# then the model name, so the choice never depends on row order.
+NEAREST_FORECASTS_SQL = """
+    SELECT DISTINCT ON (f.location_id)
+           f.location_id, f.target_date, f.forecast_aqi, f.model_name
+    FROM forecasts f
+    WHERE f.location_id = ANY(:location_ids)
+    ORDER BY f.location_id, f.target_date DESC, f.created_at DESC, f.model_name
+"""
+
+router = APIRouter()
+
+
+class NearestForecastOut(BaseModel):
+    location_id: int
+    location_name: str
+    latitude: float
+    longitude: float
+    distance_km: float
+    target_date: Optional[date] = None
+    forecast_aqi: Optional[int] = None
+    model_name: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class LocationSnapshot:
+    index: LocationIndex
+    places: Dict[int, Tuple[str, float, float]]  # id -> (name, latitude, longitude)
+
+
+class LocationIndexCache:
+    def __init__(self, ttl_seconds: float = INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[LocationSnapshot] = None
+        self._built_at = 0.0
+        self._stale = True
+        self._lock: Optional[asyncio.Lock] = None
+
+    def invalidate(self) -> None:
+        # Called from the listener thread; a flag flip is enough.
+        self._stale = True
+
+    def _fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and not self._stale
+            and time.monotonic() - self._built_at < self.ttl_seconds
+        )
+
+    async def get(self) -> LocationSnapshot:
+        if self._fresh():
+            return self._snapshot
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._fresh():
+                self._stale = False  # a NOTIFY during the rebuild sets it again
+                await self._rebuild()
+        return self._snapshot
+
+    async def _rebuild(self) -> None:
+        async with get_async_engine().connect() as conn:
+            rows = (await conn.execute(text("""
+                SELECT id, name, latitude, longitude
+                FROM locations
+                WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+                ORDER BY id
+            """))).all()
+
+        self._snapshot = LocationSnapshot(
+            index=LocationIndex(
+                [r.id for r in rows], [r.latitude for r in rows], [r.longitude for r in rows]
+            ),
+            places={r.id: (r.name, r.latitude, r.longitude) for r in rows},
+        )
+        self._built_at = time.monotonic()
+
+
+location_index = LocationIndexCache()
+
+
+@router.get("/forecasts/nearest", response_model=List[NearestForecastOut])
+async def get_nearest_forecasts(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(default=1, ge=1, le=MAX_K),
+):
+    """
+    Latest forecast for the k locations nearest to (lat, lon), closest first.
+    Locations without a forecast yet are returned with empty forecast fields.
+    """
+    snapshot = await location_index.get()
+    ids, distances = snapshot.index.nearest(lat, lon, k)
+    if len(ids) == 0:
+        return []
+
+    async with get_async_engine().connect() as conn:
+        result = await conn.execute(
+            text(NEAREST_FORECASTS_SQL), {"location_ids": ids.tolist()}
+        )
+    by_location = {f["location_id"]: f for f in result.mappings().all()}
+
+    results: List[NearestForecastOut] = []
+    for loc_id, km in zip(ids.tolist(), distances.tolist()):
+        name, latitude, longitude = snapshot.places[loc_id]
+        forecast = by_location.get(loc_id, {})
+        results.append(NearestForecastOut(
+            location_id=loc_id,
+            location_name=name,
+            latitude=latitude,
+            longitude=longitude,
+            distance_km=round(km, 3),
+            target_date=forecast.get("target_date"),
+            forecast_aqi=forecast.get("forecast_aqi"),
+            model_name=forecast.get("model_name"),
+        ))
+    return results
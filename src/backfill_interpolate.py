@@ -1,102 +1,193 @@
 """
-One-time backfill: linearly interpolate missing daily_aggregates rows.
+Backfill: linearly interpolate missing daily_aggregates rows.
 
-Adds is_interpolated column if not present, then fills gaps up to
-MAX_GAP_DAYS using linear interpolation between surrounding known values.
-Gaps larger than MAX_GAP_DAYS are skipped as too uncertain to estimate.
+Fills gaps up to MAX_GAP_DAYS using linear interpolation between the
+surrounding real (non-interpolated) values and flags the new rows with
+is_interpolated = TRUE. Gaps larger than MAX_GAP_DAYS are skipped as too
+uncertain to estimate.
+
+The fill is set-based: LEAD() pairs each real row with the next real row
+of the same location, generate_series() expands every gap into its missing
+dates, and all interpolated rows go in with one INSERT ... SELECT.
+
+Runs are incremental. Only gaps with a bounding real row whose updated_at
+is past the 'backfill' watermark are recomputed, and existing interpolated
+rows inside them are refreshed. That keeps it cheap enough to run after
+every aggregation. Pass --full to rescan the whole history.
 """
-from datetime import timedelta
+import argparse
+from collections import Counter
+from typing import Optional
 
 from sqlalchemy import text
 
 from src.db.connection import get_engine
+from src.db.migrations import add_missing_columns, ensure_once, relation_exists
 from src.config.settings import print_settings_summary
+from src.telemetry import record, tracked_stage
 
 MAX_GAP_DAYS = 7
+WATERMARK_NAME = "backfill"
+# The next run starts slightly before this run did, so rows committed by an
+# aggregation that overlapped with this run are still picked up.
+WATERMARK_OVERLAP = "5 minutes"
+
+# Gaps between consecutive real rows for locations that changed since :since
+# (every location when :since is NULL), with the bounding values needed to
+# interpolate.
+GAPS_CTE = """
+    WITH changed AS (
+        SELECT DISTINCT location_id
+        FROM daily_aggregates
+        WHERE is_interpolated = FALSE
+          AND (
+              CAST(:since AS timestamptz) IS NULL
+              OR updated_at > CAST(:since AS timestamptz)
+          )
+    ),
+    bounds AS (
+        SELECT
+            da.location_id,
+            da.date,
+            da.max_aqi,
+            da.mean_aqi,
+            da.min_aqi,
+            da.updated_at,
+            LEAD(da.date)       OVER w AS next_date,
+            LEAD(da.max_aqi)    OVER w AS next_max_aqi,
+            LEAD(da.mean_aqi)   OVER w AS next_mean_aqi,
+            LEAD(da.min_aqi)    OVER w AS next_min_aqi,
+            LEAD(da.updated_at) OVER w AS next_updated_at
+        FROM daily_aggregates da
+        JOIN changed c ON c.location_id = da.location_id
+        WHERE da.is_interpolated = FALSE
+        WINDOW w AS (PARTITION BY da.location_id ORDER BY da.date)
+    ),
+    gaps AS (
+        SELECT *, next_date - date - 1 AS gap_days
+        FROM bounds
+        WHERE next_date - date > 1
+          AND (
+              CAST(:since AS timestamptz) IS NULL
+              OR updated_at > CAST(:since AS timestamptz)
+              OR next_updated_at > CAST(:since AS timestamptz)
+          )
+    )
+"""
 
+INTERPOLATE_SQL = GAPS_CTE + """
+    INSERT INTO daily_aggregates
+        (location_id, date, max_aqi, mean_aqi, min_aqi, is_interpolated)
+    SELECT
+        g.location_id,
+        d.day::date,
+        ROUND(g.max_aqi + (g.next_max_aqi - g.max_aqi) * t.frac)::integer,
+        g.mean_aqi + (g.next_mean_aqi - g.mean_aqi) * t.frac,
+        ROUND(g.min_aqi + (g.next_min_aqi - g.min_aqi) * t.frac)::integer,
+        TRUE
+    FROM gaps g
+    CROSS JOIN LATERAL generate_series(
+        g.date + 1, g.next_date - 1, INTERVAL '1 day'
+    ) AS d(day)
+    CROSS JOIN LATERAL (
+        SELECT (d.day::date - g.date)::double precision / (g.next_date - g.date) AS frac
+    ) t
+    WHERE g.gap_days <= :max_gap_days
+    ON CONFLICT (location_id, date) DO UPDATE
+    SET
+        max_aqi  = EXCLUDED.max_aqi,
+        mean_aqi = EXCLUDED.mean_aqi,
+        min_aqi  = EXCLUDED.min_aqi
+    WHERE daily_aggregates.is_interpolated
+    RETURNING location_id
+"""
 
-def lerp(a: float, b: float, t: float) -> float:
-    return a + (b - a) * t
-
+OVERSIZED_GAPS_SQL = GAPS_CTE + """
+    SELECT location_id, date + 1 AS gap_start, next_date - 1 AS gap_end, gap_days
+    FROM gaps
+    WHERE gap_days > :max_gap_days
+    ORDER BY location_id, date
+"""
 
-def run_backfill() -> None:
-    print_settings_summary()
-    engine = get_engine()
 
-    with engine.begin() as conn:
+def ensure_backfill_schema(conn) -> None:
+    """
+    Add the columns, index and watermark table the incremental fill relies
+    on, for databases created before they were part of schema.sql. Only
+    what the catalog says is missing is created (src.db.migrations).
+    """
+    add_missing_columns(conn, "daily_aggregates", {
+        "is_interpolated": "BOOLEAN NOT NULL DEFAULT FALSE",
+        "updated_at": "TIMESTAMPTZ NOT NULL DEFAULT NOW()",
+    })
+    if not relation_exists(conn, "ix_daily_aggregates_updated_at"):
         conn.execute(text("""
-            ALTER TABLE daily_aggregates
-            ADD COLUMN IF NOT EXISTS is_interpolated BOOLEAN NOT NULL DEFAULT FALSE
+            CREATE INDEX IF NOT EXISTS ix_daily_aggregates_updated_at
+            ON daily_aggregates (updated_at)
+        """))
+    if not relation_exists(conn, "pipeline_watermarks"):
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS pipeline_watermarks (
+                name TEXT PRIMARY KEY,
+                watermark TIMESTAMPTZ NOT NULL
+            )
         """))
 
-        locations = conn.execute(text(
-            "SELECT id, name FROM locations ORDER BY id"
-        )).mappings().all()
-
-        total_inserted = 0
 
-        for loc in locations:
-            loc_id = loc["id"]
-            name = loc["name"]
+def get_watermark(conn, name: str):
+    return conn.execute(
+        text("SELECT watermark FROM pipeline_watermarks WHERE name = :name"),
+        {"name": name},
+    ).scalar_one_or_none()
 
-            rows = conn.execute(text("""
-                SELECT date, max_aqi, mean_aqi, min_aqi
-                FROM daily_aggregates
-                WHERE location_id = :loc_id
-                  AND is_interpolated = FALSE
-                ORDER BY date
-            """), {"loc_id": loc_id}).mappings().all()
 
-            if len(rows) < 2:
-                print(f"⚠️  {name}: not enough data to interpolate, skipping.")
-                continue
+def set_watermark(conn, name: str, value) -> None:
+    conn.execute(text("""
+        INSERT INTO pipeline_watermarks (name, watermark)
+        VALUES (:name, :value)
+        ON CONFLICT (name) DO UPDATE SET watermark = EXCLUDED.watermark
+    """), {"name": name, "value": value})
 
-            inserted = 0
 
-            for i in range(len(rows) - 1):
-                before = rows[i]
-                after = rows[i + 1]
+@tracked_stage("backfill")
+def run_backfill(full: bool = False) -> None:
+    print_settings_summary()
+    engine = get_engine()
+    ensure_once(ensure_backfill_schema)
 
-                gap_start = before["date"] + timedelta(days=1)
-                gap_end = after["date"]
+    with engine.begin() as conn:
+        run_started = conn.execute(
+            text(f"SELECT NOW() - INTERVAL '{WATERMARK_OVERLAP}'")
+        ).scalar_one()
+        since: Optional[object] = None if full else get_watermark(conn, WATERMARK_NAME)
+        print(f"\nInterpolating gaps changed since: {since or 'the beginning'}")
 
-                if gap_start >= gap_end:
-                    continue
+        names = dict(conn.execute(text("SELECT id, name FROM locations")).all())
+        params = {"since": since, "max_gap_days": MAX_GAP_DAYS}
 
-                gap_days = (gap_end - gap_start).days
-                span_days = (after["date"] - before["date"]).days
+        for gap in conn.execute(text(OVERSIZED_GAPS_SQL), params).mappings():
+            print(
+                f"  ⚠️  {names.get(gap['location_id'], gap['location_id'])}: gap "
+                f"{gap['gap_start']} → {gap['gap_end']} ({gap['gap_days']}d) "
+                f"exceeds limit, skipping."
+            )
 
-                if gap_days > MAX_GAP_DAYS:
-                    print(
-                        f"  ⚠️  {name}: gap {gap_start} → {gap_end - timedelta(days=1)}"
-                        f" ({gap_days}d) exceeds limit, skipping."
-                    )
-                    continue
+        inserted = Counter(
+            row.location_id for row in conn.execute(text(INTERPOLATE_SQL), params)
+        )
 
-                for d in range(gap_days):
-                    missing_date = gap_start + timedelta(days=d)
-                    t = (missing_date - before["date"]).days / span_days
+        for loc_id, count in sorted(inserted.items()):
+            print(f"✅ {names.get(loc_id, loc_id)}: interpolated {count} day(s).")
 
-                    conn.execute(text("""
-                        INSERT INTO daily_aggregates
-                            (location_id, date, max_aqi, mean_aqi, min_aqi, is_interpolated)
-                        VALUES
-                            (:loc_id, :date, :max_aqi, :mean_aqi, :min_aqi, TRUE)
-                        ON CONFLICT (location_id, date) DO NOTHING
-                    """), {
-                        "loc_id": loc_id,
-                        "date": missing_date,
-                        "max_aqi": round(lerp(before["max_aqi"], after["max_aqi"], t)),
-                        "mean_aqi": lerp(before["mean_aqi"], after["mean_aqi"], t),
-                        "min_aqi": round(lerp(before["min_aqi"], after["min_aqi"], t)),
-                    })
-                    inserted += 1
+        set_watermark(conn, WATERMARK_NAME, run_started)
 
-            print(f"✅ {name}: interpolated {inserted} day(s).")
-            total_inserted += inserted
+    record(rows_written=sum(inserted.values()))
 
-    print(f"\nDone. Total interpolated rows inserted: {total_inserted}")
+    print(f"\nDone. Total interpolated rows upserted: {sum(inserted.values())}")
 
 
 if __name__ == "__main__":
-    run_backfill()
+    parser = argparse.ArgumentParser(description="Interpolate gaps in daily_aggregates.")
+    parser.add_argument("--full", action="store_true", help="Rescan all history.")
+    args = parser.parse_args()
+    run_backfill(full=args.full)
@@ -0,0 +1,273 @@
+"""
+Unified command line entry point:
+
+    aqi ingest | aggregate | backfill | evaluate | train | forecast | deliver
+    aqi archive        # move old observations to Parquet (src.retention)
+    aqi grid           # interpolate the latest AQI onto a lat/lon grid (src.grid)
+    aqi run            # whole pipeline through src.orchestrate
+    aqi worker         # event-driven aggregation/forecasting (src.event_worker)
+    aqi shard-worker   # one of N workers splitting locations (src.shard_worker)
+    aqi serve          # the FastAPI app under uvicorn
+    aqi import-times forecast train   # where start-up time goes
+    aqi --profile --slow-query-ms 200 forecast   # cProfile + slow-query log
+
+Only argparse is imported up front. Each subcommand imports its stage
+module when it runs, so `aqi ingest` never loads pandas or scikit-learn
+and cron ticks start in a fraction of a second.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Module each subcommand imports; also what import-times measures.
+COMMAND_MODULES: Dict[str, str] = {
+    "ingest": "src.ingest.ingest_airnow",
+    "aggregate": "src.features.build_features",
+    "backfill": "src.backfill_interpolate",
+    "evaluate": "src.evaluate_forecasts",
+    "train": "src.models.train_ml_model",
+    "forecast": "src.forecast_and_notify",
+    "deliver": "src.deliver_notifications",
+    "archive": "src.retention",
+    "grid": "src.grid",
+    "run": "src.orchestrate",
+    "worker": "src.event_worker",
+    "shard-worker": "src.shard_worker",
+    "serve": "src.api.main",
+}
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+# --- subcommand handlers ------------------------------------------------------
+
+def _ingest(args) -> int:
+    from src.ingest.ingest_airnow import run_ingestion
+    run_ingestion()
+    return 0
+
+
+def _aggregate(args) -> int:
+    from src.features.build_features import run_daily_aggregation
+    run_daily_aggregation()
+    return 0
+
+
+def _backfill(args) -> int:
+    from src.backfill_interpolate import run_backfill
+    run_backfill(full=args.full)
+    return 0
+
+
+def _evaluate(args) -> int:
+    from src.evaluate_forecasts import run_evaluation
+    run_evaluation(full=args.full)
+    return 0
+
+
+def _train(args) -> int:
+    if args.baseline:
+        from src.models.baseline_model import STRATEGIES
+        from src.models.train_model import BASELINE_MODEL_PATH, train_and_save
+        if args.strategy not in STRATEGIES:
+            print(f"❌ Unknown strategy {args.strategy!r}; choose from: {', '.join(STRATEGIES)}")
+            return 2
+        train_and_save(BASELINE_MODEL_PATH, strategy=args.strategy)
+    else:
+        from src.models.train_ml_model import main as train_random_forest
+        train_random_forest(pollutant_lags=args.pollutant_lags)
+    return 0
+
+
+def _forecast(args) -> int:
+    from src.forecast_and_notify import run_forecast_and_notify
+    run_forecast_and_notify()
+    return 0
+
+
+def _deliver(args) -> int:
+    from src.deliver_notifications import main as deliver
+    deliver(["--loop"] if args.loop else [])
+    return 0
+
+
+def _archive(args) -> int:
+    from src.retention import OBSERVATION_RETENTION_DAYS, run_retention
+    run_retention(OBSERVATION_RETENTION_DAYS if args.days is None else args.days,
+                  vacuum=not args.no_vacuum)
+    return 0
+
+
+def _grid(args) -> int:
+    from src.config.settings import GRID_BOUNDS, GRID_RESOLUTION_KM
+    from src.grid import SOURCES, GridSpec, run_grid
+    spec = GridSpec.from_bounds(GRID_BOUNDS, args.resolution_km or GRID_RESOLUTION_KM)
+    run_grid(args.source or SOURCES, spec)
+    return 0
+
+
+def _run(args) -> int:
+    from src.orchestrate import main as orchestrate
+    return orchestrate(["--force"] if args.force else [])
+
+
+def _worker(args) -> int:
+    from src.event_worker import DEBOUNCE_SECONDS, MAX_BATCH_WAIT_SECONDS, Debouncer, run_worker
+    run_worker(Debouncer(
+        DEBOUNCE_SECONDS if args.debounce is None else args.debounce,
+        MAX_BATCH_WAIT_SECONDS if args.max_wait is None else args.max_wait,
+    ))
+    return 0
+
+
+def _shard_worker(args) -> int:
+    from src.shard_worker import CYCLE_SECONDS, run_worker
+    run_worker(CYCLE_SECONDS if args.interval is None else args.interval, args.once)
+    return 0
+
+
+def _serve(args) -> int:
+    import uvicorn
+    uvicorn.run("src.api.main:app", host=args.host, port=args.port, reload=args.reload)
+    return 0
+
+
+# --- import-time report -------------------------------------------------------
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Parse `python -X importtime` output into (module, self_us,
+    cumulative_us, depth) tuples, in the order Python printed them.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def summarize_import_times(
+    entries: Sequence[Tuple[str, int, int, int]],
+    top: int = 10,
+) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Total import time in seconds and the top packages by the time spent
+    importing their own modules (self time summed per top-level package).
+    """
+    total_us = sum(cumulative for _, _, cumulative, depth in entries if depth == 0)
+    per_package: Dict[str, int] = defaultdict(int)
+    for module, self_us, _, _ in entries:
+        per_package[module.split(".")[0]] += self_us
+    ranked = sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return total_us / 1e6, [(package, us / 1e6) for package, us in ranked]
+
+
+def _import_times(args) -> int:
+    unknown = sorted(set(args.commands) - set(COMMAND_MODULES))
+    if unknown:
+        print(f"❌ Unknown command(s): {', '.join(unknown)}")
+        return 2
+
+    for command in args.commands or sorted(COMMAND_MODULES):
+        module = COMMAND_MODULES[command]
+        # A fresh interpreter, so nothing is already cached in sys.modules.
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(f"❌ {command}: importing {module} failed")
+            print(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "")
+            continue
+
+        total, ranked = summarize_import_times(parse_importtime(proc.stderr), args.top)
+        print(f"\n{command} ({module}): {total:.3f}s to import")
+        for package, seconds in ranked:
+            print(f"  {package:<24} {seconds:7.3f}s")
+    return 0
+
+
+# --- parser -------------------------------------------------------------------
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="aqi", description="Oregon AQI forecasting pipeline.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write a cProfile report per stage to logs/profiles/ (AQI_PROFILE).")
+    parser.add_argument("--slow-query-ms", type=float, metavar="MS",
+                        help="Log SQL statements slower than MS to logs/slow_queries.jsonl (AQI_SLOW_QUERY_MS).")
+    sub = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    def add(name: str, handler: Callable, help_text: str) -> argparse.ArgumentParser:
+        cmd = sub.add_parser(name, help=help_text, description=help_text)
+        cmd.set_defaults(handler=handler)
+        return cmd
+
+    add("ingest", _ingest, "Fetch current AirNow observations.")
+    add("aggregate", _aggregate, "Build daily aggregates from recent observations.")
+    add("backfill", _backfill, "Interpolate gaps in daily_aggregates.").add_argument(
+        "--full", action="store_true", help="Rescan all history.")
+    add("evaluate", _evaluate, "Score forecasts against landed actuals.").add_argument(
+        "--full", action="store_true", help="Re-evaluate all history.")
+
+    train = add("train", _train, "Train the RandomForest model (or the baseline).")
+    train.add_argument("--baseline", action="store_true", help="Train the naive baseline instead.")
+    train.add_argument("--strategy", default="persistence", help="Baseline strategy (with --baseline).")
+    train.add_argument("--pollutant-lags", action="store_true", default=None,
+                       help="Add per-pollutant previous-day AQI features (default: AQI_POLLUTANT_LAGS).")
+
+    add("forecast", _forecast, "Forecast next-day AQI and queue alerts.")
+    add("deliver", _deliver, "Deliver queued notifications.").add_argument(
+        "--loop", action="store_true", help="Keep polling the outbox.")
+    archive = add("archive", _archive, "Move observations past the retention window to Parquet.")
+    archive.add_argument("--days", type=int, help="Days of observations to keep in the database.")
+    archive.add_argument("--no-vacuum", action="store_true", help="Skip VACUUM after archiving.")
+    grid = add("grid", _grid, "Interpolate the latest observations and forecasts onto a lat/lon grid.")
+    grid.add_argument("--source", nargs="+", choices=("observations", "forecasts"),
+                      help="Grids to build (default: both).")
+    grid.add_argument("--resolution-km", type=float,
+                      help="Cell size in km (default: AQI_GRID_RESOLUTION_KM).")
+    add("run", _run, "Run the whole pipeline as a dependency graph.").add_argument(
+        "--force", action="store_true", help="Run every stage even if its inputs are unchanged.")
+
+    worker = add("worker", _worker, "Aggregate and forecast as new observations arrive.")
+    worker.add_argument("--debounce", type=float,
+                        help="Quiet period before a batch is processed (seconds).")
+    worker.add_argument("--max-wait", type=float,
+                        help="Longest a pending batch waits during a steady stream (seconds).")
+
+    shard = add("shard-worker", _shard_worker, "Ingest, aggregate and forecast a share of the locations.")
+    shard.add_argument("--interval", type=float, help="Seconds between cycles.")
+    shard.add_argument("--once", action="store_true", help="Run one cycle and exit.")
+
+    serve = add("serve", _serve, "Serve the API with uvicorn.")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--reload", action="store_true")
+
+    report = add("import-times", _import_times, "Report import time per subcommand.")
+    report.add_argument("commands", nargs="*", metavar="command",
+                        help=f"Subcommands to measure: {', '.join(sorted(COMMAND_MODULES))} (default: all).")
+    report.add_argument("--top", type=int, default=10, help="Packages to list per command.")
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    # Set before any stage module (and so src.config.settings) is imported;
+    # also inherited by worker subprocesses.
+    if args.profile:
+        os.environ["AQI_PROFILE"] = "true"
+    if args.slow_query_ms is not None:
+        os.environ["AQI_SLOW_QUERY_MS"] = str(args.slow_query_ms)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,6 +19,43 @@ DATABASE_URL = (
     f"@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
 
+# The API uses asyncpg through SQLAlchemy's async engine; batch jobs keep
+# the psycopg2 URL above.
+ASYNC_DATABASE_URL = (
+    f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}"
+    f"@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+API_DB_POOL_SIZE = int(os.getenv("API_DB_POOL_SIZE", "10"))
+API_DB_MAX_OVERFLOW = int(os.getenv("API_DB_MAX_OVERFLOW", "10"))
+
+# Locations are split into this many shards (location_id % AQI_NUM_SHARDS)
+# for src.shard_worker. Every worker must use the same value.
+NUM_SHARDS = int(os.getenv("AQI_NUM_SHARDS", "8"))
+
+# Observations older than this are moved to Parquet under ARCHIVE_DIR by
+# src.retention; aggregation only ever reads the last two days.
+OBSERVATION_RETENTION_DAYS = int(os.getenv("OBSERVATION_RETENTION_DAYS", "90"))
+ARCHIVE_DIR = os.getenv("AQI_ARCHIVE_DIR", "data/archive/observations")
+
+# Train the RandomForest with each pollutant's previous-day max AQI as
+# extra features (see src.models.train_ml_model).
+POLLUTANT_LAGS = os.getenv("AQI_POLLUTANT_LAGS", "false").lower() in ("1", "true", "yes")
+
+# Gridded AQI surfaces (src.grid): the latest observations and forecasts
+# interpolated onto a lat/lon grid over AQI_GRID_BOUNDS
+# ("south,west,north,east", default Oregon) at AQI_GRID_RESOLUTION_KM.
+GRID_DIR = os.getenv("AQI_GRID_DIR", "data/grids")
+GRID_BOUNDS = os.getenv("AQI_GRID_BOUNDS", "41.99,-124.70,46.30,-116.46")
+GRID_RESOLUTION_KM = float(os.getenv("AQI_GRID_RESOLUTION_KM", "1.0"))
+GRID_NEIGHBORS = int(os.getenv("AQI_GRID_NEIGHBORS", "8"))
+GRID_POWER = float(os.getenv("AQI_GRID_POWER", "2"))
+
+# Opt-in diagnostics (src.profiling): cProfile every stage / API request,
+# and log SQL statements slower than AQI_SLOW_QUERY_MS (0 = off).
+PROFILE = os.getenv("AQI_PROFILE", "false").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("AQI_PROFILE_DIR", "logs/profiles")
+SLOW_QUERY_MS = float(os.getenv("AQI_SLOW_QUERY_MS", "0"))
+
 def print_settings_summary() -> None:
     """Helper to quickly see which DB we're pointing at (hides password)."""
     print("Database settings:")
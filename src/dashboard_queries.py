@@ -0,0 +1,129 @@
+"""
+Queries behind dashboard.py.
+
+Each reader filters by location and date in SQL and returns a compact
+frame through read_frame; location_id=None means every location. The
+dashboard wraps these in st.cache_data, keyed by its arguments.
+"""
+from datetime import date
+from typing import Optional
+
+import pandas as pd
+
+from src.db.frames import AQI, DATE, FLAG, LOCATION_ID, MEAN_AQI, NAME, read_frame
+
+DAILY_AGGREGATE_DTYPES = {
+    "location_id": LOCATION_ID, "name": NAME, "date": DATE, "max_aqi": AQI,
+    "mean_aqi": MEAN_AQI, "min_aqi": AQI, "is_interpolated": FLAG,
+}
+LATEST_FORECAST_DTYPES = {
+    "location_id": LOCATION_ID, "name": NAME, "target_date": DATE,
+    "forecast_aqi": AQI, "model_name": NAME,
+}
+FORECAST_VS_ACTUAL_DTYPES = {**LATEST_FORECAST_DTYPES, "actual_aqi": AQI}
+ACCURACY_DTYPES = {
+    "location": NAME, "model": NAME, "horizon_days": "int16", "window_days": "int16",
+    "end_date": DATE, "n": "int32", "mae": "float32", "rmse": "float32", "bias": "float32",
+}
+
+
+def location_filter(column: str, location_id: Optional[int]) -> str:
+    return "" if location_id is None else f"AND {column} = :location_id"
+
+
+def daily_aggregates_sql(location_id: Optional[int], weekly: bool) -> str:
+    where = f'WHERE da.date >= :cutoff {location_filter("da.location_id", location_id)}'
+    if weekly:
+        return f"""
+            SELECT da.location_id, l.name,
+                   date_trunc('week', da.date)::date AS date,
+                   MAX(da.max_aqi) AS max_aqi, AVG(da.mean_aqi) AS mean_aqi,
+                   MIN(da.min_aqi) AS min_aqi, BOOL_AND(da.is_interpolated) AS is_interpolated
+            FROM daily_aggregates da
+            JOIN locations l ON l.id = da.location_id
+            {where}
+            GROUP BY da.location_id, l.name, date_trunc('week', da.date)
+            ORDER BY l.name, date
+        """
+    return f"""
+        SELECT da.location_id, l.name, da.date, da.max_aqi, da.mean_aqi,
+               da.min_aqi, da.is_interpolated
+        FROM daily_aggregates da
+        JOIN locations l ON l.id = da.location_id
+        {where}
+        ORDER BY l.name, da.date
+    """
+
+
+def latest_forecasts_sql(location_id: Optional[int]) -> str:
+    return f"""
+        SELECT DISTINCT ON (f.location_id)
+               f.location_id, l.name, f.target_date, f.forecast_aqi, f.model_name
+        FROM forecasts f
+        JOIN locations l ON l.id = f.location_id
+        WHERE TRUE {location_filter("f.location_id", location_id)}
+        ORDER BY f.location_id, f.target_date DESC, f.created_at DESC
+    """
+
+
+def forecast_vs_actual_sql(location_id: Optional[int]) -> str:
+    return f"""
+        SELECT e.location_id, l.name, e.target_date, e.forecast_aqi, e.model_name,
+               e.actual_aqi
+        FROM forecast_evaluations e
+        JOIN locations l ON l.id = e.location_id
+        WHERE e.target_date >= :cutoff {location_filter("e.location_id", location_id)}
+        ORDER BY l.name, e.target_date
+    """
+
+
+def accuracy_sql(location_id: Optional[int]) -> str:
+    return f"""
+        SELECT l.name AS location, a.model_name AS model, a.horizon_days,
+               a.window_days, a.end_date, a.n, a.mae, a.rmse, a.bias
+        FROM forecast_accuracy a
+        JOIN locations l ON l.id = a.location_id
+        WHERE TRUE {location_filter("a.location_id", location_id)}
+        ORDER BY l.name, a.model_name, a.horizon_days, a.window_days
+    """
+
+
+def read_locations(conn) -> pd.DataFrame:
+    return read_frame(
+        conn, "SELECT id, name FROM locations ORDER BY name",
+        {"id": LOCATION_ID, "name": NAME},
+    )
+
+
+def read_daily_aggregates(conn, location_id: Optional[int], cutoff: date, weekly: bool) -> pd.DataFrame:
+    """
+    Aggregates from cutoff on for one location (or all when None).
+    With weekly=True, rows are rolled up to one per location per week.
+    """
+    return read_frame(
+        conn, daily_aggregates_sql(location_id, weekly), DAILY_AGGREGATE_DTYPES,
+        params={"cutoff": cutoff, "location_id": location_id},
+    )
+
+
+def read_latest_forecasts(conn, location_id: Optional[int]) -> pd.DataFrame:
+    """The forecast with the latest target date per location, by location name."""
+    return read_frame(
+        conn, latest_forecasts_sql(location_id), LATEST_FORECAST_DTYPES,
+        params={"location_id": location_id},
+    ).sort_values("name", ignore_index=True)
+
+
+def read_forecast_vs_actual(conn, location_id: Optional[int], cutoff: date) -> pd.DataFrame:
+    """Forecast/actual pairs scored by src.evaluate_forecasts."""
+    return read_frame(
+        conn, forecast_vs_actual_sql(location_id), FORECAST_VS_ACTUAL_DTYPES,
+        params={"cutoff": cutoff, "location_id": location_id},
+    )
+
+
+def read_accuracy(conn, location_id: Optional[int]) -> pd.DataFrame:
+    """Rolling accuracy summaries, one row per location/model/horizon/window."""
+    return read_frame(
+        conn, accuracy_sql(location_id), ACCURACY_DTYPES, params={"location_id": location_id},
+    )
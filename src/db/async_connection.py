@@ -0,0 +1,42 @@
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from src.config.settings import (
+    API_DB_MAX_OVERFLOW,
+    API_DB_POOL_SIZE,
+    ASYNC_DATABASE_URL,
+    SLOW_QUERY_MS,
+)
+
+
+_async_engine: AsyncEngine | None = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Return the API's shared async engine (asyncpg), creating it on first call.
+
+    Its pool is separate from the sync engine used by the batch pipeline.
+    The API opens it at startup and disposes it at shutdown via
+    dispose_async_engine(), so connections are never carried over from one
+    event loop to another.
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            pool_size=API_DB_POOL_SIZE,
+            max_overflow=API_DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+        )
+        if SLOW_QUERY_MS > 0:
+            from src.profiling import install_slow_query_log
+            install_slow_query_log(_async_engine.sync_engine, SLOW_QUERY_MS)
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    """Close all pooled connections and forget the engine."""
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
@@ -1,7 +1,7 @@
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 
-from src.config.settings import DATABASE_URL, print_settings_summary
+from src.config.settings import DATABASE_URL, SLOW_QUERY_MS, print_settings_summary
 
 
 _engine: Engine | None = None
@@ -13,10 +13,14 @@ def get_engine() -> Engine:
 
     Reusing one engine across the process lets SQLAlchemy manage a
     connection pool rather than opening a new connection every call.
+    With AQI_SLOW_QUERY_MS set, slow statements are logged (src.profiling).
     """
     global _engine
     if _engine is None:
         _engine = create_engine(DATABASE_URL, echo=False, future=True)
+        if SLOW_QUERY_MS > 0:
+            from src.profiling import install_slow_query_log
+            install_slow_query_log(_engine, SLOW_QUERY_MS)
     return _engine
 
 
@@ -0,0 +1,94 @@
+"""
+Chunked, compact-dtype DataFrame loading for the model and dashboard loaders.
+
+pd.read_sql fetches the whole result as Python objects and then infers
+int64/float64/object columns, so peak memory is several times the size
+of the data. read_frame instead streams the result from a server-side
+cursor CHUNK_ROWS at a time and converts each chunk straight to the
+dtypes the caller names, so at most one chunk is held as Python objects.
+
+The dtypes mapping is also the column list: the query must return
+exactly those columns, in that order.
+
+    df = read_frame(conn, "SELECT location_id, date, max_aqi FROM ...", {
+        "location_id": LOCATION_ID, "date": DATE, "max_aqi": AQI,
+    })
+
+Dates come back as datetime64[s]. That is the same 8 bytes per value as
+the default, but the downstream feature code relies on datetime
+arithmetic, which a 4-byte date32 column doesn't support.
+"""
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from sqlalchemy import text
+
+CHUNK_ROWS = 50_000
+
+# Shared dtypes for the common columns.
+LOCATION_ID = "int32"
+AQI = "int16"              # AQI tops out in the hundreds
+NULLABLE_AQI = "Int16"     # e.g. per-pollutant values, NULL when not reported
+MEAN_AQI = "float32"
+DATE = "datetime64[s]"
+NAME = "category"          # a few distinct values repeated on every row
+FLAG = "bool"
+
+
+def _column(values: Sequence[Any], dtype: str):
+    if dtype == "category":
+        return pd.Categorical(values)
+    if dtype[:1].isupper():  # pandas nullable extension types (Int16, Float32, ...)
+        return pd.array(values, dtype=dtype)
+    return np.asarray(values, dtype=dtype)
+
+
+def _empty(dtypes: Mapping[str, str]) -> pd.DataFrame:
+    return pd.DataFrame({name: _column([], dtype) for name, dtype in dtypes.items()})
+
+
+def _concat(chunks: List[pd.DataFrame], dtypes: Mapping[str, str]) -> pd.DataFrame:
+    if len(chunks) == 1:
+        return chunks[0]
+    categorical = [name for name, dtype in dtypes.items() if dtype == "category"]
+    merged = {name: union_categoricals([c[name] for c in chunks]) for name in categorical}
+    df = pd.concat([c.drop(columns=categorical) for c in chunks], ignore_index=True)
+    for name in categorical:
+        df[name] = merged[name]
+    return df[list(dtypes)]
+
+
+def read_frame(
+    conn,
+    sql: str,
+    dtypes: Mapping[str, str],
+    params: Optional[Dict[str, Any]] = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> pd.DataFrame:
+    """
+    Run sql on conn and return its rows as a DataFrame with the given
+    column dtypes, fetching chunk_rows rows at a time.
+    """
+    result = conn.execute(
+        text(sql),
+        params or {},
+        execution_options={"stream_results": True, "max_row_buffer": chunk_rows},
+    )
+    columns = list(result.keys())
+    if columns != list(dtypes):
+        result.close()
+        raise ValueError(f"Query returned columns {columns}, expected {list(dtypes)}")
+
+    chunks = []
+    for rows in result.partitions(chunk_rows):
+        values = list(zip(*rows))
+        chunks.append(pd.DataFrame({
+            name: _column(column, dtype)
+            for (name, dtype), column in zip(dtypes.items(), values)
+        }))
+
+    if not chunks:
+        return _empty(dtypes)
+    return _concat(chunks, dtypes)
@@ -3,6 +3,7 @@ from pathlib import Path
 from sqlalchemy import text
 
 from src.db.connection import get_engine
+from src.db.migrations import upgrade_schema
 from src.config.settings import print_settings_summary
 
 
@@ -22,7 +23,8 @@ def get_schema_sql() -> str:
 
 def init_db() -> None:
     """
-    Initialize the database schema by executing schema.sql.
+    Initialize the database schema by executing schema.sql, then add
+    anything an older database is missing (src.db.migrations).
     """
     print_settings_summary()
 
@@ -34,6 +36,8 @@ def init_db() -> None:
     # Use exec_driver_sql so we can execute a multi-statement SQL script.
     with engine.begin() as conn:
         conn.exec_driver_sql(sql)
+        # CREATE TABLE IF NOT EXISTS leaves older tables as they were.
+        upgrade_schema(conn)
 
     print("✅ Database schema initialized successfully.")
 
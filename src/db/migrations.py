@@ -0,0 +1,78 @@
+"""
+Catalog-checked schema upgrades for databases created before a column or
+index was part of sql/schema.sql.
+
+ALTER TABLE takes an ACCESS EXCLUSIVE lock on the table even when
+ADD COLUMN IF NOT EXISTS turns out to be a no-op, and CREATE INDEX IF NOT
+EXISTS takes a SHARE lock before it checks the name. So the helpers here
+look in the catalog first and only run DDL for what is actually missing.
+On an up-to-date database they are plain reads.
+
+Stages call their ensure_* helper once per process, in its own short
+transaction, before the transaction that does the work; init_db runs all
+of them as a one-time migration.
+"""
+from typing import Callable, Iterable, List, Mapping, Set
+
+from sqlalchemy import text
+
+from src.db.connection import get_engine
+
+_applied: Set[Callable] = set()
+
+
+def missing_columns(conn, table: str, columns: Iterable[str]) -> List[str]:
+    present = set(conn.execute(text("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :table
+    """), {"table": table}).scalars())
+    return [column for column in columns if column not in present]
+
+
+def relation_exists(conn, name: str) -> bool:
+    """True if a table or index called name exists in the search path."""
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar_one()
+
+
+def add_missing_columns(conn, table: str, columns: Mapping[str, str]) -> List[str]:
+    """
+    ALTER TABLE table ADD COLUMN for each name -> type in columns that the
+    table doesn't have yet. Returns the columns added.
+    """
+    added = missing_columns(conn, table, columns)
+    for column in added:
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {columns[column]}"
+        ))
+    return added
+
+
+def ensure_once(ensure: Callable[..., None]) -> None:
+    """
+    Run ensure(conn) in its own transaction the first time it is asked for
+    in this process, so no DDL lock is ever held by a stage's main
+    transaction.
+    """
+    if ensure in _applied:
+        return
+    with get_engine().begin() as conn:
+        ensure(conn)
+    _applied.add(ensure)
+
+
+def upgrade_schema(conn) -> None:
+    """Bring an older database up to sql/schema.sql; a no-op when it already is."""
+    # Imported here: the stage modules import this one.
+    from src.alerts import ensure_notification_tables
+    from src.backfill_interpolate import ensure_backfill_schema
+    from src.evaluate_forecasts import ensure_evaluation_schema
+    from src.features.build_features import ensure_pollutant_columns
+    from src.forecast_and_notify import ensure_alert_state_table, ensure_forecast_columns
+
+    ensure_backfill_schema(conn)
+    ensure_pollutant_columns(conn)
+    ensure_evaluation_schema(conn)
+    ensure_forecast_columns(conn)
+    ensure_alert_state_table(conn)
+    ensure_notification_tables(conn)
@@ -0,0 +1,138 @@
+"""
+Postgres LISTEN/NOTIFY helpers.
+
+notify() is called inside a write transaction; Postgres delivers the
+message only when that transaction commits, so listeners never see a
+change that was rolled back.
+
+OBSERVATIONS_CHANNEL carries the (location_id, date) pairs that gained
+new observations as a JSON list of [location_id, "YYYY-MM-DD"] pairs,
+split over several notifications if needed to stay under Postgres'
+8000-byte payload limit.
+
+NotificationListener holds one dedicated connection (detached from the
+engine's pool) in autocommit mode and waits on its socket, so listening
+costs no queries while nothing happens.
+"""
+import json
+import select
+from datetime import date
+from typing import Iterable, List, Set, Tuple
+
+from sqlalchemy import text
+
+from src.db.connection import get_engine
+
+FORECASTS_CHANNEL = "forecasts_updated"
+LOCATIONS_CHANNEL = "locations_changed"
+OBSERVATIONS_CHANNEL = "observations_inserted"
+
+MAX_PAYLOAD_BYTES = 7900  # Postgres rejects payloads of 8000 bytes or more
+
+
+def notify(conn, channel: str, payload: str = "") -> None:
+    conn.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": channel, "payload": payload},
+    )
+
+
+def encode_location_dates(pairs: Iterable[Tuple[int, date]]) -> List[str]:
+    """
+    Encode (location_id, date) pairs as one or more JSON payloads, each
+    under MAX_PAYLOAD_BYTES.
+    """
+    payloads: List[str] = []
+    chunk: List[str] = []
+    size = 2  # the enclosing brackets
+    for loc_id, day in sorted(set(pairs)):
+        item = json.dumps([int(loc_id), day.isoformat()])
+        if chunk and size + len(item) + 1 > MAX_PAYLOAD_BYTES:
+            payloads.append("[" + ",".join(chunk) + "]")
+            chunk, size = [], 2
+        chunk.append(item)
+        size += len(item) + 1
+    if chunk:
+        payloads.append("[" + ",".join(chunk) + "]")
+    return payloads
+
+
+def decode_location_dates(payload: str) -> Set[Tuple[int, date]]:
+    return {(int(loc_id), date.fromisoformat(day)) for loc_id, day in json.loads(payload)}
+
+
+def notify_observations(conn, pairs: Iterable[Tuple[int, date]]) -> None:
+    """NOTIFY OBSERVATIONS_CHANNEL with the (location_id, date) pairs that changed."""
+    for payload in encode_location_dates(pairs):
+        notify(conn, OBSERVATIONS_CHANNEL, payload)
+
+
+def ensure_locations_trigger() -> None:
+    """
+    Make every write to locations NOTIFY LOCATIONS_CHANNEL, for databases
+    initialized before the trigger was part of schema.sql.
+    """
+    with get_engine().begin() as conn:
+        installed = conn.execute(text("""
+            SELECT 1 FROM pg_trigger
+            WHERE tgname = 'trg_locations_changed'
+              AND tgrelid = 'locations'::regclass
+        """)).scalar_one_or_none()
+        if installed:
+            return
+
+        conn.execute(text(f"""
+            CREATE OR REPLACE FUNCTION notify_locations_changed() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('{LOCATIONS_CHANNEL}', '');
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """))
+        conn.execute(text("""
+            CREATE TRIGGER trg_locations_changed
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON locations
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_locations_changed()
+        """))
+
+
+class NotificationListener:
+    """
+    Blocking listener for one or more channels:
+
+        with NotificationListener([FORECASTS_CHANNEL]) as listener:
+            while True:
+                for note in listener.poll(timeout=5.0):
+                    print(note.channel, note.payload)
+    """
+
+    def __init__(self, channels: Iterable[str]):
+        self.channels = list(channels)
+        self._conn = None
+
+    def __enter__(self) -> "NotificationListener":
+        pooled = get_engine().raw_connection()
+        pooled.detach()  # keep this long-lived connection out of the pool
+        self._conn = pooled.dbapi_connection
+        self._conn.autocommit = True
+        with self._conn.cursor() as cur:
+            for channel in self.channels:
+                cur.execute(f'LISTEN "{channel}"')
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def poll(self, timeout: float) -> List:
+        """
+        Wait up to timeout seconds and return the notifications received
+        (empty on timeout). Raises if the connection has been lost.
+        """
+        ready, _, _ = select.select([self._conn], [], [], timeout)
+        if ready:
+            self._conn.poll()
+        notes = list(self._conn.notifies)
+        self._conn.notifies.clear()
+        return notes
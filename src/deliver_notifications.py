@@ -0,0 +1,255 @@
+"""
+Delivery worker: drain notification_outbox and send alert emails.
+
+forecast_and_notify only queues alert / all-clear events in the outbox, so
+a slow SMTP server never holds up the forecast job. This worker claims due
+events in batches, fans each one out to the location's active subscribers
+(plus ALERT_EMAIL), and sends everything over a single SMTP session.
+
+A recipient with DIGEST_MIN_EVENTS or more events in one batch gets one
+digest email instead of a message per location.
+
+Claiming pushes next_attempt_at forward by CLAIM_LEASE, so a crashed worker's
+events become due again once the lease expires. Each successful send
+records (outbox_id, recipient) in notification_deliveries before moving on,
+so a retry only goes to recipients that have not been reached yet. Failed
+events are retried with a linear backoff and marked 'failed' after
+MAX_ATTEMPTS.
+
+Run once (e.g. from cron after forecasting) or keep it running with --loop.
+"""
+import argparse
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from src.db.connection import get_engine
+from src.db.migrations import ensure_once
+from src.config.settings import print_settings_summary
+from src.telemetry import record, tracked_stage
+from src.alerts import (
+    ALERT_EMAIL,
+    SMTPSession,
+    build_digest_message,
+    build_message,
+    ensure_notification_tables,
+)
+
+BATCH_SIZE = 200
+DIGEST_MIN_EVENTS = 3
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF_MINUTES = 5  # multiplied by the attempt number
+CLAIM_LEASE = "10 minutes"
+POLL_SECONDS = 30
+
+
+def claim_batch(batch_size: int = BATCH_SIZE) -> List[Dict[str, Any]]:
+    """
+    Lease up to batch_size due events. SKIP LOCKED lets several workers
+    drain the outbox concurrently without claiming the same rows.
+    """
+    with get_engine().begin() as conn:
+        rows = conn.execute(text(f"""
+            UPDATE notification_outbox o
+            SET next_attempt_at = NOW() + INTERVAL '{CLAIM_LEASE}'
+            WHERE o.id IN (
+                SELECT id
+                FROM notification_outbox
+                WHERE status = 'pending'
+                  AND next_attempt_at <= NOW()
+                ORDER BY id
+                LIMIT :batch_size
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING o.id, o.event_type, o.location_id, o.payload, o.attempts
+        """), {"batch_size": batch_size}).mappings().all()
+
+    return [dict(row) for row in rows]
+
+
+def load_recipients(location_ids: List[int]) -> Dict[int, List[str]]:
+    """Active subscribers per location, with ALERT_EMAIL added to every list."""
+    recipients: Dict[int, List[str]] = {loc_id: [] for loc_id in location_ids}
+
+    with get_engine().connect() as conn:
+        rows = conn.execute(text("""
+            SELECT location_id, email
+            FROM alert_subscribers
+            WHERE active AND location_id = ANY(:ids)
+            ORDER BY location_id, email
+        """), {"ids": location_ids}).all()
+
+    for loc_id, email in rows:
+        recipients[loc_id].append(email)
+
+    if ALERT_EMAIL:
+        for emails in recipients.values():
+            if ALERT_EMAIL not in emails:
+                emails.append(ALERT_EMAIL)
+
+    return recipients
+
+
+def load_delivered(outbox_ids: List[int]) -> Set[Tuple[int, str]]:
+    with get_engine().connect() as conn:
+        rows = conn.execute(text("""
+            SELECT outbox_id, recipient
+            FROM notification_deliveries
+            WHERE outbox_id = ANY(:ids)
+        """), {"ids": outbox_ids}).all()
+    return {(outbox_id, recipient) for outbox_id, recipient in rows}
+
+
+def plan_messages(
+    events: List[Dict[str, Any]],
+    recipients: Dict[int, List[str]],
+    delivered: Set[Tuple[int, str]],
+    digest_min_events: int = DIGEST_MIN_EVENTS,
+) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Group undelivered (event, recipient) pairs into emails.
+
+    Returns (recipient, events) pairs: a single event means one regular
+    message, several events mean one digest.
+    """
+    per_recipient: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for event in events:
+        for recipient in recipients.get(event["location_id"], []):
+            if (event["id"], recipient) not in delivered:
+                per_recipient[recipient].append(event)
+
+    messages: List[Tuple[str, List[Dict[str, Any]]]] = []
+    for recipient, pending in per_recipient.items():
+        if len(pending) >= digest_min_events:
+            messages.append((recipient, pending))
+        else:
+            messages.extend((recipient, [event]) for event in pending)
+    return messages
+
+
+def record_delivery(outbox_ids: List[int], recipient: str) -> None:
+    with get_engine().begin() as conn:
+        conn.execute(text("""
+            INSERT INTO notification_deliveries (outbox_id, recipient)
+            SELECT unnest(CAST(:ids AS bigint[])), :recipient
+            ON CONFLICT DO NOTHING
+        """), {"ids": outbox_ids, "recipient": recipient})
+
+
+def finish_batch(sent_ids: List[int], failed: Dict[int, str]) -> None:
+    """Mark fully delivered events sent; reschedule or fail the rest."""
+    with get_engine().begin() as conn:
+        if sent_ids:
+            conn.execute(text("""
+                UPDATE notification_outbox
+                SET status = 'sent', sent_at = NOW(), last_error = NULL
+                WHERE id = ANY(:ids)
+            """), {"ids": sent_ids})
+        if failed:
+            conn.execute(text(f"""
+                UPDATE notification_outbox o
+                SET attempts = o.attempts + 1,
+                    last_error = f.error,
+                    status = CASE WHEN o.attempts + 1 >= :max_attempts
+                                  THEN 'failed' ELSE 'pending' END,
+                    next_attempt_at = NOW()
+                        + (o.attempts + 1) * INTERVAL '{RETRY_BACKOFF_MINUTES} minutes'
+                FROM unnest(CAST(:ids AS bigint[]), CAST(:errors AS text[])) AS f(id, error)
+                WHERE o.id = f.id
+            """), {
+                "ids": list(failed),
+                "errors": list(failed.values()),
+                "max_attempts": MAX_ATTEMPTS,
+            })
+
+
+def deliver_batch(events: List[Dict[str, Any]], session: SMTPSession) -> Tuple[int, int]:
+    """
+    Send one claimed batch over an open session.
+    Returns (events fully delivered, events left for retry).
+    """
+    ids = [e["id"] for e in events]
+    recipients = load_recipients(sorted({e["location_id"] for e in events}))
+    delivered = load_delivered(ids)
+    failed: Dict[int, str] = {}
+
+    for recipient, batch in plan_messages(events, recipients, delivered):
+        if len(batch) == 1:
+            subject, body = build_message(batch[0]["event_type"], batch[0]["payload"])
+        else:
+            subject, body = build_digest_message(batch)
+
+        batch_ids = [e["id"] for e in batch]
+        try:
+            record(api_calls=1)
+            session.send(recipient, subject, body)
+        except Exception as exc:
+            for outbox_id in batch_ids:
+                failed[outbox_id] = f"{recipient}: {exc}"
+            continue
+
+        record_delivery(batch_ids, recipient)
+        print(f"📧 Sent to {recipient}: {subject}")
+
+    sent_ids = [i for i in ids if i not in failed]
+    finish_batch(sent_ids, failed)
+    record(rows_read=len(events), rows_written=len(sent_ids))
+    return len(sent_ids), len(failed)
+
+
+@tracked_stage("deliver")
+def run_delivery(batch_size: int = BATCH_SIZE) -> int:
+    """
+    Drain all currently due events. Returns the number delivered.
+    """
+    if not ALERT_EMAIL:
+        print("⚠️  ALERT_EMAIL not configured — leaving notifications queued.")
+        return 0
+
+    ensure_once(ensure_notification_tables)
+    total_sent = 0
+
+    events = claim_batch(batch_size)
+    if not events:
+        return 0
+
+    with SMTPSession() as session:
+        while events:
+            sent, failed = deliver_batch(events, session)
+            total_sent += sent
+            if failed:
+                print(f"⚠️  {failed} notification(s) failed; will retry later.")
+            events = claim_batch(batch_size)
+
+    return total_sent
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Deliver queued AQI notifications.")
+    parser.add_argument("--loop", action="store_true", help="Keep polling the outbox.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    print_settings_summary()
+    print("\nDelivering queued notifications...")
+
+    while True:
+        try:
+            sent = run_delivery(args.batch_size)
+        except Exception as exc:
+            if not args.loop:
+                raise
+            print(f"❌ Delivery run failed: {exc}")
+            sent = 0
+
+        if sent:
+            print(f"✅ Delivered {sent} notification(s).")
+        if not args.loop:
+            break
+        time.sleep(POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
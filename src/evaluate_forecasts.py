@@ -0,0 +1,243 @@
+"""
+Forecast evaluation: materialize forecast error as actuals land.
+
+forecast_evaluations holds one row per (location, target_date, model,
+horizon) once a real (non-interpolated) daily_aggregates row exists for
+the forecast's target date and that day is over (before CURRENT_DATE). The
+actual is that day's max_aqi, the same value the model is trained to
+predict.
+
+forecast_accuracy holds rolling MAE / RMSE / bias per (location, model,
+horizon) over the ACCURACY_WINDOWS_DAYS calendar days ending at the
+latest evaluated target date. Only groups that received new or changed
+evaluations in this run are recomputed, so the dashboard and API read
+accuracy straight from these tables instead of joining forecasts to
+aggregates on every request.
+
+Runs are incremental, like the backfill: only aggregates updated,
+forecasts created and days completed since the 'forecast_evaluations'
+watermark are joined. Pass --full to re-evaluate the whole history.
+"""
+import argparse
+from typing import Optional
+
+from sqlalchemy import text
+
+from src.backfill_interpolate import get_watermark, set_watermark
+from src.config.settings import print_settings_summary
+from src.db.connection import get_engine
+from src.db.migrations import add_missing_columns, ensure_once, relation_exists
+from src.telemetry import record, tracked_stage
+
+WATERMARK_NAME = "forecast_evaluations"
+WATERMARK_OVERLAP = "5 minutes"
+ACCURACY_WINDOWS_DAYS = (7, 30, 90)
+
+# Forecast/actual pairs where either side changed since :since (every
+# pair when :since is NULL). Only completed days count: today's max_aqi
+# is still filling in. A day's aggregate usually stops changing before
+# the day is over, so the third branch also picks up days that became
+# complete since :since (one extra day guards the watermark overlap).
+# The branches are a UNION rather than one OR so each can use its own
+# index.
+EVALUATE_SQL = """
+    WITH landed AS (
+        SELECT f.location_id, f.target_date, f.model_name, f.horizon_days,
+               f.forecast_aqi, da.max_aqi AS actual_aqi, f.exceedance_prob
+        FROM daily_aggregates da
+        JOIN forecasts f
+          ON f.location_id = da.location_id AND f.target_date = da.date
+        WHERE (CAST(:since AS timestamptz) IS NULL OR da.updated_at > CAST(:since AS timestamptz))
+          AND da.date < CURRENT_DATE
+          AND da.is_interpolated = FALSE
+          AND da.max_aqi IS NOT NULL
+          AND f.model_name IS NOT NULL
+        UNION
+        SELECT f.location_id, f.target_date, f.model_name, f.horizon_days,
+               f.forecast_aqi, da.max_aqi AS actual_aqi, f.exceedance_prob
+        FROM forecasts f
+        JOIN daily_aggregates da
+          ON da.location_id = f.location_id AND da.date = f.target_date
+        WHERE CAST(:since AS timestamptz) IS NOT NULL
+          AND f.created_at > CAST(:since AS timestamptz)
+          AND da.date < CURRENT_DATE
+          AND da.is_interpolated = FALSE
+          AND da.max_aqi IS NOT NULL
+          AND f.model_name IS NOT NULL
+        UNION
+        SELECT f.location_id, f.target_date, f.model_name, f.horizon_days,
+               f.forecast_aqi, da.max_aqi AS actual_aqi, f.exceedance_prob
+        FROM daily_aggregates da
+        JOIN forecasts f
+          ON f.location_id = da.location_id AND f.target_date = da.date
+        WHERE CAST(:since AS timestamptz) IS NOT NULL
+          AND da.date >= CAST(CAST(:since AS timestamptz) AS date) - 1
+          AND da.date < CURRENT_DATE
+          AND da.is_interpolated = FALSE
+          AND da.max_aqi IS NOT NULL
+          AND f.model_name IS NOT NULL
+    )
+    INSERT INTO forecast_evaluations (
+        location_id, target_date, model_name, horizon_days,
+        forecast_aqi, actual_aqi, error, exceedance_prob
+    )
+    SELECT location_id, target_date, model_name, horizon_days,
+           forecast_aqi, actual_aqi, forecast_aqi - actual_aqi, exceedance_prob
+    FROM landed
+    ON CONFLICT (location_id, model_name, horizon_days, target_date) DO UPDATE
+    SET forecast_aqi    = EXCLUDED.forecast_aqi,
+        actual_aqi      = EXCLUDED.actual_aqi,
+        error           = EXCLUDED.error,
+        exceedance_prob = EXCLUDED.exceedance_prob,
+        evaluated_at    = NOW()
+    WHERE (forecast_evaluations.forecast_aqi,
+           forecast_evaluations.actual_aqi,
+           forecast_evaluations.exceedance_prob)
+          IS DISTINCT FROM
+          (EXCLUDED.forecast_aqi, EXCLUDED.actual_aqi, EXCLUDED.exceedance_prob)
+    RETURNING location_id, model_name, horizon_days
+"""
+
+# Rolling summaries for the (location, model, horizon) groups passed in as
+# parallel arrays. Each window covers window_days calendar days ending at
+# the group's latest evaluated target date.
+ACCURACY_SQL = """
+    WITH groups AS (
+        SELECT *
+        FROM unnest(
+            CAST(:location_ids AS integer[]),
+            CAST(:model_names AS text[]),
+            CAST(:horizons AS integer[])
+        ) AS g(location_id, model_name, horizon_days)
+    ),
+    ends AS (
+        SELECT e.location_id, e.model_name, e.horizon_days, MAX(e.target_date) AS end_date
+        FROM forecast_evaluations e
+        JOIN groups g USING (location_id, model_name, horizon_days)
+        GROUP BY e.location_id, e.model_name, e.horizon_days
+    )
+    INSERT INTO forecast_accuracy (
+        location_id, model_name, horizon_days, window_days,
+        end_date, n, mae, rmse, bias
+    )
+    SELECT
+        x.location_id, x.model_name, x.horizon_days, w.window_days, x.end_date,
+        COUNT(*),
+        AVG(ABS(e.error))::double precision,
+        SQRT(AVG(e.error * e.error))::double precision,
+        AVG(e.error)::double precision
+    FROM ends x
+    CROSS JOIN unnest(CAST(:windows AS integer[])) AS w(window_days)
+    JOIN forecast_evaluations e
+      ON e.location_id = x.location_id
+     AND e.model_name = x.model_name
+     AND e.horizon_days = x.horizon_days
+     AND e.target_date > x.end_date - w.window_days
+    GROUP BY x.location_id, x.model_name, x.horizon_days, w.window_days, x.end_date
+    ON CONFLICT (location_id, model_name, horizon_days, window_days) DO UPDATE
+    SET end_date   = EXCLUDED.end_date,
+        n          = EXCLUDED.n,
+        mae        = EXCLUDED.mae,
+        rmse       = EXCLUDED.rmse,
+        bias       = EXCLUDED.bias,
+        updated_at = NOW()
+    RETURNING location_id
+"""
+
+
+def ensure_evaluation_schema(conn) -> None:
+    """
+    Create the evaluation tables and the forecasts columns / indexes the
+    incremental join relies on, for databases initialized before they were
+    part of schema.sql. Only what the catalog says is missing is created
+    (src.db.migrations).
+    """
+    add_missing_columns(conn, "forecasts", {
+        "horizon_days": "INTEGER NOT NULL DEFAULT 1",
+        "exceedance_prob": "DOUBLE PRECISION",
+    })
+    if not relation_exists(conn, "ix_forecasts_created_at"):
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_forecasts_created_at
+            ON forecasts (created_at)
+        """))
+    if not relation_exists(conn, "forecast_evaluations"):
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS forecast_evaluations (
+                location_id INTEGER NOT NULL REFERENCES locations(id),
+                target_date DATE NOT NULL,
+                model_name TEXT NOT NULL,
+                horizon_days INTEGER NOT NULL,
+                forecast_aqi INTEGER NOT NULL,
+                actual_aqi INTEGER NOT NULL,
+                error INTEGER NOT NULL,
+                exceedance_prob DOUBLE PRECISION,
+                evaluated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (location_id, model_name, horizon_days, target_date)
+            )
+        """))
+    if not relation_exists(conn, "forecast_accuracy"):
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS forecast_accuracy (
+                location_id INTEGER NOT NULL REFERENCES locations(id),
+                model_name TEXT NOT NULL,
+                horizon_days INTEGER NOT NULL,
+                window_days INTEGER NOT NULL,
+                end_date DATE NOT NULL,
+                n INTEGER NOT NULL,
+                mae DOUBLE PRECISION NOT NULL,
+                rmse DOUBLE PRECISION NOT NULL,
+                bias DOUBLE PRECISION NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (location_id, model_name, horizon_days, window_days)
+            )
+        """))
+    if not relation_exists(conn, "pipeline_watermarks"):
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS pipeline_watermarks (
+                name TEXT PRIMARY KEY,
+                watermark TIMESTAMPTZ NOT NULL
+            )
+        """))
+
+
+@tracked_stage("evaluate")
+def run_evaluation(full: bool = False) -> None:
+    print_settings_summary()
+    engine = get_engine()
+    ensure_once(ensure_evaluation_schema)
+
+    with engine.begin() as conn:
+        run_started = conn.execute(
+            text(f"SELECT NOW() - INTERVAL '{WATERMARK_OVERLAP}'")
+        ).scalar_one()
+        since: Optional[object] = None if full else get_watermark(conn, WATERMARK_NAME)
+        print(f"\nEvaluating forecasts with actuals changed since: {since or 'the beginning'}")
+
+        changed = conn.execute(text(EVALUATE_SQL), {"since": since}).all()
+        groups = sorted({tuple(row) for row in changed})
+
+        summaries = 0
+        if groups:
+            location_ids, model_names, horizons = (list(col) for col in zip(*groups))
+            summaries = len(conn.execute(text(ACCURACY_SQL), {
+                "location_ids": location_ids,
+                "model_names": model_names,
+                "horizons": horizons,
+                "windows": list(ACCURACY_WINDOWS_DAYS),
+            }).all())
+
+        set_watermark(conn, WATERMARK_NAME, run_started)
+
+    record(rows_written=len(changed) + summaries)
+
+    print(f"✅ Evaluations upserted: {len(changed)}")
+    print(f"✅ Accuracy summaries refreshed: {summaries} "
+          f"({len(groups)} location/model/horizon group(s))")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score forecasts against landed actuals.")
+    parser.add_argument("--full", action="store_true", help="Re-evaluate all history.")
+    args = parser.parse_args()
+    run_evaluation(full=args.full)
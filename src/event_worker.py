@@ -0,0 +1,138 @@
+"""
+Event-driven aggregation and forecasting.
+
+A long-running alternative to waiting for the next scheduled pipeline
+run. insert_observations NOTIFYs OBSERVATIONS_CHANNEL with the
+(location_id, date) pairs that gained rows; this worker LISTENs, merges
+bursts of notifications, then aggregates exactly those days and
+forecasts only the locations whose aggregates changed. A re-fetched hour
+inserts nothing, sends nothing and costs the worker nothing.
+
+Batches are debounced: processing starts once no new pairs have arrived
+for DEBOUNCE_SECONDS, or MAX_BATCH_WAIT_SECONDS after the first pair of a
+burst, whichever comes first. While nothing is pending the worker blocks
+on the listener socket without a timeout, so idle hours cost no queries.
+
+Notifications sent while the worker is disconnected are lost, so every
+(re)connect starts with one scheduled-style catch-up over the last two
+days. Each batch holds the pipeline advisory lock (see src.orchestrate)
+so it never overlaps a cron run.
+
+    python -m src.event_worker      # or: ./aqi worker
+"""
+import argparse
+import time
+from datetime import date
+from typing import Callable, Optional, Set, Tuple
+
+from src.config.settings import print_settings_summary
+from src.db.notify import OBSERVATIONS_CHANNEL, NotificationListener, decode_location_dates
+from src.orchestrate import pipeline_lock
+from src.telemetry import start_new_run
+
+DEBOUNCE_SECONDS = 2.0
+MAX_BATCH_WAIT_SECONDS = 15.0
+RECONNECT_SECONDS = 5.0
+
+
+class Debouncer:
+    """
+    Collects (location_id, date) pairs until the burst settles.
+
+        batch.add(pairs)
+        if batch.due():
+            process(batch.drain())
+    """
+
+    def __init__(
+        self,
+        quiet_seconds: float = DEBOUNCE_SECONDS,
+        max_wait_seconds: float = MAX_BATCH_WAIT_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.quiet_seconds = quiet_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self._clock = clock
+        self._pairs: Set[Tuple[int, date]] = set()
+        self._first_at: Optional[float] = None
+        self._last_at: Optional[float] = None
+
+    def add(self, pairs) -> None:
+        pairs = set(pairs)
+        if not pairs:
+            return
+        now = self._clock()
+        if not self._pairs:
+            self._first_at = now
+        self._last_at = now
+        self._pairs |= pairs
+
+    def timeout(self) -> Optional[float]:
+        """Seconds until the batch is due; None when nothing is pending."""
+        if not self._pairs:
+            return None
+        now = self._clock()
+        deadline = min(self._last_at + self.quiet_seconds, self._first_at + self.max_wait_seconds)
+        return max(0.0, deadline - now)
+
+    def due(self) -> bool:
+        return self.timeout() == 0.0
+
+    def drain(self) -> Set[Tuple[int, date]]:
+        pairs, self._pairs = self._pairs, set()
+        self._first_at = self._last_at = None
+        return pairs
+
+
+def process_batch(pairs: Optional[Set[Tuple[int, date]]]) -> None:
+    """
+    Aggregate the given days (the usual two-day window when pairs is None)
+    and forecast the locations whose aggregates changed.
+    """
+    # Imported here: pandas and the model stack load on the first batch,
+    # not at worker start-up.
+    from src.features.build_features import run_daily_aggregation
+    from src.forecast_and_notify import run_forecast_and_notify
+
+    start_new_run()
+    start = time.perf_counter()
+    with pipeline_lock(wait=True):
+        changed = run_daily_aggregation(pairs)
+        if changed:
+            run_forecast_and_notify(sorted(changed))
+    scope = "catch-up" if pairs is None else f"{len(pairs)} location-day(s)"
+    print(
+        f"✅ Batch ({scope}) done in {time.perf_counter() - start:.1f}s; "
+        f"{len(changed)} location(s) re-forecast."
+    )
+
+
+def run_worker(debouncer: Optional[Debouncer] = None) -> None:
+    print_settings_summary()
+    debouncer = debouncer or Debouncer()
+
+    while True:
+        try:
+            with NotificationListener([OBSERVATIONS_CHANNEL]) as listener:
+                print(f"\n👂 Listening on {OBSERVATIONS_CHANNEL}...")
+                process_batch(None)
+                while True:
+                    for note in listener.poll(debouncer.timeout()):
+                        debouncer.add(decode_location_dates(note.payload))
+                    if debouncer.due():
+                        process_batch(debouncer.drain())
+        except KeyboardInterrupt:
+            return
+        except Exception as exc:
+            print(f"⚠️  Event worker error, reconnecting in {RECONNECT_SECONDS:.0f}s: {exc}")
+            time.sleep(RECONNECT_SECONDS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate and forecast as new observations arrive.")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS,
+                        help="Quiet period before a batch is processed (seconds).")
+    parser.add_argument("--max-wait", type=float, default=MAX_BATCH_WAIT_SECONDS,
+                        help="Longest a pending batch waits during a steady stream (seconds).")
+    args = parser.parse_args()
+    run_worker(Debouncer(args.debounce, args.max_wait))
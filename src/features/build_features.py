@@ -1,10 +1,91 @@
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
 from sqlalchemy import text
 
 from src.db.connection import get_engine
+from src.db.migrations import add_missing_columns, ensure_once
 from src.config.settings import print_settings_summary
+from src.backfill_interpolate import ensure_backfill_schema
+from src.telemetry import record, tracked_stage
+
+
+# Column prefix in daily_aggregates -> AirNow ParameterName values (upper-cased).
+POLLUTANTS: Dict[str, Tuple[str, ...]] = {
+    "pm25": ("PM2.5",),
+    "ozone": ("O3", "OZONE"),
+    "pm10": ("PM10",),
+}
+STATS = ("max", "mean", "min")
+
+
+def pollutant_columns() -> List[str]:
+    """Per-pollutant columns of daily_aggregates, e.g. pm25_max_aqi."""
+    return [f"{prefix}_{stat}_aqi" for prefix in POLLUTANTS for stat in STATS]
+
+
+def _pollutant_aggregates() -> str:
+    """
+    One FILTERed aggregate per pollutant column, so they are computed in the
+    same pass over observations as the all-pollutant values.
+    """
+    exprs = []
+    for prefix, names in POLLUTANTS.items():
+        names_sql = ", ".join(f"'{name}'" for name in names)
+        condition = f"FILTER (WHERE upper(o.pollutant) IN ({names_sql}))"
+        exprs += [
+            f"MAX(o.aqi) {condition} AS {prefix}_max_aqi",
+            f"(AVG(o.aqi) {condition})::double precision AS {prefix}_mean_aqi",
+            f"MIN(o.aqi) {condition} AS {prefix}_min_aqi",
+        ]
+    return ",\n            ".join(exprs)
+
+
+# Optional model features: each pollutant's max AQI the day before.
+POLLUTANT_LAG_COLUMNS = [f"{prefix}_lag1" for prefix in POLLUTANTS]
+
+
+def add_pollutant_lags(df):
+    """
+    Add POLLUTANT_LAG_COLUMNS to a frame sorted by (location_id, date) that
+    holds the <pollutant>_max_aqi columns. A pollutant not reported on the
+    previous day (or never, at that location) gets 0.
+    """
+    grouped = df.groupby("location_id", group_keys=False)
+    for prefix, column in zip(POLLUTANTS, POLLUTANT_LAG_COLUMNS):
+        df[column] = grouped[f"{prefix}_max_aqi"].shift(1).astype(float).fillna(0.0)
+    return df
+
+
+def ensure_pollutant_columns(conn) -> None:
+    """Add the per-pollutant columns on databases created before schema.sql had them."""
+    columns = {
+        column: "DOUBLE PRECISION" if "_mean_" in column else "INTEGER"
+        for column in pollutant_columns()
+    }
+    add_missing_columns(conn, "daily_aggregates", {**columns, "dominant_pollutant": "TEXT"})
+
+
+# Observations to aggregate: the last two days on scheduled runs, or just
+# the (location_id, date) pairs passed in by the event worker.
+RECENT_SOURCE = """
+        FROM observations o
+        WHERE o.timestamp_utc >= NOW() - INTERVAL '2 days'
+"""
+PAIRS_SOURCE = """
+        FROM unnest(CAST(:location_ids AS integer[]), CAST(:dates AS date[])) AS p(location_id, date)
+        JOIN observations o
+          ON o.location_id = p.location_id
+         AND o.timestamp_utc >= p.date
+         AND o.timestamp_utc < p.date + 1
+"""
 
 
-def run_daily_aggregation() -> None:
+@tracked_stage("aggregate")
+def run_daily_aggregation(
+    pairs: Optional[Iterable[Tuple[int, date]]] = None,
+    location_ids: Optional[Iterable[int]] = None,
+) -> Set[int]:
     """
     Aggregate raw observations into daily_aggregates.
 
@@ -12,34 +93,50 @@ def run_daily_aggregation() -> None:
       - max_aqi
       - mean_aqi
       - min_aqi
+      - the same three per pollutant (pm25_*, ozone_*, pm10_*; NULL when
+        the pollutant wasn't reported that day)
+      - dominant_pollutant: the pollutant of the day's highest reading
+
+    Everything comes from one GROUP BY over the observations, using FILTER
+    clauses for the per-pollutant values.
 
     Upserts so that existing rows are updated when new observations arrive
-    for a date that was already aggregated (e.g. mid-day re-runs).
+    for a date that was already aggregated (e.g. mid-day re-runs). Rows whose
+    values did not change are left untouched, so updated_at only moves when
+    an aggregate actually changed (backfill_interpolate relies on this).
+
+    With pairs, only those (location_id, date) days are recomputed; with
+    location_ids, the usual two-day window for only those locations.
+    Returns the ids of locations whose aggregates changed.
     """
     print_settings_summary()
     print("\nBuilding daily aggregates...")
 
     # This query:
     #   - derives a date from timestamp_utc
-    #   - aggregates AQI metrics per location + date
-    #   - inserts into daily_aggregates, skipping rows that already exist
+    #   - aggregates AQI metrics per location + date, overall and per pollutant
+    #   - inserts into daily_aggregates, updating rows whose values changed
+    extra_columns = pollutant_columns() + ["dominant_pollutant"]
     sql = text(
-        """
+        f"""
         INSERT INTO daily_aggregates (
             location_id,
             date,
             max_aqi,
             mean_aqi,
-            min_aqi
+            min_aqi,
+            {", ".join(extra_columns)}
         )
         SELECT
             o.location_id,
             o.timestamp_utc::date AS date,
             MAX(o.aqi) AS max_aqi,
             AVG(o.aqi)::double precision AS mean_aqi,
-            MIN(o.aqi) AS min_aqi
-        FROM observations o
-        WHERE o.timestamp_utc >= NOW() - INTERVAL '2 days'
+            MIN(o.aqi) AS min_aqi,
+            {_pollutant_aggregates()},
+            (ARRAY_AGG(o.pollutant ORDER BY o.aqi DESC, o.pollutant))[1] AS dominant_pollutant
+        {RECENT_SOURCE if pairs is None else PAIRS_SOURCE}
+        {"" if location_ids is None else "AND o.location_id = ANY(:only_location_ids)"}
         GROUP BY
             o.location_id,
             o.timestamp_utc::date
@@ -48,18 +145,43 @@ def run_daily_aggregation() -> None:
             max_aqi          = EXCLUDED.max_aqi,
             mean_aqi         = EXCLUDED.mean_aqi,
             min_aqi          = EXCLUDED.min_aqi,
-            is_interpolated  = FALSE;
+            {", ".join(f"{c} = EXCLUDED.{c}" for c in extra_columns)},
+            is_interpolated  = FALSE,
+            updated_at       = NOW()
+        WHERE (
+            daily_aggregates.max_aqi,
+            daily_aggregates.mean_aqi,
+            daily_aggregates.min_aqi,
+            {", ".join(f"daily_aggregates.{c}" for c in extra_columns)},
+            daily_aggregates.is_interpolated
+        ) IS DISTINCT FROM (
+            EXCLUDED.max_aqi,
+            EXCLUDED.mean_aqi,
+            EXCLUDED.min_aqi,
+            {", ".join(f"EXCLUDED.{c}" for c in extra_columns)},
+            FALSE
+        )
+        RETURNING location_id;
         """
     )
 
+    params = {}
+    if pairs is not None:
+        pairs = sorted(set(pairs))
+        params = {"location_ids": [p[0] for p in pairs], "dates": [p[1] for p in pairs]}
+    if location_ids is not None:
+        params["only_location_ids"] = sorted(int(i) for i in location_ids)
+
     engine = get_engine()
+    ensure_once(ensure_backfill_schema)
+    ensure_once(ensure_pollutant_columns)
 
     with engine.begin() as conn:
-        result = conn.execute(sql)
-        # rowcount may be -1 for some dialects, but often indicates inserted rows
-        inserted = result.rowcount
+        changed = [row.location_id for row in conn.execute(sql, params)]
 
-    print(f"✅ Daily aggregation complete. Rows upserted: {inserted}")
+    record(rows_written=len(changed))
+    print(f"✅ Daily aggregation complete. Rows upserted: {len(changed)}")
+    return set(changed)
 
 
 if __name__ == "__main__":
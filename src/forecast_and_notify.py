@@ -1,18 +1,44 @@
 from datetime import timedelta, datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Dict, List, Optional, Sequence
 
 import pandas as pd
 from sqlalchemy import text
-from joblib import load
 
 from src.db.connection import get_engine
+from src.db.frames import AQI, DATE, LOCATION_ID, NAME, NULLABLE_AQI, read_frame
+from src.db.migrations import add_missing_columns, ensure_once, relation_exists
+from src.db.notify import FORECASTS_CHANNEL, notify
 from src.config.settings import print_settings_summary
-from src.alerts import send_alert_email, send_all_clear_email
+from src.features.build_features import POLLUTANTS, add_pollutant_lags
+from src.alerts import (
+    EVENT_ALERT,
+    EVENT_ALL_CLEAR,
+    enqueue_notifications,
+    ensure_notification_tables,
+)
+from src.models.baseline_model import NaiveAQIForecastModel
+from src.models.probabilistic import (
+    DEFAULT_QUANTILES,
+    forecast_distribution,
+    quantile_column,
+)
+from src.telemetry import append_line, record, tracked_stage
 
 MODEL_NAME = "random_forest_v1"
+# Days between the last observed daily aggregate and the forecast's target date
+FORECAST_HORIZON_DAYS = 1
 ALERT_THRESHOLD = 100  # AQI level for alerts
+# When a forecast carries an exceedance probability, alerts start once
+# P(AQI >= ALERT_THRESHOLD) reaches ALERT_PROBABILITY and only clear after it
+# falls below ALERT_CLEAR_PROBABILITY. The gap keeps alerts from flapping
+# when the point forecast hovers around the threshold.
+ALERT_PROBABILITY = 0.5
+ALERT_CLEAR_PROBABILITY = 0.3
+# Columns for models saved without feature names; newer models list theirs
+# in feature_names_in_ (e.g. with pollutant lags).
 FEATURE_COLS = ["lag1", "lag2", "lag3", "roll3", "roll7"]
+DISTRIBUTION_COLS = [quantile_column(q) for q in DEFAULT_QUANTILES] + ["exceedance_prob"]
 
 # Log file paths
 BASE_DIR = Path(__file__).resolve().parents[1]  # project root
@@ -24,47 +50,66 @@ def log_alert(message: str) -> None:
     """
     Append a timestamped alert message to logs/alerts.log.
 
-    This is a very lightweight logging helper.
+    The file stays open for the whole run; lines are buffered and flushed
+    when the stage finishes (or the process exits).
     """
-    LOGS_DIR.mkdir(exist_ok=True)
     timestamp = datetime.utcnow().isoformat(timespec="seconds")
-    line = f"[{timestamp} UTC] {message}\n"
-    with ALERTS_LOG_PATH.open("a", encoding="utf-8") as f:
-        f.write(line)
+    append_line(ALERTS_LOG_PATH, f"[{timestamp} UTC] {message}")
 
 
 def load_model():
     """
-    Load the saved baseline model from the models/ directory.
+    Load the saved RandomForest model from the models/ directory.
+
+    Falls back to the baseline model artifact when the RandomForest file is
+    missing, so forecasts keep flowing before the first RF training run.
+    Returns (model, model_path, model_name).
     """
+    from joblib import load
+
     model_path = BASE_DIR / "models" / "aqi_rf_model.joblib"
+    if model_path.exists():
+        return load(model_path), model_path, MODEL_NAME
 
-    if not model_path.exists():
-        raise FileNotFoundError(f"Model file not found at: {model_path}")
+    baseline_path = BASE_DIR / "models" / "aqi_baseline_model.joblib"
+    if not baseline_path.exists():
+        raise FileNotFoundError(
+            f"Model file not found at: {model_path} (no baseline at {baseline_path} either)"
+        )
 
-    model = load(model_path)
-    return model, model_path
+    model = load(baseline_path)
+    return model, baseline_path, f"baseline_{model.strategy}"
 
 
-def load_recent_daily_aggregates(days: int = 10) -> pd.DataFrame:
+def load_recent_daily_aggregates(
+    days: int = 10,
+    location_ids: Optional[Sequence[int]] = None,
+) -> pd.DataFrame:
     """
-    Load the most recent N real (non-interpolated) rows per location.
+    Load the most recent N real (non-interpolated) rows per location,
+    for every location or only location_ids.
 
     Fetches enough history to compute lag and rolling features for prediction.
     """
     engine = get_engine()
 
-    sql = text(
-        """
-        SELECT location_id, date, max_aqi
+    location_filter = "" if location_ids is None else "AND location_id = ANY(:location_ids)"
+    dtypes = {
+        "location_id": LOCATION_ID,
+        "date": DATE,
+        "max_aqi": AQI,
+        **{f"{prefix}_max_aqi": NULLABLE_AQI for prefix in POLLUTANTS},
+    }
+    sql = f"""
+        SELECT {", ".join(dtypes)}
         FROM daily_aggregates
-        WHERE is_interpolated = FALSE
+        WHERE is_interpolated = FALSE {location_filter}
         ORDER BY location_id, date;
-        """
-    )
+    """
+    params = {} if location_ids is None else {"location_ids": [int(i) for i in location_ids]}
 
     with engine.connect() as conn:
-        df = pd.read_sql(sql, conn, parse_dates=["date"])
+        df = read_frame(conn, sql, dtypes, params)
 
     return df.groupby("location_id").tail(days).reset_index(drop=True)
 
@@ -84,78 +129,202 @@ def build_forecast_features(df: pd.DataFrame) -> pd.DataFrame:
     df["lag3"] = grp["max_aqi"].shift(3)
     df["roll3"] = grp["max_aqi"].rolling(3).mean().reset_index(level=0, drop=True)
     df["roll7"] = grp["max_aqi"].rolling(7).mean().reset_index(level=0, drop=True)
+    if all(f"{prefix}_max_aqi" in df for prefix in POLLUTANTS):
+        df = add_pollutant_lags(df)
 
     return df.groupby("location_id").last().reset_index()
 
 
-def ensure_alert_state_table() -> None:
-    with get_engine().begin() as conn:
+def model_features(model) -> List[str]:
+    return list(getattr(model, "feature_names_in_", FEATURE_COLS))
+
+
+def predict_next_day(model, df_recent: pd.DataFrame, df_latest: pd.DataFrame) -> pd.DataFrame:
+    """
+    Next-day AQI forecast for each row of df_latest (one row per location).
+
+    Returns a frame aligned with df_latest holding the point forecast plus
+    DISTRIBUTION_COLS. Tree ensembles get quantiles and the exceedance
+    probability from their per-tree predictions; other models leave those
+    columns as NaN.
+
+    Baseline models get the recent history so history-based strategies
+    (ewma, seasonal_naive) can see it; the prediction from each location's
+    latest day is used.
+    """
+    if isinstance(model, NaiveAQIForecastModel):
+        preds = df_recent.assign(pred=model.predict(df_recent))
+        latest = preds.sort_values(["location_id", "date"]).groupby("location_id")["pred"].last()
+        point = df_latest["location_id"].map(latest)
+    elif hasattr(model, "estimators_"):
+        X = df_latest[model_features(model)]
+        return forecast_distribution(model, X, threshold=ALERT_THRESHOLD)
+    else:
+        point = pd.Series(model.predict(df_latest[model_features(model)]), index=df_latest.index)
+
+    return pd.DataFrame({"forecast": point}).reindex(columns=["forecast"] + DISTRIBUTION_COLS)
+
+
+def ensure_alert_state_table(conn) -> None:
+    if not relation_exists(conn, "alert_state"):
         conn.execute(text("""
             CREATE TABLE IF NOT EXISTS alert_state (
                 location_id INTEGER PRIMARY KEY REFERENCES locations(id),
                 in_alert BOOLEAN NOT NULL DEFAULT FALSE,
                 alert_started_at TIMESTAMPTZ,
-                last_forecast_aqi INTEGER
+                last_forecast_aqi INTEGER,
+                transition_seq INTEGER NOT NULL DEFAULT 0
             )
         """))
+    add_missing_columns(conn, "alert_state", {"transition_seq": "INTEGER NOT NULL DEFAULT 0"})
+
+
+def ensure_forecast_columns(conn) -> None:
+    """
+    Add the probabilistic forecast and horizon columns to forecasts on
+    older databases. Only missing columns are added (src.db.migrations).
+    """
+    add_missing_columns(conn, "forecasts", {
+        **{col: "DOUBLE PRECISION" for col in DISTRIBUTION_COLS},
+        "horizon_days": "INTEGER NOT NULL DEFAULT 1",
+    })
 
 
 def load_location_names() -> pd.DataFrame:
     with get_engine().connect() as conn:
-        return pd.read_sql(text("SELECT id AS location_id, name FROM locations"), conn)
+        return read_frame(
+            conn, "SELECT id AS location_id, name FROM locations",
+            {"location_id": LOCATION_ID, "name": NAME},
+        )
 
 
-def process_alert_state(df: pd.DataFrame) -> None:
-    engine = get_engine()
+def over_threshold(df: pd.DataFrame, currently_alerting: pd.Series) -> pd.Series:
+    """
+    Decide, per row, whether a location should be in alert for its forecast.
 
-    with engine.connect() as conn:
-        state_rows = conn.execute(text(
-            "SELECT location_id, in_alert FROM alert_state"
-        )).mappings().all()
+    Uses the exceedance probability with hysteresis where it is available,
+    otherwise the point forecast against ALERT_THRESHOLD.
+    """
+    prob = df["exceedance_prob"]
+    by_prob = prob.ge(ALERT_CLEAR_PROBABILITY).where(currently_alerting, prob.ge(ALERT_PROBABILITY))
+    by_point = df["forecast_aqi"].ge(ALERT_THRESHOLD)
+    return by_point.where(prob.isna(), by_prob)
+
+
+def compute_alert_transitions(
+    df: pd.DataFrame,
+    state: pd.DataFrame,
+    now: datetime,
+) -> pd.DataFrame:
+    """
+    Diff a forecast batch against alert_state in one vectorized step.
+
+    df has one row per location (location_id, forecast_aqi,
+    exceedance_prob, ...); state has location_id, in_alert and
+    transition_seq for locations already tracked. Returns df with the new
+    state columns:
+
+      - in_alert          whether the location is in alert after this run
+      - alert_started_at  now while in alert (the upsert keeps an existing
+                          start time), None otherwise
+      - event_type        EVENT_ALERT on entering, EVENT_ALL_CLEAR on clearing,
+                          None when unchanged
+      - transition_seq    the location's transition count, one higher than
+                          before when event_type is set
+    """
+    tracked = state.set_index("location_id")
+    current = df["location_id"].map(tracked["in_alert"]).fillna(False).astype(bool)
+    previous_seq = df["location_id"].map(tracked["transition_seq"]).fillna(0).astype(int)
+    over = over_threshold(df, current).astype(bool)
+
+    out = df.copy()
+    out["in_alert"] = over
+    out["alert_started_at"] = pd.Series(now, index=df.index, dtype=object).where(over, None)
+    out["event_type"] = None
+    out.loc[over & ~current, "event_type"] = EVENT_ALERT
+    out.loc[~over & current, "event_type"] = EVENT_ALL_CLEAR
+    out["transition_seq"] = previous_seq + out["event_type"].notna().astype(int)
+    return out
 
-    state_map = {row["location_id"]: row["in_alert"] for row in state_rows}
+
+def process_alert_state(df: pd.DataFrame) -> None:
+    """
+    Apply this run's forecasts to alert_state and queue notifications.
+
+    One transaction: lock the batch's existing alert_state rows, compute all
+    transitions at once, bulk-upsert every location with one statement and
+    queue only the transitions in the outbox. The outbox rows commit
+    together with the state change, so the delivery worker sees exactly one
+    event per transition.
+    """
+    engine = get_engine()
     now = datetime.utcnow()
+    location_ids = [int(x) for x in df["location_id"]]
 
-    for row in df.itertuples():
-        loc_id = int(row.location_id)
-        loc_name = row.name
-        forecast_aqi = int(row.forecast_aqi)
-        target_date = row.target_date.date()
-        currently_alerting = state_map.get(loc_id, False)
-        over_threshold = forecast_aqi >= ALERT_THRESHOLD
-
-        if over_threshold and not currently_alerting:
-            send_alert_email(loc_name, forecast_aqi, target_date, ALERT_THRESHOLD)
-            log_alert(f"Alert email sent for {loc_name}: AQI {forecast_aqi}")
-            new_in_alert = True
-            new_started_at = now
-        elif not over_threshold and currently_alerting:
-            send_all_clear_email(loc_name, forecast_aqi, target_date, ALERT_THRESHOLD)
-            log_alert(f"All-clear email sent for {loc_name}: AQI {forecast_aqi}")
-            new_in_alert = False
-            new_started_at = None
-        else:
-            new_in_alert = currently_alerting
-            new_started_at = now if currently_alerting else None
-
-        with engine.begin() as conn:
+    with engine.begin() as conn:
+        state = pd.DataFrame(
             conn.execute(text("""
-                INSERT INTO alert_state (location_id, in_alert, alert_started_at, last_forecast_aqi)
-                VALUES (:loc_id, :in_alert, :started_at, :last_aqi)
-                ON CONFLICT (location_id) DO UPDATE
-                SET in_alert = EXCLUDED.in_alert,
-                    alert_started_at = CASE
-                        WHEN EXCLUDED.in_alert AND alert_state.alert_started_at IS NOT NULL
-                            THEN alert_state.alert_started_at
-                        ELSE EXCLUDED.alert_started_at
-                    END,
-                    last_forecast_aqi = EXCLUDED.last_forecast_aqi
-            """), {
-                "loc_id": loc_id,
-                "in_alert": new_in_alert,
-                "started_at": new_started_at,
-                "last_aqi": forecast_aqi,
-            })
+                SELECT location_id, in_alert, transition_seq
+                FROM alert_state
+                WHERE location_id = ANY(:ids)
+                FOR UPDATE
+            """), {"ids": location_ids}).all(),
+            columns=["location_id", "in_alert", "transition_seq"],
+        )
+
+        result = compute_alert_transitions(df, state, now)
+
+        conn.execute(text("""
+            INSERT INTO alert_state
+                (location_id, in_alert, alert_started_at, last_forecast_aqi, transition_seq)
+            SELECT *
+            FROM unnest(
+                CAST(:ids AS integer[]),
+                CAST(:in_alert AS boolean[]),
+                CAST(:started_at AS timestamptz[]),
+                CAST(:last_aqi AS integer[]),
+                CAST(:seq AS integer[])
+            )
+            ON CONFLICT (location_id) DO UPDATE
+            SET in_alert = EXCLUDED.in_alert,
+                alert_started_at = CASE
+                    WHEN EXCLUDED.in_alert AND alert_state.alert_started_at IS NOT NULL
+                        THEN alert_state.alert_started_at
+                    ELSE EXCLUDED.alert_started_at
+                END,
+                last_forecast_aqi = EXCLUDED.last_forecast_aqi,
+                transition_seq = EXCLUDED.transition_seq
+        """), {
+            "ids": location_ids,
+            "in_alert": [bool(x) for x in result["in_alert"]],
+            "started_at": list(result["alert_started_at"]),
+            "last_aqi": [int(x) for x in result["forecast_aqi"]],
+            "seq": [int(x) for x in result["transition_seq"]],
+        })
+
+        transitions = result[result["event_type"].notna()]
+        enqueue_notifications(conn, [
+            {
+                "event_type": row.event_type,
+                "location_id": int(row.location_id),
+                "target_date": row.target_date.date(),
+                "transition_seq": int(row.transition_seq),
+                "payload": {
+                    "location_name": row.name,
+                    "forecast_aqi": int(row.forecast_aqi),
+                    "target_date": row.target_date.date().isoformat(),
+                    "threshold": ALERT_THRESHOLD,
+                    "exceedance_prob": (
+                        None if pd.isna(row.exceedance_prob) else float(row.exceedance_prob)
+                    ),
+                },
+            }
+            for row in transitions.itertuples()
+        ])
+
+    for row in transitions.itertuples():
+        label = "Alert" if row.event_type == EVENT_ALERT else "All-clear"
+        log_alert(f"{label} queued for {row.name}: AQI {row.forecast_aqi}")
 
 
 def insert_forecasts(records: List[Dict[str, Any]]) -> None:
@@ -163,7 +332,8 @@ def insert_forecasts(records: List[Dict[str, Any]]) -> None:
     Insert forecast records into the forecasts table.
 
     Uses ON CONFLICT to upsert (update) existing rows for the same
-    (location_id, target_date, model_name).
+    (location_id, target_date, model_name). Notifies FORECASTS_CHANNEL on
+    commit so the API drops its cached forecasts.
     """
     if not records:
         print("No forecast records to insert.")
@@ -177,27 +347,45 @@ def insert_forecasts(records: List[Dict[str, Any]]) -> None:
             location_id,
             target_date,
             forecast_aqi,
-            model_name
+            model_name,
+            horizon_days,
+            forecast_q10,
+            forecast_q50,
+            forecast_q90,
+            exceedance_prob
         )
         VALUES (
             :location_id,
             :target_date,
             :forecast_aqi,
-            :model_name
+            :model_name,
+            :horizon_days,
+            :forecast_q10,
+            :forecast_q50,
+            :forecast_q90,
+            :exceedance_prob
         )
         ON CONFLICT (location_id, target_date, model_name) DO UPDATE
-        SET forecast_aqi = EXCLUDED.forecast_aqi;
+        SET forecast_aqi    = EXCLUDED.forecast_aqi,
+            horizon_days    = EXCLUDED.horizon_days,
+            forecast_q10    = EXCLUDED.forecast_q10,
+            forecast_q50    = EXCLUDED.forecast_q50,
+            forecast_q90    = EXCLUDED.forecast_q90,
+            exceedance_prob = EXCLUDED.exceedance_prob;
         """
     )
 
     with engine.begin() as conn:
         conn.execute(sql, records)
+        notify(conn, FORECASTS_CHANNEL)
 
+    record(rows_written=len(records))
     print(f"✅ Inserted/updated {len(records)} forecast row(s) in the database.")
     log_alert(f"Inserted/updated {len(records)} forecast row(s) in the database.")
 
 
-def run_forecast_and_notify() -> None:
+@tracked_stage("forecast")
+def run_forecast_and_notify(location_ids: Optional[Sequence[int]] = None) -> None:
     """
     Main entry point:
       - load model
@@ -205,18 +393,24 @@ def run_forecast_and_notify() -> None:
       - forecast next-day AQI
       - write forecasts to DB
       - log + print alerts for high AQI forecasts
+
+    With location_ids, only those locations are forecast and have their
+    alert state updated (used by the event worker).
     """
     print_settings_summary()
     print("\nRunning forecast and notify...")
     log_alert("Starting forecast_and_notify run")
-    ensure_alert_state_table()
+    ensure_once(ensure_alert_state_table)
+    ensure_once(ensure_forecast_columns)
+    ensure_once(ensure_notification_tables)
 
-    model, model_path = load_model()
-    msg = f"Using model from: {model_path}"
+    model, model_path, model_name = load_model()
+    msg = f"Using model {model_name} from: {model_path}"
     print(msg)
     log_alert(msg)
 
-    df_recent = load_recent_daily_aggregates()
+    df_recent = load_recent_daily_aggregates(location_ids=location_ids)
+    record(rows_read=len(df_recent))
 
     if df_recent.empty:
         msg = "No daily aggregates found. Run ingestion + aggregation first."
@@ -238,8 +432,10 @@ def run_forecast_and_notify() -> None:
     log_alert(f"Loaded {len(df)} latest daily aggregate row(s).")
 
     # Predict next-day AQI
-    df["forecast_aqi"] = model.predict(df[FEATURE_COLS]).round().astype(int)
-    df["target_date"] = df["date"] + pd.to_timedelta(1, unit="D")
+    forecast = predict_next_day(model, df_recent, df)
+    df["forecast_aqi"] = forecast["forecast"].round().astype(int)
+    df[DISTRIBUTION_COLS] = forecast[DISTRIBUTION_COLS]
+    df["target_date"] = df["date"] + pd.to_timedelta(FORECAST_HORIZON_DAYS, unit="D")
 
     # Build records for insertion
     records: List[Dict[str, Any]] = []
@@ -249,7 +445,12 @@ def run_forecast_and_notify() -> None:
                 "location_id": int(row.location_id),
                 "target_date": row.target_date.date(),  # convert to Python date
                 "forecast_aqi": int(row.forecast_aqi),
-                "model_name": MODEL_NAME,
+                "model_name": model_name,
+                "horizon_days": FORECAST_HORIZON_DAYS,
+                **{
+                    col: None if pd.isna(getattr(row, col)) else float(getattr(row, col))
+                    for col in DISTRIBUTION_COLS
+                },
             }
         )
 
@@ -267,6 +468,11 @@ def run_forecast_and_notify() -> None:
     else:
         for row in high_forecasts.itertuples():
             msg = f"⚠️ {row.name}: forecast AQI {row.forecast_aqi} on {row.target_date.date()}"
+            if not pd.isna(row.exceedance_prob):
+                msg += (
+                    f" (P(AQI ≥ {ALERT_THRESHOLD}) = {row.exceedance_prob:.0%},"
+                    f" 80% band {row.forecast_q10:.0f}–{row.forecast_q90:.0f})"
+                )
             print(msg)
             log_alert(msg)
 
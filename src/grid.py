@@ -0,0 +1,284 @@
+"""
+Gridded AQI surfaces for maps and for points between monitoring sites.
+
+The latest value at each location (the newest observation hour, or the
+newest forecast target date) is interpolated onto a regular lat/lon grid
+by inverse-distance weighting over the GRID_NEIGHBORS nearest sites:
+
+    aqi(cell) = sum(w_i * aqi_i) / sum(w_i),  w_i = 1 / km_i ** GRID_POWER
+
+Neighbours come from a src.spatial.LocationIndex, queried for all cell
+centres at once in blocks of BATCH_CELLS, and the weighting is plain
+array arithmetic over each (cells, k) block. A 1 km grid over Oregon is
+about 480 x 660 cells and takes well under a second.
+
+Each grid is written as a float32 .npy (row 0 is the northern edge) next
+to a JSON file describing it:
+
+    data/grids/forecasts.npy
+    data/grids/forecasts.json
+
+Both are written to temporary files and renamed into place, so readers
+always see a complete grid. The API (src.api.grid) memory-maps the .npy
+and serves map tiles from it without copying the grid into memory.
+"""
+import argparse
+import json
+import math
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.config.settings import (
+    GRID_BOUNDS,
+    GRID_DIR,
+    GRID_NEIGHBORS,
+    GRID_POWER,
+    GRID_RESOLUTION_KM,
+    print_settings_summary,
+)
+from src.db.connection import get_engine
+from src.db.frames import AQI, DATE, LOCATION_ID, read_frame
+from src.spatial import EARTH_RADIUS_KM, LocationIndex
+from src.telemetry import record, tracked_stage
+
+BASE_DIR = Path(__file__).resolve().parents[1]  # project root
+GRID_PATH = Path(GRID_DIR) if Path(GRID_DIR).is_absolute() else BASE_DIR / GRID_DIR
+
+SOURCES = ("observations", "forecasts")
+BATCH_CELLS = 65_536
+# Distances are floored at this so a cell on top of a site takes its value
+# instead of dividing by zero.
+MIN_DISTANCE_KM = 1e-3
+# Sites without an observation this recent are left out of the observations grid.
+OBSERVATION_MAX_AGE_HOURS = 6
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+
+STATION_DTYPES = {
+    "location_id": LOCATION_ID, "latitude": "float64", "longitude": "float64",
+    "aqi": AQI, "as_of": DATE,
+}
+
+LATEST_VALUES_SQL = {
+    # Max over pollutants for each site's newest observation hour.
+    "observations": f"""
+        SELECT o.location_id, l.latitude, l.longitude, MAX(o.aqi) AS aqi,
+               o.timestamp_utc AT TIME ZONE 'UTC' AS as_of
+        FROM observations o
+        JOIN locations l ON l.id = o.location_id
+        JOIN (
+            SELECT location_id, MAX(timestamp_utc) AS timestamp_utc
+            FROM observations
+            WHERE timestamp_utc >= NOW() - make_interval(hours => {OBSERVATION_MAX_AGE_HOURS})
+            GROUP BY location_id
+        ) latest USING (location_id, timestamp_utc)
+        WHERE l.latitude IS NOT NULL AND l.longitude IS NOT NULL
+        GROUP BY o.location_id, l.latitude, l.longitude, o.timestamp_utc
+        ORDER BY o.location_id
+    """,
+    # The most recent forecast per site for the newest target date.
+    "forecasts": """
+        SELECT DISTINCT ON (f.location_id)
+               f.location_id, l.latitude, l.longitude, f.forecast_aqi AS aqi,
+               f.target_date::timestamp AS as_of
+        FROM forecasts f
+        JOIN locations l ON l.id = f.location_id
+        WHERE f.target_date = (SELECT MAX(target_date) FROM forecasts)
+          AND l.latitude IS NOT NULL AND l.longitude IS NOT NULL
+        ORDER BY f.location_id, f.created_at DESC
+    """,
+}
+
+
+@dataclass(frozen=True)
+class GridSpec:
+    """
+    A regular lat/lon grid over [south, north] x [west, east] whose cells
+    are resolution_km on a side at the grid's middle latitude.
+    """
+    south: float
+    west: float
+    north: float
+    east: float
+    resolution_km: float
+
+    @classmethod
+    def from_bounds(cls, bounds: str, resolution_km: float) -> "GridSpec":
+        """From a "south,west,north,east" string such as AQI_GRID_BOUNDS."""
+        south, west, north, east = (float(v) for v in bounds.split(","))
+        if not (south < north and west < east and resolution_km > 0):
+            raise ValueError(f"Invalid grid bounds {bounds!r} at {resolution_km} km")
+        return cls(south, west, north, east, resolution_km)
+
+    @property
+    def lat_step(self) -> float:
+        return self.resolution_km / KM_PER_DEGREE
+
+    @property
+    def lon_step(self) -> float:
+        mid_lat = math.radians((self.south + self.north) / 2)
+        return self.resolution_km / (KM_PER_DEGREE * math.cos(mid_lat))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (
+            math.ceil((self.north - self.south) / self.lat_step),
+            math.ceil((self.east - self.west) / self.lon_step),
+        )
+
+    def latitudes(self) -> np.ndarray:
+        """Cell-centre latitude of each row, north to south."""
+        return self.north - (np.arange(self.shape[0]) + 0.5) * self.lat_step
+
+    def longitudes(self) -> np.ndarray:
+        """Cell-centre longitude of each column, west to east."""
+        return self.west + (np.arange(self.shape[1]) + 0.5) * self.lon_step
+
+    def cells(self, latitudes, longitudes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(rows, cols, inside) for arrays of points; rows/cols are 0 where not inside."""
+        rows = np.floor((self.north - np.asarray(latitudes)) / self.lat_step).astype(np.int64)
+        cols = np.floor((np.asarray(longitudes) - self.west) / self.lon_step).astype(np.int64)
+        n_rows, n_cols = self.shape
+        inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+        return np.where(inside, rows, 0), np.where(inside, cols, 0), inside
+
+
+DEFAULT_SPEC = GridSpec.from_bounds(GRID_BOUNDS, GRID_RESOLUTION_KM)
+
+
+def idw(values: np.ndarray, distances_km: np.ndarray, power: float = GRID_POWER) -> np.ndarray:
+    """Inverse-distance weighted mean of each row of values, shape (n, k) -> (n,)."""
+    weights = np.maximum(distances_km, MIN_DISTANCE_KM) ** -power
+    return (weights * values).sum(axis=1) / weights.sum(axis=1)
+
+
+def interpolate_grid(
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    values: Sequence[float],
+    spec: GridSpec = DEFAULT_SPEC,
+    neighbors: int = GRID_NEIGHBORS,
+    power: float = GRID_POWER,
+    batch_cells: int = BATCH_CELLS,
+) -> np.ndarray:
+    """IDW surface of the site values over spec, as a float32 (rows, cols) array."""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        raise ValueError("Need at least one site to interpolate")
+    index = LocationIndex(np.arange(len(values)), latitudes, longitudes)
+
+    n_rows, n_cols = spec.shape
+    cell_lats, cell_lons = spec.latitudes(), spec.longitudes()
+    grid = np.empty((n_rows, n_cols), dtype=np.float32)
+    rows_per_batch = max(1, batch_cells // n_cols)
+
+    for start in range(0, n_rows, rows_per_batch):
+        end = min(start + rows_per_batch, n_rows)
+        lats = np.repeat(cell_lats[start:end], n_cols)
+        lons = np.tile(cell_lons, end - start)
+        positions, km = index.query(lats, lons, neighbors)
+        grid[start:end] = idw(values[positions], km, power).reshape(end - start, n_cols)
+
+    return grid
+
+
+def load_latest_values(source: str) -> pd.DataFrame:
+    """Latest AQI per located site for source, with its as_of time."""
+    with get_engine().connect() as conn:
+        return read_frame(conn, LATEST_VALUES_SQL[source], STATION_DTYPES)
+
+
+def grid_paths(source: str, output_dir: Path = GRID_PATH) -> Tuple[Path, Path]:
+    return output_dir / f"{source}.npy", output_dir / f"{source}.json"
+
+
+def save_grid(
+    grid: np.ndarray,
+    meta: Dict[str, Any],
+    source: str,
+    output_dir: Path = GRID_PATH,
+) -> Path:
+    """Write the grid, then its metadata, each through a temporary file."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    npy_path, meta_path = grid_paths(source, output_dir)
+
+    tmp_npy = npy_path.with_suffix(".npy.tmp")
+    with tmp_npy.open("wb") as fh:
+        np.save(fh, grid)
+    os.replace(tmp_npy, npy_path)
+
+    tmp_meta = meta_path.with_suffix(".json.tmp")
+    tmp_meta.write_text(json.dumps(meta, indent=2, default=str) + "\n", encoding="utf-8")
+    os.replace(tmp_meta, meta_path)
+    return npy_path
+
+
+def load_grid(source: str, output_dir: Path = GRID_PATH) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """(memory-mapped grid, metadata) for a saved source."""
+    npy_path, meta_path = grid_paths(source, output_dir)
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    grid = np.load(npy_path, mmap_mode="r")
+    if list(grid.shape) != [meta["rows"], meta["cols"]]:
+        raise ValueError(f"{npy_path} does not match {meta_path}; it is being rewritten")
+    return grid, meta
+
+
+def spec_from_meta(meta: Dict[str, Any]) -> GridSpec:
+    return GridSpec(**{field: meta[field] for field in GridSpec.__dataclass_fields__})
+
+
+def build_grid(
+    source: str,
+    spec: GridSpec = DEFAULT_SPEC,
+    output_dir: Path = GRID_PATH,
+) -> Optional[Path]:
+    """Interpolate and save one source's grid; None when it has no recent values."""
+    sites = load_latest_values(source)
+    record(rows_read=len(sites))
+    if sites.empty:
+        print(f"⚠️ No recent {source} with coordinates; {source} grid not updated.")
+        return None
+
+    grid = interpolate_grid(sites["latitude"], sites["longitude"], sites["aqi"], spec)
+    meta = {
+        "source": source,
+        "as_of": sites["as_of"].max().isoformat(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **asdict(spec),
+        "rows": grid.shape[0],
+        "cols": grid.shape[1],
+        "neighbors": GRID_NEIGHBORS,
+        "power": GRID_POWER,
+        "sites": len(sites),
+        "min_aqi": float(grid.min()),
+        "max_aqi": float(grid.max()),
+    }
+    path = save_grid(grid, meta, source, output_dir)
+    record(rows_written=grid.size)
+    print(f"✅ {source}: {grid.shape[0]} x {grid.shape[1]} grid from {len(sites)} site(s) -> {path}")
+    return path
+
+
+@tracked_stage("grid")
+def run_grid(
+    sources: Sequence[str] = SOURCES,
+    spec: GridSpec = DEFAULT_SPEC,
+    output_dir: Path = GRID_PATH,
+) -> int:
+    """Rebuild the grids for sources. Returns how many were written."""
+    print_settings_summary()
+    print(f"\nInterpolating AQI onto a {spec.resolution_km:g} km grid ({spec.shape[0]} x {spec.shape[1]})...")
+    return sum(build_grid(source, spec, output_dir) is not None for source in sources)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interpolate the latest AQI onto a lat/lon grid.")
+    parser.add_argument("--source", choices=SOURCES, nargs="+", default=list(SOURCES))
+    parser.add_argument("--resolution-km", type=float, default=GRID_RESOLUTION_KM)
+    args = parser.parse_args()
+    run_grid(args.source, GridSpec.from_bounds(GRID_BOUNDS, args.resolution_km))
@@ -5,6 +5,8 @@ from typing import List, Dict, Any, Optional
 
 import requests
 
+from src.telemetry import record
+
 
 # Read the API key from the environment (.env loaded earlier by settings.py)
 AIRNOW_API_KEY = os.getenv("AIRNOW_API_KEY")
@@ -75,7 +77,10 @@ def fetch_current_observations(
 
     last_exc: Exception = RuntimeError("No attempts made")
     for attempt in range(1, max_retries + 1):
+        if attempt > 1:
+            record(retries=1)
         try:
+            record(api_calls=1)
             response = requests.get(BASE_URL, params=params, timeout=timeout)
             response.raise_for_status()
             data = response.json()
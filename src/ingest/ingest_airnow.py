@@ -1,10 +1,12 @@
-from typing import List, Dict, Any
+import json
+from typing import Any, Dict, List, Optional, Sequence
 
 from sqlalchemy import text
-from psycopg2.extras import Json
 
 from src.db.connection import get_engine
+from src.db.notify import notify_observations
 from src.config.settings import print_settings_summary
+from src.telemetry import record, tracked_stage
 from src.ingest.airnow_client import (
     fetch_current_observations,
     normalize_observations,
@@ -12,15 +14,19 @@ from src.ingest.airnow_client import (
 )
 
 
-def get_locations() -> List[Dict[str, Any]]:
+def get_locations(location_ids: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
     """
-    Load all locations from the locations table.
+    Load all locations (or only location_ids) from the locations table.
     """
     engine = get_engine()
-    sql = text("SELECT id, name, latitude, longitude FROM locations")
+    if location_ids is None:
+        sql, params = text("SELECT id, name, latitude, longitude FROM locations"), {}
+    else:
+        sql = text("SELECT id, name, latitude, longitude FROM locations WHERE id = ANY(:ids)")
+        params = {"ids": [int(i) for i in location_ids]}
 
     with engine.connect() as conn:
-        rows = conn.execute(sql).mappings().all()
+        rows = conn.execute(sql, params).mappings().all()
 
     return [dict(row) for row in rows]
 
@@ -29,20 +35,15 @@ def insert_observations(records: List[Dict[str, Any]]) -> int:
     """
     Bulk insert observation records into the observations table.
 
-    Uses ON CONFLICT DO NOTHING to avoid duplicates.
+    Uses ON CONFLICT DO NOTHING to avoid duplicates, so re-fetching an hour
+    that is already stored inserts nothing. The (location_id, date) pairs
+    that did gain rows are sent on OBSERVATIONS_CHANNEL when the insert
+    commits, for the event worker.
     Returns the number of rows actually inserted.
     """
     if not records:
         return 0
 
-    # Prepare records so psycopg2 knows raw_json is JSON
-    prepared: List[Dict[str, Any]] = []
-    for rec in records:
-        rec_copy = rec.copy()
-        # Wrap the dict in psycopg2.extras.Json so it can be stored in JSONB
-        rec_copy["raw_json"] = Json(rec_copy["raw_json"])
-        prepared.append(rec_copy)
-
     engine = get_engine()
 
     insert_sql = text(
@@ -55,32 +56,44 @@ def insert_observations(records: List[Dict[str, Any]]) -> int:
             pollutant,
             raw_json
         )
-        VALUES (
-            :location_id,
-            :timestamp_utc,
-            :aqi,
-            :category,
-            :pollutant,
-            :raw_json
+        SELECT *
+        FROM unnest(
+            CAST(:location_id AS integer[]),
+            CAST(:timestamp_utc AS timestamptz[]),
+            CAST(:aqi AS integer[]),
+            CAST(:category AS text[]),
+            CAST(:pollutant AS text[]),
+            CAST(:raw_json AS jsonb[])
         )
-        ON CONFLICT (location_id, timestamp_utc, pollutant) DO NOTHING;
+        ON CONFLICT (location_id, timestamp_utc, pollutant) DO NOTHING
+        RETURNING location_id, timestamp_utc::date AS date;
         """
     )
 
+    params = {
+        col: [rec[col] for rec in records]
+        for col in ("location_id", "timestamp_utc", "aqi", "category", "pollutant")
+    }
+    params["raw_json"] = [json.dumps(rec["raw_json"]) for rec in records]
+
     with engine.begin() as conn:
-        result = conn.execute(insert_sql, prepared)
-        return result.rowcount
+        inserted = conn.execute(insert_sql, params).all()
+        notify_observations(conn, {(row.location_id, row.date) for row in inserted})
+
+    return len(inserted)
+
 
-def run_ingestion() -> None:
+@tracked_stage("ingest")
+def run_ingestion(location_ids: Optional[Sequence[int]] = None) -> None:
     """
     Main entry point: fetch current AirNow observations for each location
-    and store them in the observations table.
+    (or only location_ids) and store them in the observations table.
     """
     print_settings_summary()
     print("\nStarting AirNow ingestion...")
 
     try:
-        locations = get_locations()
+        locations = get_locations(location_ids)
     except Exception as exc:
         print("❌ Failed to load locations from the database:")
         print(exc)
@@ -115,6 +128,7 @@ def run_ingestion() -> None:
             continue
 
         normalized = normalize_observations(loc_id, raw_records)
+        record(rows_read=len(raw_records))
 
         if not normalized:
             print(f"⚠️ No valid normalized records for {name}.")
@@ -128,6 +142,7 @@ def run_ingestion() -> None:
             continue
 
         total_inserted += inserted
+        record(rows_written=inserted)
         print(f"✅ Inserted {inserted} new observation(s) for {name} ({len(normalized)} fetched).")
 
     print(f"\nDone. Total observations inserted: {total_inserted}")
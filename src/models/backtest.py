@@ -0,0 +1,322 @@
+"""
+Rolling-origin backtest for the AQI forecasting models.
+
+Replays the real (non-interpolated) daily_aggregates history as if the
+pipeline had been running all along: at every forecast origin each model
+only sees data whose target was known on that day, and the models are
+refit every REFIT_DAYS origins rather than once per origin.
+
+All locations (and all origins that share a fitted model) are scored in a
+single batch, and independent refit blocks are spread across worker
+processes. The result is a compact error table by model, location,
+horizon and target month.
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from src.config.settings import print_settings_summary
+from src.models.baseline_model import SEASON_DAYS, STRATEGIES, NaiveAQIForecastModel
+from src.models.train_ml_model import (
+    FEATURE_COLUMNS,
+    add_lag_features,
+    load_daily_aggregates,
+)
+
+DEFAULT_HORIZONS = (1,)
+REFIT_DAYS = 7
+STEP_DAYS = 1
+MIN_TRAIN_ROWS = 20
+# Cap on the bootstrap sample drawn per tree. Multi-year histories over
+# hundreds of locations otherwise make every refit grow full-size trees.
+MAX_TREE_SAMPLES = 20_000
+
+BASE_DIR = Path(__file__).resolve().parents[2]  # project root
+DEFAULT_OUTPUT = BASE_DIR / "reports" / "backtest_metrics.csv"
+
+# Set once per worker process by _init_worker so the history frame is
+# pickled once per process instead of once per refit block.
+_FRAME: Optional[pd.DataFrame] = None
+
+
+def build_backtest_frame(
+    df: pd.DataFrame,
+    horizons: Sequence[int] = DEFAULT_HORIZONS,
+) -> pd.DataFrame:
+    """
+    Add lag/rolling features and one target column per horizon.
+
+    For horizon h, target_h{h} is the max_aqi of the same location exactly
+    h days later and target_date_h{h} is that date. The history only holds
+    real (non-interpolated) days, so when that day is missing both are
+    left empty rather than taking the next row, which could be several
+    days later. Rows are kept even when features or targets are missing;
+    callers filter per use.
+    """
+    frame = add_lag_features(df).reset_index(drop=True)
+    by_day = frame.set_index(["location_id", "date"])["max_aqi"]
+
+    for h in horizons:
+        target_dates = frame["date"] + pd.Timedelta(days=h)
+        targets = by_day.reindex(pd.MultiIndex.from_arrays([frame["location_id"], target_dates]))
+        frame[f"target_h{h}"] = targets.to_numpy(dtype=float)
+        frame[f"target_date_h{h}"] = target_dates.where(frame[f"target_h{h}"].notna())
+
+    return frame
+
+
+def make_origins(
+    dates: pd.Series,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+    step_days: int = STEP_DAYS,
+) -> pd.DatetimeIndex:
+    """
+    Forecast origins between start and end (inclusive), every step_days.
+
+    Defaults to starting two weeks after the first observed date so the
+    first origin has full lag features and some training history.
+    """
+    first, last = dates.min(), dates.max()
+    start = start if start is not None else first + pd.Timedelta(days=14)
+    end = end if end is not None else last
+    return pd.date_range(start, end, freq=f"{step_days}D")
+
+
+def _init_worker(frame: pd.DataFrame) -> None:
+    global _FRAME
+    _FRAME = frame
+
+
+def _score_block(
+    origins: pd.DatetimeIndex,
+    horizons: Sequence[int],
+    n_estimators: int,
+) -> pd.DataFrame:
+    """
+    Fit every model once at the first origin of the block, then score all
+    locations at all origins in the block in one batch per model/horizon.
+    """
+    frame = _FRAME
+    fit_origin = origins[0]
+    history = frame[frame["date"] <= fit_origin]
+    # History-based baselines (ewma, seasonal_naive) only look backwards, so
+    # scoring them over everything up to the last origin cannot leak.
+    visible = frame[frame["date"] <= origins[-1]]
+    scoring = frame[frame["date"].isin(origins)]
+
+    baselines = {name: NaiveAQIForecastModel(strategy=name) for name in STRATEGIES}
+    for model in baselines.values():
+        model.fit(history)
+
+    parts: List[pd.DataFrame] = []
+
+    for h in horizons:
+        target_col = f"target_h{h}"
+        target_date_col = f"target_date_h{h}"
+
+        rows = scoring[scoring[target_col].notna()]
+        if rows.empty:
+            continue
+
+        predictions: Dict[str, np.ndarray] = {}
+        for name, model in baselines.items():
+            if name == "seasonal_naive" and h > SEASON_DAYS:
+                continue
+            model = replace(model, horizon=h)
+            predictions[name] = model.predict(visible).loc[rows.index].to_numpy()
+
+        # Only targets already observed at the fit origin are usable for training.
+        train = frame[
+            frame[target_date_col].notna()
+            & (frame[target_date_col] <= fit_origin)
+        ].dropna(subset=FEATURE_COLUMNS + [target_col])
+        features = rows[FEATURE_COLUMNS]
+        has_features = features.notna().all(axis=1).to_numpy()
+
+        if len(train) >= MIN_TRAIN_ROWS and has_features.any():
+            rf = RandomForestRegressor(
+                n_estimators=n_estimators,
+                max_samples=min(len(train), MAX_TREE_SAMPLES),
+                random_state=42,
+                n_jobs=1,  # parallelism comes from the process pool
+            )
+            rf.fit(train[FEATURE_COLUMNS], train[target_col])
+            rf_pred = np.full(len(rows), np.nan)
+            rf_pred[has_features] = rf.predict(features[has_features])
+            predictions["random_forest"] = rf_pred
+
+        for name, forecast in predictions.items():
+            parts.append(
+                pd.DataFrame(
+                    {
+                        "model": name,
+                        "location_id": rows["location_id"].to_numpy(),
+                        "origin": rows["date"].to_numpy(),
+                        "horizon": h,
+                        "target_date": rows[target_date_col].to_numpy(),
+                        "forecast": forecast,
+                        "actual": rows[target_col].to_numpy(dtype=float),
+                    }
+                )
+            )
+
+    if not parts:
+        return pd.DataFrame()
+
+    out = pd.concat(parts, ignore_index=True)
+    return out[out["forecast"].notna()]
+
+
+def summarize(predictions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Collapse per-forecast errors into a metrics table keyed by
+    (model, location_id, horizon, month).
+    """
+    if predictions.empty:
+        return pd.DataFrame(
+            columns=["model", "location_id", "horizon", "month", "n", "mae", "rmse", "bias"]
+        )
+
+    err = predictions["forecast"] - predictions["actual"]
+    work = pd.DataFrame(
+        {
+            "model": predictions["model"].astype("category"),
+            "location_id": predictions["location_id"].astype("int32"),
+            "horizon": predictions["horizon"].astype("int8"),
+            "month": predictions["target_date"].dt.strftime("%Y-%m"),
+            "err": err,
+            "abs_err": err.abs(),
+            "sq_err": err * err,
+        }
+    )
+
+    metrics = (
+        work.groupby(["model", "location_id", "horizon", "month"], observed=True)
+        .agg(
+            n=("err", "size"),
+            mae=("abs_err", "mean"),
+            mse=("sq_err", "mean"),
+            bias=("err", "mean"),
+        )
+        .reset_index()
+    )
+    metrics["rmse"] = np.sqrt(metrics.pop("mse"))
+    metrics[["mae", "rmse", "bias"]] = metrics[["mae", "rmse", "bias"]].astype("float32")
+    metrics["n"] = metrics["n"].astype("int32")
+
+    return metrics[["model", "location_id", "horizon", "month", "n", "mae", "rmse", "bias"]]
+
+
+def run_backtest(
+    df: pd.DataFrame,
+    horizons: Sequence[int] = DEFAULT_HORIZONS,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+    step_days: int = STEP_DAYS,
+    refit_days: int = REFIT_DAYS,
+    n_estimators: int = 100,
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Run a rolling-origin backtest over df (location_id, date, max_aqi)
+    and return the metrics table from summarize().
+
+    Origins are split into blocks of refit_days; each block is one unit of
+    work. workers=1 runs inline, which is handy for tests and Windows.
+    """
+    if df.empty:
+        return summarize(pd.DataFrame())
+
+    frame = build_backtest_frame(df, horizons)
+    origins = make_origins(frame["date"], start, end, step_days)
+    if len(origins) == 0:
+        return summarize(pd.DataFrame())
+
+    per_block = max(1, refit_days // step_days)
+    blocks = [origins[i:i + per_block] for i in range(0, len(origins), per_block)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        _init_worker(frame)
+        results = [_score_block(b, horizons, n_estimators) for b in blocks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(blocks)),
+            initializer=_init_worker,
+            initargs=(frame,),
+        ) as pool:
+            results = list(
+                pool.map(
+                    _score_block,
+                    blocks,
+                    [horizons] * len(blocks),
+                    [n_estimators] * len(blocks),
+                )
+            )
+
+    results = [r for r in results if not r.empty]
+    predictions = pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+    return summarize(predictions)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of AQI models.")
+    parser.add_argument("--start", type=pd.Timestamp, help="First forecast origin (YYYY-MM-DD).")
+    parser.add_argument("--end", type=pd.Timestamp, help="Last forecast origin (YYYY-MM-DD).")
+    parser.add_argument("--horizons", type=int, nargs="+", default=list(DEFAULT_HORIZONS))
+    parser.add_argument("--step-days", type=int, default=STEP_DAYS)
+    parser.add_argument("--refit-days", type=int, default=REFIT_DAYS)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    print_settings_summary()
+    print("\nLoading daily_aggregates for backtest...")
+
+    df = load_daily_aggregates()
+    if df.empty:
+        print("⚠️ daily_aggregates is empty. Run ingestion + build_features first.")
+        return
+
+    print(f"Loaded {len(df)} daily_aggregates row(s). Running backtest...")
+
+    metrics = run_backtest(
+        df,
+        horizons=args.horizons,
+        start=args.start,
+        end=args.end,
+        step_days=args.step_days,
+        refit_days=args.refit_days,
+        n_estimators=args.n_estimators,
+        workers=args.workers,
+    )
+
+    if metrics.empty:
+        print("⚠️ No forecasts could be scored. Collect more history first.")
+        return
+
+    overall = (
+        metrics.assign(abs_sum=metrics["mae"] * metrics["n"])
+        .groupby(["model", "horizon"], observed=True)
+        .agg(n=("n", "sum"), abs_sum=("abs_sum", "sum"))
+    )
+    overall["mae"] = overall["abs_sum"] / overall["n"]
+    print("\nOverall MAE by model and horizon:")
+    print(overall[["n", "mae"]].round(3).to_string())
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    metrics.to_csv(args.output, index=False)
+    print(f"\n✅ Saved {len(metrics)} metric row(s) to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
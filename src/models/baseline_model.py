@@ -1,8 +1,14 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+STRATEGIES = ("persistence", "mean", "seasonal_naive", "ewma", "climatology")
+
+DAYS_PER_YEAR = 366  # day-of-year slots, leap day included
+SEASON_DAYS = 7      # seasonal_naive period: same weekday last week
+
 
 @dataclass
 class NaiveAQIForecastModel:
@@ -10,14 +16,41 @@ class NaiveAQIForecastModel:
     Very simple baseline AQI forecasting model.
 
     strategy = "persistence":
-        forecast_aqi(t+1) = observed max_aqi(t) for each location.
+        forecast_aqi(t+h) = observed max_aqi(t) for each location.
 
     strategy = "mean":
-        forecast_aqi(t+1) = mean of historical max_aqi for that location.
+        forecast_aqi(t+h) = mean of historical max_aqi for that location.
+
+    strategy = "seasonal_naive":
+        forecast_aqi(t+h) = max_aqi on the same weekday one week earlier
+        (t+h-7). Falls back to persistence when that day is missing.
+
+    strategy = "ewma":
+        forecast_aqi(t+h) = exponentially weighted mean of max_aqi up to t,
+        with smoothing factor alpha.
+
+    strategy = "climatology":
+        forecast_aqi(t+h) = historical mean max_aqi for that location on
+        the target day of year, smoothed over +/- window_days.
+
+    Fitted parameters are dense arrays indexed by position in the sorted
+    location_ids_ array, so fit and predict are a handful of vectorized
+    NumPy passes regardless of how many locations are scored. Locations
+    unseen during fit fall back to global_mean_.
+
+    seasonal_naive and ewma are computed from the history contained in the
+    frame passed to predict (rows per location, any order), so pass the
+    recent history rather than only the latest row per location.
     """
 
     strategy: str = "persistence"
-    location_means_: Optional[dict] = None
+    horizon: int = 1
+    alpha: float = 0.3
+    window_days: int = 7
+    location_means_: Optional[np.ndarray] = None
+    location_ids_: Optional[np.ndarray] = None
+    climatology_: Optional[np.ndarray] = None
+    global_mean_: Optional[float] = None
 
     def fit(self, df: pd.DataFrame) -> None:
         """
@@ -28,20 +61,48 @@ class NaiveAQIForecastModel:
             - date
             - max_aqi
         """
-        if self.strategy == "mean":
-            self.location_means_ = (
-                df.groupby("location_id")["max_aqi"].mean().to_dict()
-            )
-        else:
-            # persistence model doesn't really need training
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {self.strategy}")
+
+        if self.strategy not in ("mean", "climatology"):
+            # persistence, seasonal_naive and ewma only need recent history
             self.location_means_ = None
+            return
+
+        values = df["max_aqi"].to_numpy(dtype=float)
+        self.location_ids_, codes = np.unique(
+            df["location_id"].to_numpy(dtype=np.int64), return_inverse=True
+        )
+        n_loc = len(self.location_ids_)
+
+        sums = np.bincount(codes, weights=values, minlength=n_loc)
+        counts = np.bincount(codes, minlength=n_loc)
+        self.location_means_ = (sums / counts).astype(np.float32)
+        self.global_mean_ = float(values.mean())
+
+        if self.strategy == "climatology":
+            doy = pd.DatetimeIndex(df["date"]).dayofyear.to_numpy() - 1
+            flat = codes * DAYS_PER_YEAR + doy
+            size = n_loc * DAYS_PER_YEAR
+            day_sums = np.bincount(flat, weights=values, minlength=size)
+            day_counts = np.bincount(flat, minlength=size).astype(float)
+
+            day_sums = _circular_window_sum(day_sums.reshape(n_loc, -1), self.window_days)
+            day_counts = _circular_window_sum(day_counts.reshape(n_loc, -1), self.window_days)
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                clim = day_sums / day_counts
+            self.climatology_ = np.where(
+                day_counts > 0, clim, self.location_means_[:, None]
+            ).astype(np.float32)
 
     def predict(self, df: pd.DataFrame) -> pd.Series:
         """
-        Predict next-day AQI for each row in df.
+        Predict AQI `horizon` days after each row in df.
 
         Expects df with:
             - location_id
+            - date     (climatology, seasonal_naive, ewma)
             - max_aqi  (most recent day's max AQI)
         """
         if self.strategy == "persistence":
@@ -52,6 +113,95 @@ class NaiveAQIForecastModel:
             if self.location_means_ is None:
                 raise RuntimeError("Model not fitted: location_means_ is None.")
 
-            return df["location_id"].map(self.location_means_).astype(float)
+            idx, known = self._location_index(df["location_id"])
+            out = np.where(known, self.location_means_[idx], self.global_mean_)
+            return pd.Series(out.astype(float), index=df.index)
+
+        if self.strategy == "climatology":
+            if self.climatology_ is None:
+                raise RuntimeError("Model not fitted: climatology_ is None.")
+
+            target = pd.DatetimeIndex(df["date"]) + pd.Timedelta(days=self.horizon)
+            doy = target.dayofyear.to_numpy() - 1
+            idx, known = self._location_index(df["location_id"])
+            out = np.where(known, self.climatology_[idx, doy], self.global_mean_)
+            return pd.Series(out.astype(float), index=df.index)
+
+        if self.strategy == "seasonal_naive":
+            if not 1 <= self.horizon <= SEASON_DAYS:
+                raise ValueError(
+                    f"seasonal_naive supports horizons 1..{SEASON_DAYS}, got {self.horizon}"
+                )
+            return self._predict_segments(df, self._seasonal_naive_sorted)
+
+        if self.strategy == "ewma":
+            return self._predict_segments(df, self._ewma_sorted)
 
         raise ValueError(f"Unknown strategy: {self.strategy}")
+
+    def _location_index(self, location_ids: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """Map location ids to rows of the fitted arrays, flagging unknown ids."""
+        ids = location_ids.to_numpy(dtype=np.int64)
+        idx = np.searchsorted(self.location_ids_, ids)
+        idx = np.minimum(idx, len(self.location_ids_) - 1)
+        known = self.location_ids_[idx] == ids
+        return idx, known
+
+    def _predict_segments(self, df: pd.DataFrame, func) -> pd.Series:
+        """
+        Sort rows into contiguous per-location segments ordered by date,
+        apply func to the sorted arrays and scatter results back to df order.
+        """
+        loc = df["location_id"].to_numpy(dtype=np.int64)
+        days = df["date"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+        values = df["max_aqi"].to_numpy(dtype=float)
+
+        order = np.lexsort((days, loc))
+        out = np.empty(len(df))
+        out[order] = func(loc[order], days[order], values[order])
+        return pd.Series(out, index=df.index)
+
+    def _seasonal_naive_sorted(
+        self, loc: np.ndarray, days: np.ndarray, values: np.ndarray
+    ) -> np.ndarray:
+        # (location, day) keys are strictly increasing after the lexsort, so
+        # "same location, SEASON_DAYS before the target" is one searchsorted.
+        keys = (loc << 32) + days
+        wanted = keys + (self.horizon - SEASON_DAYS)
+        pos = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+        hit = keys[pos] == wanted
+        return np.where(hit, values[pos], values)
+
+    def _ewma_sorted(
+        self, loc: np.ndarray, days: np.ndarray, values: np.ndarray
+    ) -> np.ndarray:
+        if len(values) == 0:
+            return values
+
+        # scipy.signal takes about a second to import and only the ewma
+        # strategy needs it, so it is not imported at module level.
+        from scipy.signal import lfilter
+
+        # Run one linear filter over the concatenated segments, then remove
+        # the carry-over from the previous segment, which decays as
+        # (1 - alpha) ** (position + 1). Each segment starts at its first value.
+        decay = 1.0 - self.alpha
+        smoothed = lfilter([self.alpha], [1.0, -decay], values)
+
+        starts = np.flatnonzero(np.r_[True, loc[1:] != loc[:-1]])
+        seg = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(loc)]))
+        pos = np.arange(len(loc)) - starts[seg]
+
+        carried = np.r_[0.0, smoothed[starts[1:] - 1]]
+        offset = carried - values[starts]
+        return smoothed - offset[seg] * decay ** (pos + 1)
+
+
+def _circular_window_sum(a: np.ndarray, half_width: int) -> np.ndarray:
+    """Sum each column of a over +/- half_width columns, wrapping around the year."""
+    if half_width <= 0:
+        return a
+    ext = np.concatenate([a[:, -half_width:], a, a[:, :half_width]], axis=1)
+    cs = np.concatenate([np.zeros((a.shape[0], 1)), np.cumsum(ext, axis=1)], axis=1)
+    width = 2 * half_width + 1
+    return cs[:, width:] - cs[:, :-width]
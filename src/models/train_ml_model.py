@@ -1,16 +1,19 @@
 from pathlib import Path
+from typing import List, Optional
 
 import pandas as pd
-from sqlalchemy import text
 from joblib import dump
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error
 
 from src.db.connection import get_engine
-from src.config.settings import print_settings_summary
+from src.db.frames import AQI, DATE, LOCATION_ID, NULLABLE_AQI, read_frame
+from src.config.settings import POLLUTANT_LAGS, print_settings_summary
+from src.features.build_features import POLLUTANT_LAG_COLUMNS, POLLUTANTS, add_pollutant_lags
+from src.telemetry import record, tracked_stage
 
 
-def load_daily_aggregates() -> pd.DataFrame:
+def load_daily_aggregates(pollutants: bool = False) -> pd.DataFrame:
     """
     Load daily aggregates from the database.
 
@@ -18,19 +21,52 @@ def load_daily_aggregates() -> pd.DataFrame:
       - location_id
       - date
       - max_aqi
+      - <pollutant>_max_aqi for each pollutant, when pollutants=True
     """
     engine = get_engine()
-    sql = text(
-        """
-        SELECT location_id, date, max_aqi
+    dtypes = {"location_id": LOCATION_ID, "date": DATE, "max_aqi": AQI}
+    if pollutants:
+        dtypes.update({f"{prefix}_max_aqi": NULLABLE_AQI for prefix in POLLUTANTS})
+    sql = f"""
+        SELECT {", ".join(dtypes)}
         FROM daily_aggregates
         WHERE is_interpolated = FALSE
         ORDER BY location_id, date;
-        """
-    )
+    """
 
     with engine.connect() as conn:
-        df = pd.read_sql(sql, conn, parse_dates=["date"])
+        df = read_frame(conn, sql, dtypes)
+
+    return df
+
+
+FEATURE_COLUMNS = ["lag1", "lag2", "lag3", "roll3", "roll7"]
+
+
+def feature_columns(pollutant_lags: bool = False) -> List[str]:
+    return FEATURE_COLUMNS + (POLLUTANT_LAG_COLUMNS if pollutant_lags else [])
+
+
+def add_lag_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return a copy of df sorted by (location_id, date) with the lag and
+    rolling feature columns added. Rows keep NaN features where there is
+    not enough history yet. Pollutant lags are added too when df has the
+    per-pollutant max columns.
+    """
+    df = df.sort_values(["location_id", "date"]).copy()
+
+    # Group by location for time-based features
+    grouped = df.groupby("location_id", group_keys=False)
+
+    df["lag1"] = grouped["max_aqi"].shift(1)
+    df["lag2"] = grouped["max_aqi"].shift(2)
+    df["lag3"] = grouped["max_aqi"].shift(3)
+    df["roll3"] = grouped["max_aqi"].rolling(3).mean().reset_index(level=0, drop=True)
+    df["roll7"] = grouped["max_aqi"].rolling(7).mean().reset_index(level=0, drop=True)
+
+    if all(f"{prefix}_max_aqi" in df for prefix in POLLUTANTS):
+        df = add_pollutant_lags(df)
 
     return df
 
@@ -45,6 +81,8 @@ def build_features(df: pd.DataFrame) -> pd.DataFrame:
       - lag3: max_aqi(t-3)
       - roll3: rolling mean over last 3 days
       - roll7: rolling mean over last 7 days
+      - <pollutant>_lag1: that pollutant's max AQI(t-1), when df has the
+        per-pollutant columns (see load_daily_aggregates)
 
     Target:
       - target = max_aqi(t+1)  (next day's max AQI)
@@ -52,19 +90,10 @@ def build_features(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
 
-    df = df.sort_values(["location_id", "date"]).copy()
-
-    # Group by location for time-based features
-    grouped = df.groupby("location_id", group_keys=False)
-
-    df["lag1"] = grouped["max_aqi"].shift(1)
-    df["lag2"] = grouped["max_aqi"].shift(2)
-    df["lag3"] = grouped["max_aqi"].shift(3)
-    df["roll3"] = grouped["max_aqi"].rolling(3).mean().reset_index(level=0, drop=True)
-    df["roll7"] = grouped["max_aqi"].rolling(7).mean().reset_index(level=0, drop=True)
+    df = add_lag_features(df)
 
     # Target: next day's max_aqi
-    df["target"] = grouped["max_aqi"].shift(-1)
+    df["target"] = df.groupby("location_id")["max_aqi"].shift(-1)
 
     # Drop rows where we don't have full feature history or target
     feature_cols = ["lag1", "lag2", "lag3", "roll3", "roll7", "target"]
@@ -73,18 +102,23 @@ def build_features(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def train_random_forest(df_feat: pd.DataFrame, model_path: Path) -> None:
+def train_random_forest(
+    df_feat: pd.DataFrame,
+    model_path: Path,
+    features: List[str] = FEATURE_COLUMNS,
+) -> None:
     """
     Train a RandomForestRegressor on the feature dataframe and save the model.
 
+    The model is fit on a DataFrame, so it keeps the feature names in
+    feature_names_in_ and the forecast step knows which columns to pass.
     Also prints simple evaluation metrics and baseline comparison.
     """
     if df_feat.empty:
         print("⚠️ No feature rows available for training. Collect more data first.")
         return
 
-    feature_columns = ["lag1", "lag2", "lag3", "roll3", "roll7"]
-    X = df_feat[feature_columns]
+    X = df_feat[features]
     y = df_feat["target"]
 
     n_rows = len(df_feat)
@@ -122,16 +156,20 @@ def train_random_forest(df_feat: pd.DataFrame, model_path: Path) -> None:
     print(f"✅ Saved RandomForest model to: {model_path}")
 
 
-def main() -> None:
+@tracked_stage("train")
+def main(pollutant_lags: Optional[bool] = None) -> None:
+    """Train on all history; pollutant_lags defaults to AQI_POLLUTANT_LAGS."""
+    pollutant_lags = POLLUTANT_LAGS if pollutant_lags is None else pollutant_lags
     print_settings_summary()
     print("\nLoading daily_aggregates for ML training...")
 
-    df = load_daily_aggregates()
+    df = load_daily_aggregates(pollutants=pollutant_lags)
 
     if df.empty:
         print("⚠️ daily_aggregates is empty. Run ingestion + build_features first.")
         return
 
+    record(rows_read=len(df))
     print(f"Loaded {len(df)} daily_aggregates row(s). Building features...")
 
     df_feat = build_features(df)
@@ -141,7 +179,9 @@ def main() -> None:
     base_dir = Path(__file__).resolve().parents[2]
     model_file = base_dir / "models" / "aqi_rf_model.joblib"
 
-    train_random_forest(df_feat, model_file)
+    features = feature_columns(pollutant_lags)
+    print(f"Features: {', '.join(features)}")
+    train_random_forest(df_feat, model_file, features)
 
 
 if __name__ == "__main__":
@@ -1,12 +1,17 @@
+import argparse
 from pathlib import Path
 
 import pandas as pd
-from sqlalchemy import text
 from joblib import dump
 
 from src.db.connection import get_engine
+from src.db.frames import AQI, DATE, LOCATION_ID, read_frame
 from src.config.settings import print_settings_summary
-from src.models.baseline_model import NaiveAQIForecastModel
+from src.models.baseline_model import STRATEGIES, NaiveAQIForecastModel
+from src.telemetry import record, tracked_stage
+
+# Project root: src/models/train_model.py → parents[2]
+BASELINE_MODEL_PATH = Path(__file__).resolve().parents[2] / "models" / "aqi_baseline_model.joblib"
 
 
 def load_training_data() -> pd.DataFrame:
@@ -19,24 +24,26 @@ def load_training_data() -> pd.DataFrame:
         - max_aqi
     """
     engine = get_engine()
-    sql = text(
-        """
+    sql = """
         SELECT location_id, date, max_aqi
         FROM daily_aggregates
         WHERE is_interpolated = FALSE
         ORDER BY location_id, date;
-        """
-    )
+    """
 
     with engine.connect() as conn:
-        df = pd.read_sql(sql, conn, parse_dates=["date"])
+        df = read_frame(conn, sql, {"location_id": LOCATION_ID, "date": DATE, "max_aqi": AQI})
 
     return df
 
 
-def train_and_save(model_path: Path) -> None:
+@tracked_stage("train_baseline")
+def train_and_save(model_path: Path, strategy: str = "persistence") -> None:
     """
     Train the baseline model and save it to disk as a joblib file.
+
+    forecast_and_notify falls back to this artifact when the RandomForest
+    model file is missing.
     """
     print_settings_summary()
     print("\nLoading training data from daily_aggregates...")
@@ -47,11 +54,12 @@ def train_and_save(model_path: Path) -> None:
         print("⚠️ No data in daily_aggregates. Run ingestion + aggregation first.")
         return
 
+    record(rows_read=len(df))
     print(f"Loaded {len(df)} daily aggregate row(s).")
 
-    # For now, use a persistence baseline model:
-    model = NaiveAQIForecastModel(strategy="persistence")
+    model = NaiveAQIForecastModel(strategy=strategy)
     model.fit(df)
+    print(f"Fitted {strategy!r} baseline.")
 
     model_path.parent.mkdir(parents=True, exist_ok=True)
     dump(model, model_path)
@@ -60,7 +68,8 @@ def train_and_save(model_path: Path) -> None:
 
 
 if __name__ == "__main__":
-    # Project root: src/models/train_model.py → parents[2]
-    base_dir = Path(__file__).resolve().parents[2]
-    model_file = base_dir / "models" / "aqi_baseline_model.joblib"
-    train_and_save(model_file)
+    parser = argparse.ArgumentParser(description="Train and save the baseline AQI model.")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="persistence")
+    args = parser.parse_args()
+
+    train_and_save(BASELINE_MODEL_PATH, strategy=args.strategy)
@@ -0,0 +1,339 @@
+"""
+Run the pipeline stages as a dependency graph in one process.
+
+    ingest ─► aggregate ─┬─► backfill ─┬─► train ──► forecast ─┬─► deliver
+                         │             └─► evaluate            └─► grid
+                         └─► retention
+
+A stage starts as soon as all of its upstream stages have finished, so
+independent stages (train and evaluate) run in parallel threads. Stage
+modules are imported only when the stage actually runs, and all stages
+share one engine and connection pool.
+
+Each stage (except ingest) has a cheap signal query over its inputs,
+e.g. the newest observation id for aggregate. The signal seen by the
+last successful run is kept in pipeline_stage_state; when it hasn't
+moved the stage is skipped. An hourly run with no new data therefore
+costs the ingest calls plus a handful of index lookups.
+
+A session-level advisory lock keeps two runs from overlapping; a run
+that cannot take it exits immediately. The event worker waits for the
+same lock before each batch, and shard workers hold it in shared mode
+for each cycle. Pass --force to run every stage
+regardless of its signal.
+"""
+import argparse
+import importlib
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from src.config.settings import OBSERVATION_RETENTION_DAYS, print_settings_summary
+from src.db.connection import get_engine
+
+BASE_DIR = Path(__file__).resolve().parents[1]  # project root
+MODEL_PATHS = (
+    BASE_DIR / "models" / "aqi_rf_model.joblib",
+    BASE_DIR / "models" / "aqi_baseline_model.joblib",
+)
+
+# Arbitrary constant shared by every orchestrator process.
+PIPELINE_LOCK_KEY = 4_127_001
+MAX_PARALLEL_STAGES = 4
+
+
+def _scalar_signal(sql: str) -> Callable[..., Optional[str]]:
+    def signal(conn) -> Optional[str]:
+        value = conn.execute(text(sql)).scalar_one_or_none()
+        return None if value is None else str(value)
+    return signal
+
+
+def _forecast_signal(conn) -> Optional[str]:
+    latest = _scalar_signal("SELECT MAX(updated_at) FROM daily_aggregates")(conn)
+    if latest is None:
+        return None
+    model_mtimes = [str(p.stat().st_mtime_ns) for p in MODEL_PATHS if p.exists()]
+    return "|".join([latest, *model_mtimes])
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    target: str  # "module:function", imported when the stage runs
+    upstream: Tuple[str, ...] = ()
+    # Returns a token describing the stage's inputs; None means there is
+    # nothing to process. No signal means the stage always runs.
+    signal: Optional[Callable[..., Optional[str]]] = None
+
+
+STAGES: Tuple[Stage, ...] = (
+    Stage("ingest", "src.ingest.ingest_airnow:run_ingestion"),
+    Stage(
+        "aggregate", "src.features.build_features:run_daily_aggregation",
+        upstream=("ingest",),
+        signal=_scalar_signal("SELECT MAX(id) FROM observations"),
+    ),
+    Stage(
+        "backfill", "src.backfill_interpolate:run_backfill",
+        upstream=("aggregate",),
+        signal=_scalar_signal("SELECT MAX(updated_at) FROM daily_aggregates"),
+    ),
+    Stage(
+        # Retrain when a completed day changes, not on every partial-day update.
+        "train", "src.models.train_ml_model:main",
+        upstream=("backfill",),
+        signal=_scalar_signal("""
+            SELECT MAX(updated_at) FROM daily_aggregates
+            WHERE date < CURRENT_DATE AND is_interpolated = FALSE
+        """),
+    ),
+    Stage(
+        # CURRENT_DATE: at midnight yesterday becomes complete (and
+        # scoreable) without any row changing.
+        "evaluate", "src.evaluate_forecasts:run_evaluation",
+        upstream=("backfill",),
+        signal=_scalar_signal("""
+            SELECT GREATEST(
+                (SELECT MAX(updated_at) FROM daily_aggregates),
+                (SELECT MAX(created_at) FROM forecasts)
+            )::text || ':' || CURRENT_DATE
+        """),
+    ),
+    Stage(
+        "forecast", "src.forecast_and_notify:run_forecast_and_notify",
+        upstream=("train",),
+        signal=_forecast_signal,
+    ),
+    Stage(
+        # Only runs when some observation has aged past the retention window.
+        "retention", "src.retention:run_retention",
+        upstream=("aggregate",),
+        signal=_scalar_signal(f"""
+            SELECT MIN(timestamp_utc)::date FROM observations
+            WHERE timestamp_utc < date_trunc('day', NOW())
+                                  - make_interval(days => {OBSERVATION_RETENTION_DAYS})
+        """),
+    ),
+    Stage(
+        # Both grids: the observations one moves with each ingest.
+        "grid", "src.grid:run_grid",
+        upstream=("forecast",),
+        signal=_scalar_signal("""
+            SELECT NULLIF(concat_ws(':',
+                (SELECT MAX(id) FROM observations),
+                (SELECT MAX(created_at) FROM forecasts)
+            ), '')
+        """),
+    ),
+    Stage(
+        "deliver", "src.deliver_notifications:run_delivery",
+        upstream=("forecast",),
+        signal=_scalar_signal("""
+            SELECT md5(string_agg(id || ':' || attempts, ',' ORDER BY id))
+            FROM notification_outbox
+            WHERE status = 'pending' AND next_attempt_at <= NOW()
+        """),
+    ),
+)
+
+
+def ensure_orchestrator_table(conn) -> None:
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS pipeline_stage_state (
+            stage TEXT PRIMARY KEY,
+            signal TEXT,
+            completed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """))
+
+
+def execution_order(stages: Sequence[Stage]) -> Tuple[str, ...]:
+    """
+    Topological order of the stage names. Raises ValueError for an unknown
+    upstream stage or a cycle.
+    """
+    by_name = {s.name: s for s in stages}
+    order, visiting, done = [], set(), set()
+
+    def visit(name: str) -> None:
+        if name in done:
+            return
+        if name not in by_name:
+            raise ValueError(f"Unknown stage: {name}")
+        if name in visiting:
+            raise ValueError(f"Stage dependency cycle through: {name}")
+        visiting.add(name)
+        for parent in by_name[name].upstream:
+            visit(parent)
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for stage in stages:
+        visit(stage.name)
+    return tuple(order)
+
+
+def should_run(signal: Optional[str], last_signal: Optional[str]) -> bool:
+    """A stage runs when its inputs exist and differ from the last completed run."""
+    return signal is not None and signal != last_signal
+
+
+def _call(target: str) -> None:
+    module_name, func_name = target.split(":")
+    getattr(importlib.import_module(module_name), func_name)()
+
+
+class Orchestrator:
+    def __init__(self, stages: Sequence[Stage] = STAGES, force: bool = False):
+        execution_order(stages)  # validate the graph up front
+        self.stages = {s.name: s for s in stages}
+        self.force = force
+        self.status: Dict[str, str] = {}
+
+    def _signals(self, stage: Stage) -> Tuple[Optional[str], Optional[str]]:
+        with get_engine().connect() as conn:
+            last = conn.execute(
+                text("SELECT signal FROM pipeline_stage_state WHERE stage = :stage"),
+                {"stage": stage.name},
+            ).scalar_one_or_none()
+            return stage.signal(conn), last
+
+    def _save_signal(self, stage: Stage, signal: Optional[str]) -> None:
+        with get_engine().begin() as conn:
+            conn.execute(text("""
+                INSERT INTO pipeline_stage_state (stage, signal, completed_at)
+                VALUES (:stage, :signal, NOW())
+                ON CONFLICT (stage) DO UPDATE
+                SET signal = EXCLUDED.signal, completed_at = EXCLUDED.completed_at
+            """), {"stage": stage.name, "signal": signal})
+
+    def _run_stage(self, stage: Stage) -> str:
+        signal = None
+        if stage.signal is not None:
+            # Read before running, so changes made during the run are seen next time.
+            signal, last = self._signals(stage)
+            if not self.force and not should_run(signal, last):
+                print(f"⏭️  {stage.name}: inputs unchanged, skipping.")
+                return "skipped"
+
+        start = time.perf_counter()
+        print(f"▶️  {stage.name}: running...")
+        _call(stage.target)
+        if stage.signal is not None:
+            self._save_signal(stage, signal)
+        print(f"✅ {stage.name}: done in {time.perf_counter() - start:.1f}s")
+        return "success"
+
+    def _ready(self, name: str) -> bool:
+        return all(self.status.get(parent) in ("success", "skipped")
+                   for parent in self.stages[name].upstream)
+
+    def _blocked(self, name: str) -> bool:
+        return any(self.status.get(parent) in ("failed", "blocked")
+                   for parent in self.stages[name].upstream)
+
+    def run(self) -> Dict[str, str]:
+        """Run the graph; returns each stage's outcome."""
+        with get_engine().begin() as conn:
+            ensure_orchestrator_table(conn)
+
+        pending = set(self.stages)
+        running = {}
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_STAGES) as pool:
+            while pending or running:
+                for name in sorted(pending):
+                    if self._blocked(name):
+                        print(f"⚠️  {name}: upstream stage failed, not running.")
+                        self.status[name] = "blocked"
+                        pending.discard(name)
+                    elif self._ready(name):
+                        running[pool.submit(self._run_stage, self.stages[name])] = name
+                        pending.discard(name)
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.status[name] = future.result()
+                    except Exception as exc:
+                        print(f"❌ {name}: failed: {exc}")
+                        self.status[name] = "failed"
+        return self.status
+
+
+@contextmanager
+def pipeline_lock(wait: bool = False, shared: bool = False) -> Iterator[bool]:
+    """
+    Hold the pipeline advisory lock for the body of the with block. Yields
+    whether it was acquired; with wait=True, blocks until it is.
+
+    shared=True takes the lock in shared mode, for shard workers: they
+    only touch their own shards' locations, so they may overlap each
+    other but never a full run or an event worker batch.
+    """
+    suffix = "_shared" if shared else ""
+    with get_engine().connect() as lock_conn:
+        if wait:
+            lock_conn.execute(text(f"SELECT pg_advisory_lock{suffix}(:key)"), {"key": PIPELINE_LOCK_KEY})
+            locked = True
+        else:
+            locked = lock_conn.execute(
+                text(f"SELECT pg_try_advisory_lock{suffix}(:key)"), {"key": PIPELINE_LOCK_KEY}
+            ).scalar_one()
+        lock_conn.commit()
+        try:
+            yield locked
+        finally:
+            if locked:
+                lock_conn.execute(
+                    text(f"SELECT pg_advisory_unlock{suffix}(:key)"), {"key": PIPELINE_LOCK_KEY}
+                )
+                lock_conn.commit()
+
+
+def run_pipeline(force: bool = False) -> Optional[Dict[str, str]]:
+    """
+    Run the whole pipeline under the advisory lock. Returns None without
+    doing anything if another run holds the lock.
+    """
+    with pipeline_lock() as locked:
+        if not locked:
+            print("⚠️  Another pipeline run is in progress; exiting.")
+            return None
+        return Orchestrator(force=force).run()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the AQI pipeline as a dependency graph.")
+    parser.add_argument("--force", action="store_true",
+                        help="Run every stage even if its inputs are unchanged.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write a cProfile report per stage (see src.profiling).")
+    args = parser.parse_args(argv)
+    if args.profile:
+        from src.profiling import enable_profiling
+        enable_profiling()
+
+    print_settings_summary()
+    start = time.perf_counter()
+    status = run_pipeline(force=args.force)
+    if status is None:
+        return 0
+
+    summary = ", ".join(f"{name}={status[name]}" for name in execution_order(STAGES))
+    print(f"\nPipeline finished in {time.perf_counter() - start:.1f}s: {summary}")
+    return 1 if any(s in ("failed", "blocked") for s in status.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Opt-in profiling for pipeline stages and API requests, plus a slow-query log.
+
+Profiling (AQI_PROFILE=true, or `./aqi --profile <command>`):
+    Every @tracked_stage entry point runs under cProfile and writes
+    <AQI_PROFILE_DIR>/<stage>-<run id>-<time>.prof (open with snakeviz or
+    `python -m pstats`) and a .txt summary of the top functions by
+    cumulative time. The API profiles each request the same way. Only
+    one profile is collected at a time per process; when stages overlap
+    (orchestrator threads, concurrent requests) the later one runs
+    unprofiled.
+
+Slow-query log (AQI_SLOW_QUERY_MS=<ms>, or `./aqi --slow-query-ms <ms>`):
+    Engine event hooks time every statement and append those slower than
+    the threshold to logs/slow_queries.jsonl with the statement, the shape
+    of its parameters (types and list lengths, never values), the duration
+    and the stage that ran it.
+
+Both are off by default. Then no profiler is created and no engine
+listener is registered, so they add nothing to a normal run.
+"""
+import cProfile
+import io
+import json
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.config.settings import PROFILE, PROFILE_DIR, SLOW_QUERY_MS
+
+BASE_DIR = Path(__file__).resolve().parents[1]  # project root
+PROFILES_PATH = Path(PROFILE_DIR) if Path(PROFILE_DIR).is_absolute() else BASE_DIR / PROFILE_DIR
+SLOW_QUERY_LOG_PATH = BASE_DIR / "logs" / "slow_queries.jsonl"
+
+SUMMARY_LINES = 40
+MAX_STATEMENT_CHARS = 2000
+
+_enabled = PROFILE
+_profile_lock = threading.Lock()
+
+
+def profiling_enabled() -> bool:
+    return _enabled
+
+
+def enable_profiling(enabled: bool = True) -> None:
+    """Turn stage profiling on or off for the rest of the process."""
+    global _enabled
+    _enabled = enabled
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "root"
+
+
+@contextmanager
+def profiled(name: str, output_dir: Path = PROFILES_PATH) -> Iterator[Optional[Path]]:
+    """
+    Profile the body of the with block into output_dir/<name>-<time>.prof.
+    Yields the path, or None when another profile is already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        yield None
+        return
+
+    path = output_dir / f"{_safe_name(name)}-{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}.prof"
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            yield path
+        finally:
+            profiler.disable()
+            write_profile(profiler, path)
+    finally:
+        _profile_lock.release()
+
+
+def write_profile(profiler: cProfile.Profile, path: Path) -> None:
+    """Dump raw stats to path and a top-functions summary next to it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(path))
+
+    buffer = io.StringIO()
+    stats = pstats.Stats(profiler, stream=buffer)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(SUMMARY_LINES)
+    path.with_suffix(".txt").write_text(buffer.getvalue(), encoding="utf-8")
+    print(f"📈 Profile written to {path}")
+
+
+# --- slow-query log -----------------------------------------------------------
+
+def parameter_shape(parameters: Any) -> Any:
+    """
+    Describe bound parameters without their values: type names, list
+    lengths, and the number of parameter sets for executemany.
+    """
+    if isinstance(parameters, dict):
+        return {key: parameter_shape(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and all(isinstance(p, (dict, list, tuple)) for p in parameters):
+            return {"sets": len(parameters), "first": parameter_shape(parameters[0])}
+        return f"{type(parameters).__name__}[{len(parameters)}]"
+    return type(parameters).__name__
+
+
+def _collapse(statement: str) -> str:
+    statement = " ".join(statement.split())
+    if len(statement) > MAX_STATEMENT_CHARS:
+        statement = statement[:MAX_STATEMENT_CHARS] + "..."
+    return statement
+
+
+def install_slow_query_log(engine: Engine, threshold_ms: float = SLOW_QUERY_MS) -> None:
+    """Log statements on engine that take at least threshold_ms."""
+    # Imported here: telemetry itself imports the connection module.
+    from src.telemetry import append_line, current_stage_name, flush_logs
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("aqi_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["aqi_query_start"].pop()
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < threshold_ms:
+            return
+        entry: Dict[str, Any] = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration_ms, 1),
+            "stage": current_stage_name(),
+            "statement": _collapse(statement),
+            "parameters": parameter_shape(parameters),
+            "executemany": executemany,
+            "rowcount": cursor.rowcount,
+        }
+        append_line(SLOW_QUERY_LOG_PATH, json.dumps(entry, default=str))
+        flush_logs()  # rare by definition; don't hold entries until exit
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        conn = context.connection
+        if conn is not None and conn.info.get("aqi_query_start"):
+            conn.info["aqi_query_start"].pop()
@@ -0,0 +1,269 @@
+"""
+Tiered retention for raw observations.
+
+Observations older than OBSERVATION_RETENTION_DAYS are moved out of the
+hot observations table into zstd-compressed Parquet files, one directory
+per month (hive-style):
+
+    data/archive/observations/month=2026-05/part-<first id>-<last id>.parquet
+
+Each month is archived in its own REPEATABLE READ transaction: rows are
+streamed from a server-side cursor into the file, the file's row count is
+checked against the rows read and against COUNT(*) over the same
+snapshot, and only then are the rows deleted (the DELETE must remove the
+same number). Any mismatch rolls back and removes the file. A crash
+after the file is written but before the commit can leave rows in both
+tiers; read_observations drops such duplicates.
+
+The hot table then holds only the retention window, so its indexes stay
+small; a plain VACUUM after the run makes the freed space reusable.
+
+read_observations() returns hot and archived rows for a time range as
+one DataFrame, for backfills and retraining over long histories.
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+from src.config.settings import ARCHIVE_DIR, OBSERVATION_RETENTION_DAYS, print_settings_summary
+from src.db.connection import get_engine
+from src.telemetry import record, tracked_stage
+
+BASE_DIR = Path(__file__).resolve().parents[1]  # project root
+ARCHIVE_PATH = Path(ARCHIVE_DIR) if Path(ARCHIVE_DIR).is_absolute() else BASE_DIR / ARCHIVE_DIR
+
+ARCHIVE_BATCH_ROWS = 10_000
+COMPRESSION = "zstd"
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("location_id", pa.int32()),
+    ("timestamp_utc", pa.timestamp("us", tz="UTC")),
+    ("aqi", pa.int32()),
+    ("category", pa.string()),
+    ("pollutant", pa.string()),
+    ("raw_json", pa.string()),  # JSON text; parse with json.loads when needed
+])
+UNIQUE_KEY = ["location_id", "timestamp_utc", "pollutant"]
+
+MONTH_RANGE_SQL = """
+    timestamp_utc >= :month_start
+    AND timestamp_utc < :month_end
+    AND timestamp_utc < :cutoff
+"""
+
+
+def ensure_retention_schema(conn) -> None:
+    # Serves both the archive scan and aggregation's two-day window.
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_observations_timestamp
+        ON observations (timestamp_utc)
+    """))
+
+
+def month_bounds(month_start: datetime) -> Tuple[datetime, datetime]:
+    start = month_start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def month_partition(month_start: datetime) -> str:
+    return f"month={month_start:%Y-%m}"
+
+
+def months_between(start: datetime, end: datetime) -> List[str]:
+    """Partition names for every month overlapping [start, end)."""
+    names, month, _ = [], *month_bounds(start)
+    while month < end:
+        names.append(month_partition(month))
+        month = month_bounds(month)[1]
+    return names
+
+
+def _batches(conn, params) -> Iterator[pa.RecordBatch]:
+    result = conn.execute(
+        text(f"""
+            SELECT id, location_id, timestamp_utc, aqi, category, pollutant, raw_json::text
+            FROM observations
+            WHERE {MONTH_RANGE_SQL}
+            ORDER BY id
+        """),
+        params,
+        execution_options={"stream_results": True, "max_row_buffer": ARCHIVE_BATCH_ROWS},
+    )
+    for rows in result.partitions(ARCHIVE_BATCH_ROWS):
+        columns = list(zip(*rows))
+        yield pa.record_batch(
+            [pa.array(col, type=field.type) for col, field in zip(columns, ARCHIVE_SCHEMA)],
+            schema=ARCHIVE_SCHEMA,
+        )
+
+
+def archive_month(month_start: datetime, cutoff: datetime, archive_path: Path = ARCHIVE_PATH) -> int:
+    """
+    Move one month's rows older than cutoff to Parquet. Returns the number
+    of rows archived; raises (leaving the rows in place) if any check fails.
+    """
+    start, end = month_bounds(month_start)
+    params = {"month_start": start, "month_end": end, "cutoff": cutoff}
+    partition_dir = archive_path / month_partition(start)
+    partition_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = partition_dir / f".tmp-{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}.parquet"
+
+    engine = get_engine()
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+        with conn.begin():
+            expected, first_id, last_id = conn.execute(
+                text(f"SELECT COUNT(*), MIN(id), MAX(id) FROM observations WHERE {MONTH_RANGE_SQL}"),
+                params,
+            ).one()
+            if expected == 0:
+                return 0
+
+            written = 0
+            try:
+                with pq.ParquetWriter(tmp_path, ARCHIVE_SCHEMA, compression=COMPRESSION) as writer:
+                    for batch in _batches(conn, params):
+                        writer.write_batch(batch)
+                        written += batch.num_rows
+
+                on_disk = pq.ParquetFile(tmp_path).metadata.num_rows
+                if not expected == written == on_disk:
+                    raise RuntimeError(
+                        f"row count mismatch for {start:%Y-%m}: "
+                        f"table {expected}, read {written}, file {on_disk}"
+                    )
+
+                final_path = partition_dir / f"part-{first_id}-{last_id}.parquet"
+                tmp_path.replace(final_path)
+                deleted = conn.execute(
+                    text(f"DELETE FROM observations WHERE {MONTH_RANGE_SQL}"), params
+                ).rowcount
+                if deleted != expected:
+                    final_path.unlink(missing_ok=True)
+                    raise RuntimeError(
+                        f"deleted {deleted} row(s) for {start:%Y-%m}, expected {expected}"
+                    )
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+    return expected
+
+
+@tracked_stage("retention")
+def run_retention(retention_days: int = OBSERVATION_RETENTION_DAYS, vacuum: bool = True) -> int:
+    print_settings_summary()
+    engine = get_engine()
+
+    with engine.begin() as conn:
+        ensure_retention_schema(conn)
+        cutoff = conn.execute(
+            text("SELECT date_trunc('day', NOW()) - make_interval(days => :days)"),
+            {"days": retention_days},
+        ).scalar_one()
+        # Month boundaries are UTC whatever the session time zone.
+        months = conn.execute(text("""
+            SELECT DISTINCT date_trunc('month', timestamp_utc AT TIME ZONE 'UTC') AS month
+            FROM observations
+            WHERE timestamp_utc < :cutoff
+            ORDER BY month
+        """), {"cutoff": cutoff}).scalars().all()
+
+    print(f"\nArchiving observations before {cutoff:%Y-%m-%d} to {ARCHIVE_PATH}")
+    if not months:
+        print("✅ Nothing to archive.")
+        return 0
+
+    total = 0
+    for month in months:
+        month = month.replace(tzinfo=timezone.utc)
+        archived = archive_month(month, cutoff)
+        total += archived
+        record(rows_read=archived, rows_written=archived)
+        print(f"✅ {month:%Y-%m}: archived and deleted {archived} row(s).")
+
+    if vacuum and total:
+        # VACUUM can't run in a transaction block.
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM (ANALYZE) observations"))
+
+    print(f"\nDone. Total observations archived: {total}")
+    return total
+
+
+def merge_tiers(hot: pd.DataFrame, *archived: pd.DataFrame) -> pd.DataFrame:
+    """
+    Concatenate hot and archived observation frames, keeping the hot copy of
+    any row present in both, sorted by location, time and pollutant.
+    """
+    frames = [f for f in (hot, *archived) if not f.empty] or [hot]
+    df = pd.concat(frames, ignore_index=True)
+    df["timestamp_utc"] = pd.to_datetime(df["timestamp_utc"], utc=True)
+    df = df.drop_duplicates(UNIQUE_KEY, keep="first")
+    return (
+        df.drop(columns="id")
+        .sort_values(["location_id", "timestamp_utc", "pollutant"])
+        .reset_index(drop=True)
+    )
+
+
+def read_observations(
+    start: datetime,
+    end: datetime,
+    location_ids: Optional[Sequence[int]] = None,
+    archive_path: Path = ARCHIVE_PATH,
+) -> pd.DataFrame:
+    """
+    Observations with start <= timestamp_utc < end from both the hot table
+    and the Parquet archive, sorted by location and time. raw_json is
+    returned as JSON text. Only month partitions overlapping the range
+    are opened.
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    start = start.tz_localize("UTC") if start.tzinfo is None else start
+    end = end.tz_localize("UTC") if end.tzinfo is None else end
+
+    location_filter = "" if location_ids is None else "AND location_id = ANY(:location_ids)"
+    params = {"start": start.to_pydatetime(), "end": end.to_pydatetime()}
+    if location_ids is not None:
+        params["location_ids"] = [int(i) for i in location_ids]
+    with get_engine().connect() as conn:
+        hot = pd.read_sql(text(f"""
+            SELECT id, location_id, timestamp_utc, aqi, category, pollutant, raw_json::text AS raw_json
+            FROM observations
+            WHERE timestamp_utc >= :start AND timestamp_utc < :end {location_filter}
+        """), conn, params=params)
+
+    frames = [hot]
+    files = [
+        str(path)
+        for month in months_between(start.to_pydatetime(), end.to_pydatetime())
+        for path in sorted((archive_path / month).glob("part-*.parquet"))
+    ]
+    if files:
+        dataset = ds.dataset(files, format="parquet", schema=ARCHIVE_SCHEMA)
+        ts_type = ARCHIVE_SCHEMA.field("timestamp_utc").type
+        condition = (
+            (ds.field("timestamp_utc") >= pa.scalar(start.to_pydatetime(), ts_type))
+            & (ds.field("timestamp_utc") < pa.scalar(end.to_pydatetime(), ts_type))
+        )
+        if location_ids is not None:
+            condition &= ds.field("location_id").isin([int(i) for i in location_ids])
+        frames.append(dataset.to_table(filter=condition).to_pandas())
+
+    return merge_tiers(*frames)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old observations to Parquet.")
+    parser.add_argument("--days", type=int, default=OBSERVATION_RETENTION_DAYS,
+                        help="Keep this many days of observations in the database.")
+    parser.add_argument("--no-vacuum", action="store_true", help="Skip VACUUM after archiving.")
+    args = parser.parse_args()
+    run_retention(args.days, vacuum=not args.no_vacuum)
@@ -0,0 +1,207 @@
+"""
+Sharded pipeline workers coordinated through Postgres advisory locks.
+
+Locations are split into NUM_SHARDS shards by location_id % NUM_SHARDS.
+Any number of worker processes, on any number of machines, can run
+against the same database; each cycle a worker ingests, aggregates and
+forecasts only the locations in the shards it holds, so no two workers
+ever touch the same location's observations or alert_state.
+
+Shard ownership is a session-level advisory lock, pg_try_advisory_lock(
+SHARD_LOCK_CLASS, shard), held on one dedicated connection per worker.
+Workers tag that connection with application_name = WORKER_APP_NAME and
+count each other in pg_stat_activity, so each aims for a fair share of
+ceil(NUM_SHARDS / workers): a worker holding more releases the excess,
+one holding fewer claims free shards. When a worker dies its connection
+closes, Postgres drops its locks and the survivors pick up its shards on
+their next cycle. No lease table or heartbeat is needed.
+
+Each cycle also holds the orchestrator's pipeline lock in shared mode.
+Workers don't block each other, but a cycle waits for a running cron
+pipeline or event worker batch (and a cron run started mid-cycle exits),
+so two processes never aggregate or forecast the same location at once.
+
+Run one worker per process or node, instead of the cron pipeline's
+ingest/aggregate/forecast stages. Disable the cron pipeline while shard
+workers run: the lock keeps them from overlapping, but every cron run
+that gets in would redo all locations and hold the workers up.
+
+    ./aqi shard-worker                 # cycle every 5 minutes
+    ./aqi shard-worker --interval 60 --once
+"""
+import argparse
+import math
+import os
+import socket
+import time
+import zlib
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from src.config.settings import NUM_SHARDS, print_settings_summary
+from src.db.connection import get_engine
+from src.telemetry import start_new_run
+
+WORKER_APP_NAME = "aqi-shard-worker"
+# First key of the two-key advisory lock form; the second is the shard.
+SHARD_LOCK_CLASS = 4127
+CYCLE_SECONDS = 300.0
+RECONNECT_SECONDS = 5.0
+
+
+def shard_of(location_id: int, num_shards: int = NUM_SHARDS) -> int:
+    return location_id % num_shards
+
+
+def fair_share(num_shards: int, num_workers: int) -> int:
+    """Most shards one worker should hold so that every shard is covered."""
+    return math.ceil(num_shards / max(num_workers, 1))
+
+
+def plan_rebalance(
+    held: Set[int],
+    target: int,
+    num_shards: int,
+    start: int = 0,
+) -> Tuple[List[int], List[int]]:
+    """
+    (shards to release, shards to try to claim, in order) to move from
+    held toward target shards. Claims are probed starting at start so
+    workers don't all contend for shard 0 first.
+    """
+    if len(held) > target:
+        return sorted(held)[target:], []
+    candidates = [(start + i) % num_shards for i in range(num_shards)]
+    return [], [s for s in candidates if s not in held]
+
+
+class ShardLocks:
+    """
+    A worker's shard locks on one dedicated connection. Closing it (or the
+    process dying) releases every shard.
+    """
+
+    def __init__(self, num_shards: int = NUM_SHARDS):
+        self.num_shards = num_shards
+        self.held: Set[int] = set()
+        self._conn = None
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.start = zlib.crc32(worker_id.encode()) % num_shards
+
+    def __enter__(self) -> "ShardLocks":
+        self._conn = get_engine().connect()
+        self._conn.detach()  # session state (locks, application_name) must not return to the pool
+        self._conn.execute(text(f"SET application_name = '{WORKER_APP_NAME}'"))
+        self._conn.commit()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self.held.clear()
+
+    def _scalar(self, sql: str, params: dict):
+        value = self._conn.execute(text(sql), params).scalar_one()
+        self._conn.commit()
+        return value
+
+    def active_workers(self) -> int:
+        return self._scalar("""
+            SELECT COUNT(*) FROM pg_stat_activity
+            WHERE application_name = :name AND datname = current_database()
+        """, {"name": WORKER_APP_NAME})
+
+    def _try_claim(self, shard: int) -> bool:
+        return self._scalar(
+            "SELECT pg_try_advisory_lock(:cls, :shard)", {"cls": SHARD_LOCK_CLASS, "shard": shard}
+        )
+
+    def _release(self, shard: int) -> None:
+        self._scalar(
+            "SELECT pg_advisory_unlock(:cls, :shard)", {"cls": SHARD_LOCK_CLASS, "shard": shard}
+        )
+
+    def rebalance(self) -> Set[int]:
+        """Release or claim shards toward this worker's fair share; returns the shards held."""
+        target = fair_share(self.num_shards, self.active_workers())
+        release, candidates = plan_rebalance(self.held, target, self.num_shards, self.start)
+        for shard in release:
+            self._release(shard)
+            self.held.discard(shard)
+        for shard in candidates:
+            if len(self.held) >= target:
+                break
+            if self._try_claim(shard):
+                self.held.add(shard)
+        return set(self.held)
+
+
+def shard_location_ids(shards: Iterable[int], num_shards: int = NUM_SHARDS) -> List[int]:
+    shards = sorted(shards)
+    if not shards:
+        return []
+    with get_engine().connect() as conn:
+        return list(conn.execute(text("""
+            SELECT id FROM locations
+            WHERE id % :num_shards = ANY(:shards)
+            ORDER BY id
+        """), {"num_shards": num_shards, "shards": shards}).scalars())
+
+
+def run_cycle(location_ids: List[int]) -> Set[int]:
+    """Ingest, aggregate and forecast the given locations; returns those re-forecast."""
+    # Imported here so the worker holds its locks before pandas loads.
+    from src.features.build_features import run_daily_aggregation
+    from src.forecast_and_notify import run_forecast_and_notify
+    from src.ingest.ingest_airnow import run_ingestion
+    from src.orchestrate import pipeline_lock
+
+    start_new_run()
+    with pipeline_lock(wait=True, shared=True):
+        run_ingestion(location_ids)
+        changed = run_daily_aggregation(location_ids=location_ids)
+        if changed:
+            run_forecast_and_notify(sorted(changed))
+    return changed
+
+
+def run_worker(interval: float = CYCLE_SECONDS, once: bool = False) -> None:
+    print_settings_summary()
+    while True:
+        try:
+            with ShardLocks() as locks:
+                while True:
+                    shards = locks.rebalance()
+                    location_ids = shard_location_ids(shards)
+                    print(
+                        f"\n🧩 Holding shard(s) {sorted(shards)} of {locks.num_shards} "
+                        f"→ location(s) {location_ids}"
+                    )
+                    if location_ids:
+                        changed = run_cycle(location_ids)
+                        print(f"✅ Cycle done; {len(changed)} location(s) re-forecast.")
+                    if once:
+                        return
+                    time.sleep(interval)
+        except KeyboardInterrupt:
+            return
+        except Exception as exc:
+            if once:
+                raise
+            print(f"⚠️  Shard worker error, reconnecting in {RECONNECT_SECONDS:.0f}s: {exc}")
+            time.sleep(RECONNECT_SECONDS)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run a sharded ingest/aggregate/forecast worker.")
+    parser.add_argument("--interval", type=float, default=CYCLE_SECONDS,
+                        help="Seconds between cycles.")
+    parser.add_argument("--once", action="store_true", help="Run one cycle and exit.")
+    args = parser.parse_args(argv)
+    run_worker(args.interval, args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Spatial helpers shared by the API and batch jobs.
+
+Locations are indexed as 3D unit vectors on the sphere in a KD-tree.
+Euclidean (chord) distance between unit vectors increases monotonically
+with great-circle distance, so the tree's nearest neighbours are the
+true nearest points on Earth, with no special cases at the poles or
+the antimeridian. Chord lengths are converted back to kilometres.
+
+A lookup is O(log n), a few microseconds even with thousands of
+monitoring sites.
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_unit_vectors(latitude, longitude) -> np.ndarray:
+    """(n, 3) unit vectors for arrays of latitude/longitude in degrees."""
+    lat = np.radians(np.asarray(latitude, dtype=np.float64))
+    lon = np.radians(np.asarray(longitude, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_km(chord) -> np.ndarray:
+    """Great-circle distance in km for a chord length between unit vectors."""
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0))
+
+
+class LocationIndex:
+    """
+    KD-tree over location coordinates.
+
+        index = LocationIndex(ids, lats, lons)
+        ids, km = index.nearest(45.5, -122.7, k=3)
+    """
+
+    def __init__(
+        self,
+        location_ids: Sequence[int],
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+    ):
+        self.location_ids = np.asarray(location_ids, dtype=np.int64)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self._tree = cKDTree(to_unit_vectors(self.latitudes, self.longitudes)) if len(self) else None
+
+    def __len__(self) -> int:
+        return len(self.location_ids)
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The k nearest locations to a point, closest first.
+        Returns (location_ids, distances_km); fewer than k if the index is smaller.
+        """
+        return self.nearest_many([latitude], [longitude], k)[0]
+
+    def nearest_many(self, latitudes, longitudes, k: int = 1):
+        """
+        nearest() for many points at once. Returns a list of
+        (location_ids, distances_km) pairs, one per query point.
+        """
+        if min(k, len(self)) == 0:
+            empty = (np.empty(0, dtype=np.int64), np.empty(0))
+            return [empty for _ in range(len(latitudes))]
+
+        positions, km = self.query(latitudes, longitudes, k)
+        return [(self.location_ids[pos], dist) for pos, dist in zip(positions, km)]
+
+    def query(self, latitudes, longitudes, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Array form of nearest_many for bulk callers: (positions, distances_km),
+        both of shape (n_points, min(k, len(self))), closest first. positions
+        index into location_ids (and into any array aligned with it).
+        """
+        k = min(k, len(self))
+        n = len(latitudes)
+        if k == 0:
+            return np.empty((n, 0), dtype=np.int64), np.empty((n, 0))
+
+        chords, positions = self._tree.query(to_unit_vectors(latitudes, longitudes), k=k)
+        return np.asarray(positions).reshape(n, k), chord_to_km(np.asarray(chords).reshape(n, k))
@@ -0,0 +1,414 @@
+"""
+Structured run telemetry for the pipeline stages.
+
+Every stage entry point is wrapped with @tracked_stage("<name>"), which
+records start/end, duration, rows read and written, API calls, retries
+and peak memory for that stage. Peak memory is the process's peak RSS
+while the stage ran: on Linux the kernel's peak mark is reset when a
+stage starts, so it isn't inflated by earlier stages. Stages running in
+parallel threads share the figure. Each finished stage is written to:
+
+  - the stage_metrics / pipeline_runs tables (queried by the API's /metrics)
+  - logs/pipeline_events.jsonl, one JSON object per line
+
+Code running inside a stage reports counters with record(rows_written=n)
+etc.; outside a stage, record() is a no-op. Each process gets its own run
+id, so all stages run by one src.orchestrate invocation share it; stages
+launched as separate processes can share one through the AQI_RUN_ID
+environment variable.
+
+With AQI_PROFILE set, each stage also runs under cProfile (src.profiling).
+
+Telemetry never fails a stage: database errors are printed and skipped.
+"""
+import atexit
+import functools
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from src.db.connection import get_engine
+from src.profiling import profiled, profiling_enabled
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RUN_ID_ENV = "AQI_RUN_ID"
+
+BASE_DIR = Path(__file__).resolve().parents[1]  # project root
+LOGS_DIR = BASE_DIR / "logs"
+EVENTS_LOG_PATH = LOGS_DIR / "pipeline_events.jsonl"
+
+COUNTERS = ("rows_read", "rows_written", "api_calls", "retries")
+
+
+@dataclass
+class StageMetrics:
+    stage: str
+    run_id: str
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_s: float = 0.0
+    rows_read: int = 0
+    rows_written: int = 0
+    api_calls: int = 0
+    retries: int = 0
+    peak_memory_mb: Optional[float] = None
+    status: str = "running"
+    error: Optional[str] = None
+
+
+_current_stage: ContextVar[Optional[StageMetrics]] = ContextVar("aqi_stage", default=None)
+_process_run_id: Optional[str] = None
+_tables_ready = False
+
+
+# --- buffered line logs -----------------------------------------------------
+
+_log_handles: Dict[Path, IO[str]] = {}
+
+
+def append_line(path: Path, line: str) -> None:
+    """
+    Append one line to a log file through a handle kept open for the life
+    of the process. Writes are buffered and flushed at stage end and exit.
+    """
+    handle = _log_handles.get(path)
+    if handle is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle = path.open("a", encoding="utf-8")
+        _log_handles[path] = handle
+    handle.write(line if line.endswith("\n") else line + "\n")
+
+
+def flush_logs() -> None:
+    for handle in _log_handles.values():
+        handle.flush()
+
+
+atexit.register(flush_logs)
+
+
+# --- run / stage tracking ---------------------------------------------------
+
+def current_run_id() -> str:
+    global _process_run_id
+    run_id = os.getenv(RUN_ID_ENV)
+    if run_id:
+        return run_id
+    if _process_run_id is None:
+        _process_run_id = uuid.uuid4().hex
+    return _process_run_id
+
+
+def start_new_run() -> str:
+    """
+    Give the stages that follow a fresh run id, for long-lived processes
+    that run the pipeline repeatedly (e.g. the event worker).
+    """
+    global _process_run_id
+    _process_run_id = uuid.uuid4().hex
+    return current_run_id()
+
+
+def current_stage_name() -> Optional[str]:
+    metrics = _current_stage.get()
+    return None if metrics is None else metrics.stage
+
+
+def record(**counters: int) -> None:
+    """Add to the counters of the stage currently running, if any."""
+    metrics = _current_stage.get()
+    if metrics is None:
+        return
+    for name, value in counters.items():
+        if name not in COUNTERS:
+            raise ValueError(f"Unknown telemetry counter: {name}")
+        setattr(metrics, name, getattr(metrics, name) + int(value))
+
+
+# Stages that are running; the peak-RSS mark is only reset when the first
+# one starts, so stages run in parallel threads share one figure.
+_memory_lock = threading.Lock()
+_stages_running = 0
+_peak_reset = False
+
+PROC_STATUS = Path("/proc/self/status")
+PROC_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS mark (VmHWM) to the current RSS (Linux 4.0+)."""
+    try:
+        PROC_CLEAR_REFS.write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """VmHWM: peak resident set size since the last reset, or None off Linux."""
+    try:
+        for line in PROC_STATUS.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _process_peak_mb() -> Optional[float]:
+    """Peak resident set size of this process since it started."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _begin_memory_window() -> Tuple[bool, Optional[float]]:
+    global _stages_running, _peak_reset
+    with _memory_lock:
+        if _stages_running == 0:
+            _peak_reset = _reset_peak_rss()
+        _stages_running += 1
+        return _peak_reset, _process_peak_mb()
+
+
+def _end_memory_window(peak_reset: bool, process_peak_before: Optional[float]) -> Optional[float]:
+    """
+    Peak RSS while the stage ran. Without a resettable peak mark, the
+    process peak only says something about this stage if it rose during
+    it; otherwise the stage's peak is unknown.
+    """
+    global _stages_running
+    with _memory_lock:
+        _stages_running -= 1
+    if peak_reset:
+        peak = _peak_rss_mb()
+        if peak is not None:
+            return peak
+    peak = _process_peak_mb()
+    if peak is None or process_peak_before is None or peak <= process_peak_before:
+        return None
+    return peak
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[StageMetrics]:
+    metrics = StageMetrics(
+        stage=stage,
+        run_id=current_run_id(),
+        started_at=datetime.now(timezone.utc),
+    )
+    token = _current_stage.set(metrics)
+    memory_window = _begin_memory_window()
+    start = time.perf_counter()
+
+    try:
+        yield metrics
+        metrics.status = "success"
+    except BaseException as exc:
+        metrics.status = "failed"
+        metrics.error = f"{type(exc).__name__}: {exc}"[:1000]
+        raise
+    finally:
+        _current_stage.reset(token)
+        metrics.duration_s = time.perf_counter() - start
+        metrics.finished_at = datetime.now(timezone.utc)
+        metrics.peak_memory_mb = _end_memory_window(*memory_window)
+        _write_event(metrics)
+        _persist(metrics)
+
+
+def tracked_stage(stage: str):
+    """
+    Decorator form of track_stage for stage entry points. Profiles the
+    stage when profiling is enabled.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_stage(stage) as metrics:
+                if not profiling_enabled():
+                    return func(*args, **kwargs)
+                with profiled(f"{stage}-{metrics.run_id[:8]}"):
+                    return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _write_event(metrics: StageMetrics) -> None:
+    event = asdict(metrics)
+    event["host"] = socket.gethostname()
+    event["pid"] = os.getpid()
+    append_line(EVENTS_LOG_PATH, json.dumps(event, default=str))
+    flush_logs()
+
+
+def ensure_telemetry_tables(conn) -> None:
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS pipeline_runs (
+            run_id TEXT PRIMARY KEY,
+            host TEXT,
+            started_at TIMESTAMPTZ NOT NULL,
+            finished_at TIMESTAMPTZ,
+            status TEXT NOT NULL DEFAULT 'running'
+        )
+    """))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS stage_metrics (
+            id BIGSERIAL PRIMARY KEY,
+            run_id TEXT NOT NULL REFERENCES pipeline_runs(run_id),
+            stage TEXT NOT NULL,
+            started_at TIMESTAMPTZ NOT NULL,
+            finished_at TIMESTAMPTZ NOT NULL,
+            duration_s DOUBLE PRECISION NOT NULL,
+            rows_read BIGINT NOT NULL DEFAULT 0,
+            rows_written BIGINT NOT NULL DEFAULT 0,
+            api_calls INTEGER NOT NULL DEFAULT 0,
+            retries INTEGER NOT NULL DEFAULT 0,
+            peak_memory_mb DOUBLE PRECISION,
+            status TEXT NOT NULL,
+            error TEXT
+        )
+    """))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_stage_metrics_stage_started
+        ON stage_metrics (stage, started_at DESC)
+    """))
+
+
+def _persist(metrics: StageMetrics) -> None:
+    global _tables_ready
+    try:
+        with get_engine().begin() as conn:
+            if not _tables_ready:
+                ensure_telemetry_tables(conn)
+                _tables_ready = True
+            conn.execute(text("""
+                INSERT INTO pipeline_runs (run_id, host, started_at, finished_at, status)
+                VALUES (:run_id, :host, :started_at, :finished_at, :status)
+                ON CONFLICT (run_id) DO UPDATE
+                SET finished_at = GREATEST(pipeline_runs.finished_at, EXCLUDED.finished_at),
+                    status = CASE
+                        WHEN pipeline_runs.status = 'failed' THEN 'failed'
+                        ELSE EXCLUDED.status
+                    END
+            """), {
+                "run_id": metrics.run_id,
+                "host": socket.gethostname(),
+                "started_at": metrics.started_at,
+                "finished_at": metrics.finished_at,
+                "status": metrics.status,
+            })
+            conn.execute(text("""
+                INSERT INTO stage_metrics (
+                    run_id, stage, started_at, finished_at, duration_s,
+                    rows_read, rows_written, api_calls, retries,
+                    peak_memory_mb, status, error
+                )
+                VALUES (
+                    :run_id, :stage, :started_at, :finished_at, :duration_s,
+                    :rows_read, :rows_written, :api_calls, :retries,
+                    :peak_memory_mb, :status, :error
+                )
+            """), asdict(metrics))
+    except Exception as exc:
+        print(f"⚠️  Could not record telemetry for stage {metrics.stage}: {exc}")
+
+
+# --- Prometheus exposition ----------------------------------------------------
+
+LATEST_STAGE_METRICS_SQL = """
+    SELECT DISTINCT ON (stage)
+        stage, finished_at, duration_s, rows_read, rows_written,
+        api_calls, retries, peak_memory_mb, status
+    FROM stage_metrics
+    ORDER BY stage, started_at DESC
+"""
+
+LAST_SUCCESS_SQL = """
+    SELECT stage, MAX(finished_at) AS finished_at
+    FROM stage_metrics
+    WHERE status = 'success'
+    GROUP BY stage
+"""
+
+RUN_COUNTS_SQL = """
+    SELECT stage, status, COUNT(*) AS n
+    FROM stage_metrics
+    GROUP BY stage, status
+"""
+
+_GAUGES = [
+    ("aqi_stage_last_duration_seconds", "duration_s", "Duration of the most recent run of each stage."),
+    ("aqi_stage_last_rows_read", "rows_read", "Rows read by the most recent run of each stage."),
+    ("aqi_stage_last_rows_written", "rows_written", "Rows written by the most recent run of each stage."),
+    ("aqi_stage_last_api_calls", "api_calls", "External API calls made by the most recent run of each stage."),
+    ("aqi_stage_last_retries", "retries", "Retries in the most recent run of each stage."),
+    ("aqi_stage_last_peak_memory_megabytes", "peak_memory_mb", "Peak process RSS while the most recent run of each stage ran."),
+]
+
+
+def format_prometheus(
+    latest: List[Dict],
+    last_success: List[Dict],
+    run_counts: List[Dict],
+) -> str:
+    """Render stage telemetry rows in the Prometheus text exposition format."""
+    lines: List[str] = []
+
+    for metric, column, help_text in _GAUGES:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for row in latest:
+            if row[column] is not None:
+                lines.append(f'{metric}{{stage="{row["stage"]}"}} {float(row[column]):g}')
+
+    lines.append("# HELP aqi_stage_last_success Whether the most recent run of each stage succeeded.")
+    lines.append("# TYPE aqi_stage_last_success gauge")
+    for row in latest:
+        ok = 1 if row["status"] == "success" else 0
+        lines.append(f'aqi_stage_last_success{{stage="{row["stage"]}"}} {ok}')
+
+    lines.append("# HELP aqi_stage_last_success_timestamp_seconds Unix time of each stage's last successful run.")
+    lines.append("# TYPE aqi_stage_last_success_timestamp_seconds gauge")
+    for row in last_success:
+        ts = row["finished_at"].timestamp()
+        lines.append(f'aqi_stage_last_success_timestamp_seconds{{stage="{row["stage"]}"}} {ts:.3f}')
+
+    lines.append("# HELP aqi_stage_runs_total Stage runs recorded, by outcome.")
+    lines.append("# TYPE aqi_stage_runs_total counter")
+    for row in run_counts:
+        lines.append(
+            f'aqi_stage_runs_total{{stage="{row["stage"]}",status="{row["status"]}"}} {int(row["n"])}'
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def render_prometheus(conn) -> str:
+    """Query stage telemetry on conn and render it for /metrics."""
+    def rows(sql: str) -> List[Dict]:
+        return [dict(r) for r in conn.execute(text(sql)).mappings().all()]
+
+    return format_prometheus(
+        rows(LATEST_STAGE_METRICS_SQL),
+        rows(LAST_SUCCESS_SQL),
+        rows(RUN_COUNTS_SQL),
+    )
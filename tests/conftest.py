@@ -0,0 +1,66 @@
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.config.settings import ASYNC_DATABASE_URL, DATABASE_URL
+from src.db import async_connection, connection, migrations
+from src.db.init_db import get_schema_sql
+
+
+@pytest.fixture
+def pg_engine(monkeypatch):
+    """
+    An engine on a throwaway schema built from sql/schema.sql, installed as
+    the shared engine so stage code under test uses it. Skips the test when
+    no Postgres is reachable (e.g. in CI).
+    """
+    admin = create_engine(DATABASE_URL)
+    try:
+        with admin.connect():
+            pass
+    except OperationalError:
+        admin.dispose()
+        pytest.skip("Postgres is not available")
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    with admin.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_engine(DATABASE_URL, connect_args={"options": f"-csearch_path={schema}"})
+    with engine.begin() as conn:
+        conn.exec_driver_sql(get_schema_sql())
+        conn.execute(text("""
+            INSERT INTO locations (id, name, latitude, longitude) VALUES
+                (1, 'Portland', 45.5152, -122.6784),
+                (2, 'Salem', 44.9429, -123.0351)
+        """))
+
+    monkeypatch.setattr(connection, "_engine", engine)
+    monkeypatch.setattr(migrations, "_applied", set())
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        admin.dispose()
+
+
+@pytest.fixture
+def pg_async_engine(pg_engine, monkeypatch):
+    """
+    The API's async engine on pg_engine's schema. NullPool, because each
+    TestClient request may run on a different event loop.
+    """
+    with pg_engine.connect() as conn:
+        schema = conn.execute(text("SELECT current_schema()")).scalar_one()
+    engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=NullPool,
+        connect_args={"server_settings": {"search_path": schema}},
+    )
+    monkeypatch.setattr(async_connection, "_async_engine", engine)
+    yield engine
@@ -0,0 +1,77 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from src.alerts import EVENT_ALERT, EVENT_ALL_CLEAR, enqueue_notifications
+from src.forecast_and_notify import compute_alert_transitions, process_alert_state
+
+NOW = datetime(2026, 8, 1, 12, 0)
+
+
+def _batch(rows):
+    return pd.DataFrame(rows, columns=["location_id", "forecast_aqi", "exceedance_prob"])
+
+
+def test_point_forecast_transitions():
+    df = _batch([
+        (1, 120, np.nan),  # new location over threshold -> alert
+        (2, 80, np.nan),   # alerting, now below -> all-clear
+        (3, 130, np.nan),  # alerting, still over -> unchanged
+        (4, 50, np.nan),   # quiet, still quiet -> unchanged
+    ])
+    state = pd.DataFrame({"location_id": [2, 3, 4], "in_alert": [True, True, False], "transition_seq": [1, 3, 2]})
+
+    out = compute_alert_transitions(df, state, NOW).set_index("location_id")
+
+    assert out["event_type"].to_dict() == {1: EVENT_ALERT, 2: EVENT_ALL_CLEAR, 3: None, 4: None}
+    assert out["in_alert"].to_dict() == {1: True, 2: False, 3: True, 4: False}
+    assert out.loc[1, "alert_started_at"] == NOW
+    assert out.loc[3, "alert_started_at"] == NOW  # upsert keeps the original start
+    assert out.loc[2, "alert_started_at"] is None
+    assert out["transition_seq"].to_dict() == {1: 1, 2: 2, 3: 3, 4: 2}
+
+
+def test_probability_hysteresis():
+    df = _batch([
+        (1, 95, 0.6),   # quiet, p >= enter threshold -> alert
+        (2, 105, 0.4),  # quiet, p below enter threshold -> stays quiet
+        (3, 90, 0.4),   # alerting, p above clear threshold -> stays in alert
+        (4, 90, 0.1),   # alerting, p below clear threshold -> all-clear
+    ])
+    state = pd.DataFrame({"location_id": [2, 3, 4], "in_alert": [False, True, True], "transition_seq": [0, 1, 1]})
+
+    out = compute_alert_transitions(df, state, NOW).set_index("location_id")
+
+    assert out["event_type"].to_dict() == {1: EVENT_ALERT, 2: None, 3: None, 4: EVENT_ALL_CLEAR}
+
+
+def _forecast(aqi):
+    return pd.DataFrame({
+        "location_id": [1], "name": ["Portland"], "forecast_aqi": [aqi],
+        "exceedance_prob": [np.nan], "target_date": [pd.Timestamp("2026-08-02")],
+    })
+
+
+def test_realert_for_same_target_date_is_queued_again(pg_engine):
+    # Revisions within a day: alert -> all-clear -> alert, same target date.
+    for aqi in (150, 60, 140, 145):
+        process_alert_state(_forecast(aqi))
+
+    with pg_engine.connect() as conn:
+        events = conn.execute(text(
+            "SELECT event_type, idempotency_key FROM notification_outbox ORDER BY id"
+        )).all()
+        in_alert = conn.execute(text("SELECT in_alert FROM alert_state WHERE location_id = 1")).scalar_one()
+
+    assert [e.event_type for e in events] == [EVENT_ALERT, EVENT_ALL_CLEAR, EVENT_ALERT]
+    assert len({e.idempotency_key for e in events}) == 3
+    assert in_alert
+
+    # Re-queuing an already queued transition (e.g. a retry) is a no-op.
+    with pg_engine.begin() as conn:
+        assert enqueue_notifications(conn, [{
+            "event_type": EVENT_ALERT, "location_id": 1, "target_date": date(2026, 8, 2),
+            "transition_seq": 3, "payload": {},
+        }]) == 0
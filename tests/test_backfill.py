@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from src.backfill_interpolate import (
+    MAX_GAP_DAYS,
+    OVERSIZED_GAPS_SQL,
+    WATERMARK_NAME,
+    run_backfill,
+    set_watermark,
+)
+
+START = date(2026, 1, 1)
+
+
+def _insert(engine, location_id, day_offset, max_aqi, age="0 seconds"):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO daily_aggregates (location_id, date, max_aqi, mean_aqi, min_aqi, updated_at)
+            VALUES (:loc, :date, :max_aqi, :max_aqi / 2.0, :max_aqi / 4, NOW() - CAST(:age AS interval))
+        """), {"loc": location_id, "date": START + timedelta(days=day_offset), "max_aqi": max_aqi, "age": age})
+
+
+def _interpolated(engine, location_id=1):
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT date, max_aqi, mean_aqi FROM daily_aggregates
+            WHERE location_id = :loc AND is_interpolated
+            ORDER BY date
+        """), {"loc": location_id}).all()
+    return [((r.date - START).days, r.max_aqi, r.mean_aqi) for r in rows]
+
+
+def test_gaps_are_filled_linearly_and_flagged(pg_engine):
+    _insert(pg_engine, 1, 0, 10)
+    _insert(pg_engine, 1, 3, 40)
+    _insert(pg_engine, 1, 4, 50)  # no gap after day 3
+
+    run_backfill(full=True)
+
+    assert _interpolated(pg_engine) == [(1, 20, 10.0), (2, 30, 15.0)]
+
+
+def test_gaps_longer_than_max_gap_days_are_skipped(pg_engine):
+    _insert(pg_engine, 1, 0, 10)
+    _insert(pg_engine, 1, MAX_GAP_DAYS + 1, 90)       # exactly MAX_GAP_DAYS missing
+    _insert(pg_engine, 2, 0, 10)
+    _insert(pg_engine, 2, MAX_GAP_DAYS + 2, 90)       # one day too many
+
+    run_backfill(full=True)
+
+    assert len(_interpolated(pg_engine, 1)) == MAX_GAP_DAYS
+    assert _interpolated(pg_engine, 2) == []
+    with pg_engine.connect() as conn:
+        oversized = conn.execute(
+            text(OVERSIZED_GAPS_SQL), {"since": None, "max_gap_days": MAX_GAP_DAYS}
+        ).all()
+    assert [(g.location_id, g.gap_days) for g in oversized] == [(2, MAX_GAP_DAYS + 1)]
+
+
+def test_incremental_run_only_fills_gaps_next_to_changed_days(pg_engine):
+    # Old gaps (days 0-2, 2-5) and a gap whose right-hand day just changed (days 5-7).
+    _insert(pg_engine, 1, 0, 10, age="1 day")
+    _insert(pg_engine, 1, 2, 30, age="1 day")
+    _insert(pg_engine, 1, 5, 60, age="1 day")
+    _insert(pg_engine, 1, 7, 70)
+    # Another location with only old rows.
+    _insert(pg_engine, 2, 0, 10, age="1 day")
+    _insert(pg_engine, 2, 2, 30, age="1 day")
+    with pg_engine.begin() as conn:
+        set_watermark(conn, WATERMARK_NAME, conn.execute(text("SELECT NOW() - INTERVAL '1 hour'")).scalar_one())
+
+    run_backfill()
+
+    assert _interpolated(pg_engine, 1) == [(6, 65, 32.5)]
+    assert _interpolated(pg_engine, 2) == []
+
+    # A rescan picks the old gaps up as well.
+    run_backfill(full=True)
+    assert _interpolated(pg_engine, 1) == [(1, 20, 10.0), (3, 40, 20.0), (4, 50, 25.0), (6, 65, 32.5)]
+    assert _interpolated(pg_engine, 2) == [(1, 20, 10.0)]
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from src.models.backtest import build_backtest_frame, run_backtest
+
+
+def _synthetic_history(n_locations: int = 3, n_days: int = 90) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2026-01-01", periods=n_days, freq="D")
+    frames = []
+    for loc in range(1, n_locations + 1):
+        base = 40 + 10 * loc
+        aqi = base + 15 * np.sin(np.arange(n_days) / 5) + rng.normal(0, 3, n_days)
+        frames.append(
+            pd.DataFrame({"location_id": loc, "date": dates, "max_aqi": aqi.round().astype(int)})
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_backtest_frame_targets_never_precede_origin():
+    frame = build_backtest_frame(_synthetic_history(), horizons=(1, 3))
+    valid = frame.dropna(subset=["target_date_h3"])
+    assert (valid["target_date_h3"] - valid["date"]).dt.days.eq(3).all()
+
+
+def test_backtest_targets_are_by_date_across_gaps():
+    # Jan 3-4 were interpolated, so they are missing from the real history.
+    df = pd.DataFrame({
+        "location_id": 1,
+        "date": pd.to_datetime(["2026-01-01", "2026-01-02", "2026-01-05", "2026-01-06"]),
+        "max_aqi": [10, 20, 50, 60],
+    })
+    frame = build_backtest_frame(df, horizons=(1, 3)).set_index("date")
+
+    assert frame.loc["2026-01-01", "target_h1"] == 20
+    assert np.isnan(frame.loc["2026-01-02", "target_h1"])       # not Jan 5's value
+    assert frame.loc["2026-01-05", "target_h1"] == 60
+    assert frame.loc["2026-01-02", "target_h3"] == 50
+    assert frame["target_date_h1"].isna().tolist() == [False, True, False, True]
+    assert (frame["target_date_h3"].dropna() - frame["target_date_h3"].dropna().index).dt.days.eq(3).all()
+
+
+def test_run_backtest_returns_metrics_per_model_location_horizon_month():
+    metrics = run_backtest(
+        _synthetic_history(),
+        horizons=(1, 2),
+        refit_days=14,
+        n_estimators=10,
+        workers=1,
+    )
+
+    assert set(metrics["model"]) == {
+        "persistence", "mean", "seasonal_naive", "ewma", "climatology", "random_forest",
+    }
+    assert set(metrics["horizon"]) == {1, 2}
+    assert set(metrics["location_id"]) == {1, 2, 3}
+    assert not metrics.duplicated(["model", "location_id", "horizon", "month"]).any()
+    assert (metrics["rmse"] >= metrics["mae"] - 1e-4).all()
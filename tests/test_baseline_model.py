@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.baseline_model import NaiveAQIForecastModel
+
+
+def _history() -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    dates = pd.date_range("2025-01-01", periods=400, freq="D")
+    frames = [
+        pd.DataFrame(
+            {"location_id": loc, "date": dates, "max_aqi": rng.integers(10, 150, len(dates))}
+        )
+        for loc in (3, 7, 11)
+    ]
+    # Shuffle so predict has to restore per-location date order itself.
+    return pd.concat(frames, ignore_index=True).sample(frac=1, random_state=0)
+
+
+def test_mean_matches_groupby_and_unknown_locations_use_global_mean():
+    df = _history()
+    model = NaiveAQIForecastModel(strategy="mean")
+    model.fit(df)
+
+    expected = df["location_id"].map(df.groupby("location_id")["max_aqi"].mean())
+    np.testing.assert_allclose(model.predict(df), expected, rtol=1e-6)
+
+    unseen = pd.DataFrame({"location_id": [999], "date": [pd.Timestamp("2026-01-01")], "max_aqi": [50]})
+    assert model.predict(unseen).iloc[0] == pytest.approx(df["max_aqi"].mean())
+
+
+def test_ewma_matches_pandas_per_location():
+    df = _history()
+    model = NaiveAQIForecastModel(strategy="ewma", alpha=0.3)
+    model.fit(df)
+
+    ordered = df.sort_values(["location_id", "date"])
+    expected = ordered.groupby("location_id")["max_aqi"].transform(
+        lambda s: s.ewm(alpha=0.3, adjust=False).mean()
+    )
+    np.testing.assert_allclose(model.predict(df).loc[expected.index], expected)
+
+
+def test_seasonal_naive_uses_same_weekday_last_week():
+    df = _history()
+    model = NaiveAQIForecastModel(strategy="seasonal_naive", horizon=1)
+    model.fit(df)
+    pred = model.predict(df)
+
+    lookup = df.set_index(["location_id", "date"])["max_aqi"]
+    row = df[(df["location_id"] == 7) & (df["date"] == pd.Timestamp("2025-03-10"))]
+    assert pred.loc[row.index[0]] == lookup[(7, pd.Timestamp("2025-03-04"))]
+
+    # No history a week back: fall back to persistence.
+    first = df[(df["location_id"] == 7) & (df["date"] == pd.Timestamp("2025-01-01"))]
+    assert pred.loc[first.index[0]] == first["max_aqi"].iloc[0]
+
+
+def test_climatology_is_smoothed_day_of_year_mean():
+    df = _history()
+    model = NaiveAQIForecastModel(strategy="climatology", window_days=0)
+    model.fit(df)
+
+    query = pd.DataFrame(
+        {"location_id": [11], "date": [pd.Timestamp("2026-02-09")], "max_aqi": [0]}
+    )
+    loc = df[df["location_id"] == 11]
+    expected = loc[loc["date"].dt.dayofyear == 41]["max_aqi"].mean()
+    assert model.predict(query).iloc[0] == pytest.approx(expected)
+    assert model.climatology_.shape == (3, 366)
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from benchmarks.cases import CASES, daily_frame
+from benchmarks.runner import compare_results, time_callable
+
+
+def _results(**timings):
+    return {"meta": {}, "results": {k.replace("__", "/"): {"min_s": v} for k, v in timings.items()}}
+
+
+def test_compare_flags_only_slowdowns_beyond_tolerance():
+    baseline = _results(a__1k=0.010, b__1k=0.010, c__1k=0.010, d__1k=0.010)
+    current = _results(a__1k=0.012, b__1k=0.020, c__1k=0.004, e__1k=0.010)
+    status = {key: s for key, _, _, s in compare_results(baseline, current, tolerance=0.25)}
+    assert status == {"a/1k": "ok", "b/1k": "slower", "c/1k": "faster", "d/1k": "missing", "e/1k": "missing"}
+
+
+def test_compare_ignores_noise_on_tiny_timings():
+    baseline = _results(a__10=2e-6)
+    current = _results(a__10=6e-6)  # 3x, but a few microseconds
+    assert compare_results(baseline, current)[0][3] == "ok"
+
+
+def test_daily_frame_shape_is_fixed():
+    df = daily_frame(1_000, days_per_location=100)
+    assert len(df) == 1_000
+    assert df["location_id"].nunique() == 10
+    assert df.equals(daily_frame(1_000, days_per_location=100))
+
+
+def test_loop_is_sized_after_a_warm_up_call():
+    calls = []
+
+    def cold_first_call():
+        if not calls:
+            time.sleep(0.3)
+        calls.append(1)
+
+    timing = time_callable(cold_first_call, repeats=1)
+    assert timing["loops"] > 1
+    assert timing["min_s"] < 0.01
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda c: c.name)
+def test_every_case_runs_at_smallest_size(case):
+    timing = time_callable(case.setup(10), repeats=1)
+    assert timing["min_s"] > 0
@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+from src.cli import COMMAND_MODULES, build_parser, parse_importtime, summarize_import_times
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     numpy.core
+import time:       400 |        500 |   numpy
+import time:       300 |        800 | pandas
+import time:        50 |         50 | src.cli
+"""
+
+
+def test_cli_imports_no_heavy_dependencies():
+    code = (
+        "import sys, src.cli; "
+        "print(sorted(m for m in ('pandas', 'sqlalchemy', 'sklearn', 'numpy') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_every_command_module_is_a_subcommand():
+    parser = build_parser()
+    for command in COMMAND_MODULES:
+        args = parser.parse_args([command])
+        assert callable(args.handler)
+    assert build_parser().parse_args(["backfill", "--full"]).full
+    assert build_parser().parse_args(["import-times"]).commands == []
+
+
+def test_import_time_report():
+    entries = parse_importtime(SAMPLE)
+    assert entries[0] == ("numpy.core", 100, 100, 2)
+    assert entries[2] == ("pandas", 300, 800, 0)
+
+    total, ranked = summarize_import_times(entries, top=2)
+    assert total == 850 / 1e6
+    assert ranked == [("numpy", 500 / 1e6), ("pandas", 300 / 1e6)]
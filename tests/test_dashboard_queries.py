@@ -0,0 +1,127 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from src.dashboard_queries import (
+    daily_aggregates_sql,
+    read_daily_aggregates,
+    read_forecast_vs_actual,
+    read_latest_forecasts,
+)
+
+START = date(2026, 4, 1)
+CUTOFF = START + timedelta(days=10)
+
+
+@pytest.fixture
+def history(pg_engine):
+    with pg_engine.begin() as conn:
+        for location_id in (1, 2):
+            for offset in range(21):
+                day = START + timedelta(days=offset)
+                conn.execute(text("""
+                    INSERT INTO daily_aggregates
+                        (location_id, date, max_aqi, mean_aqi, min_aqi, is_interpolated)
+                    VALUES (:loc, :date, :aqi, :aqi / 2.0, :aqi / 4, :interpolated)
+                """), {"loc": location_id, "date": day, "aqi": 10 * location_id + offset,
+                       "interpolated": offset % 7 == 3})
+                conn.execute(text("""
+                    INSERT INTO forecasts (location_id, target_date, forecast_aqi, model_name, created_at)
+                    VALUES (:loc, :date, :aqi, 'rf', NOW() - make_interval(days => 30 - :offset))
+                """), {"loc": location_id, "date": day, "aqi": 20 * location_id + offset, "offset": offset})
+                conn.execute(text("""
+                    INSERT INTO forecast_evaluations
+                        (location_id, target_date, model_name, horizon_days, forecast_aqi, actual_aqi, error)
+                    VALUES (:loc, :date, 'rf', 1, :aqi + 5, :aqi, 5)
+                """), {"loc": location_id, "date": day, "aqi": 10 * location_id + offset})
+        # A newer forecast of Salem's last day from another model wins.
+        conn.execute(text("""
+            INSERT INTO forecasts (location_id, target_date, forecast_aqi, model_name)
+            VALUES (2, :date, 99, 'baseline')
+        """), {"date": START + timedelta(days=20)})
+    return pg_engine
+
+
+def _all_rows(engine, sql):
+    with engine.connect() as conn:
+        return pd.read_sql(text(sql), conn)
+
+
+def _old_filter(df, date_column, selected):
+    # What the dashboard used to do in pandas after loading whole tables.
+    df = df[pd.to_datetime(df[date_column]) >= pd.Timestamp(CUTOFF)]
+    return df if selected is None else df[df["name"] == selected]
+
+
+@pytest.mark.parametrize("location_id, selected", [(None, None), (2, "Salem")])
+def test_daily_aggregates_match_the_old_pandas_filter(history, location_id, selected):
+    everything = _all_rows(history, """
+        SELECT da.location_id, l.name, da.date, da.max_aqi, da.is_interpolated
+        FROM daily_aggregates da JOIN locations l ON l.id = da.location_id
+    """)
+    expected = _old_filter(everything, "date", selected).sort_values(["name", "date"])
+
+    with history.connect() as conn:
+        got = read_daily_aggregates(conn, location_id, CUTOFF, weekly=False)
+
+    assert got["location_id"].tolist() == expected["location_id"].tolist()
+    assert got["date"].dt.date.tolist() == expected["date"].tolist()
+    assert got["max_aqi"].tolist() == expected["max_aqi"].tolist()
+    assert got["is_interpolated"].tolist() == expected["is_interpolated"].tolist()
+
+
+def test_weekly_rollup_groups_the_same_rows(history):
+    with history.connect() as conn:
+        daily = read_daily_aggregates(conn, 1, CUTOFF, weekly=False)
+        weekly = read_daily_aggregates(conn, 1, CUTOFF, weekly=True)
+
+    week = daily["date"].dt.to_period("W-SUN").dt.start_time
+    expected = daily.groupby(week)["max_aqi"].max()
+    assert weekly["date"].tolist() == expected.index.tolist()
+    assert weekly["max_aqi"].tolist() == expected.tolist()
+    assert not weekly["is_interpolated"].any()
+
+
+def test_location_filter_binds_a_parameter():
+    assert ":location_id" in daily_aggregates_sql(3, weekly=False)
+    assert ":location_id" not in daily_aggregates_sql(None, weekly=True)
+
+
+@pytest.mark.parametrize("location_id, selected", [(None, None), (1, "Portland")])
+def test_latest_forecasts_match_the_old_groupby(history, location_id, selected):
+    everything = _all_rows(history, """
+        SELECT l.name, f.target_date, f.forecast_aqi
+        FROM forecasts f JOIN locations l ON l.id = f.location_id
+        ORDER BY f.created_at
+    """)
+    if selected is not None:
+        everything = everything[everything["name"] == selected]
+    expected = (
+        everything.sort_values("target_date", kind="stable")
+        .groupby("name").last().reset_index()
+    )
+
+    with history.connect() as conn:
+        got = read_latest_forecasts(conn, location_id)
+
+    assert got["name"].tolist() == expected["name"].tolist()
+    assert got["target_date"].dt.date.tolist() == expected["target_date"].tolist()
+    assert got["forecast_aqi"].tolist() == expected["forecast_aqi"].tolist()
+
+
+@pytest.mark.parametrize("location_id, selected", [(None, None), (2, "Salem")])
+def test_forecast_vs_actual_filters_by_location_and_cutoff(history, location_id, selected):
+    everything = _all_rows(history, """
+        SELECT l.name, e.target_date, e.actual_aqi
+        FROM forecast_evaluations e JOIN locations l ON l.id = e.location_id
+    """)
+    expected = _old_filter(everything, "target_date", selected).sort_values(["name", "target_date"])
+
+    with history.connect() as conn:
+        got = read_forecast_vs_actual(conn, location_id, CUTOFF)
+
+    assert got["name"].tolist() == expected["name"].tolist()
+    assert got["target_date"].dt.date.tolist() == expected["target_date"].tolist()
+    assert got["actual_aqi"].tolist() == expected["actual_aqi"].tolist()
@@ -0,0 +1,60 @@
+import json
+from datetime import date
+
+from src.db.notify import MAX_PAYLOAD_BYTES, decode_location_dates, encode_location_dates
+from src.event_worker import Debouncer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_payload_round_trip_and_chunking():
+    pairs = {(loc, date(2026, 1, 1 + d)) for loc in range(1, 200) for d in range(3)}
+    payloads = encode_location_dates(pairs)
+    assert len(payloads) > 1
+    assert all(len(p.encode()) < MAX_PAYLOAD_BYTES for p in payloads)
+
+    decoded = set()
+    for payload in payloads:
+        decoded |= decode_location_dates(payload)
+    assert decoded == pairs
+
+    assert encode_location_dates([]) == []
+    assert json.loads(encode_location_dates([(3, date(2026, 5, 2))])[0]) == [[3, "2026-05-02"]]
+
+
+def test_debouncer_waits_for_quiet_period():
+    clock = FakeClock()
+    batch = Debouncer(quiet_seconds=2.0, max_wait_seconds=10.0, clock=clock)
+    assert batch.timeout() is None and not batch.due()
+
+    batch.add({(1, date(2026, 1, 1))})
+    clock.now = 1.5
+    batch.add({(2, date(2026, 1, 1))})
+    assert batch.timeout() == 2.0
+    clock.now = 3.5
+    assert batch.due()
+    assert batch.drain() == {(1, date(2026, 1, 1)), (2, date(2026, 1, 1))}
+    assert batch.timeout() is None
+
+
+def test_debouncer_caps_wait_during_steady_stream():
+    clock = FakeClock()
+    batch = Debouncer(quiet_seconds=2.0, max_wait_seconds=5.0, clock=clock)
+    for t in range(5):
+        clock.now = float(t)
+        batch.add({(1, date(2026, 1, 1 + t))})
+        assert not batch.due()
+    clock.now = 5.0
+    assert batch.due()
+
+
+def test_empty_notification_does_not_start_a_batch():
+    batch = Debouncer(clock=FakeClock())
+    batch.add(set())
+    assert batch.timeout() is None
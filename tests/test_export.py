@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src.api import export
+from src.api.export import DATASETS, ArrowEncoder, CSVEncoder, NDJSONEncoder, export_sql
+from src.api.main import app
+
+ROWS = [(1, "2026-01-01", 10, 9.5, 8, False), (2, "2026-01-01", None, None, None, True)]
+
+
+def test_export_sql_filters():
+    sql = export_sql(DATASETS["daily_aggregates"], has_start=True, has_end=False, has_locations=True)
+    assert "location_id = ANY(:location_ids)" in sql
+    assert "date >= :start" in sql
+    assert ":end" not in sql
+    assert sql.endswith("ORDER BY location_id, date")
+
+
+def test_text_encoders():
+    names = [name for name, _ in DATASETS["daily_aggregates"].columns]
+
+    csv_enc = CSVEncoder(names)
+    assert csv_enc.header().decode().startswith("location_id,date,max_aqi")
+    assert csv_enc.batch(ROWS).decode().splitlines()[1] == "2,2026-01-01,,,,True"
+
+    lines = NDJSONEncoder(names).batch(ROWS).decode().splitlines()
+    assert len(lines) == 2
+    assert '"max_aqi": null' in lines[1]
+
+
+def test_arrow_stream_round_trip():
+    enc = ArrowEncoder(DATASETS["daily_aggregates"])
+    rows = [(loc, date(2026, 1, 1), aqi, mean, low, interp) for loc, _, aqi, mean, low, interp in ROWS]
+    data = enc.header() + enc.batch(rows) + enc.batch(rows) + enc.footer()
+
+    table = pa.ipc.open_stream(io.BytesIO(data)).read_all()
+    assert table.num_rows == 4
+    assert table.column("max_aqi").to_pylist() == [10, None, 10, None]
+
+
+def test_export_rejects_unknown_dataset():
+    client = TestClient(app)
+    assert client.get("/export/alert_state").status_code == 422
+    assert client.get("/export/forecasts?format=xlsx").status_code == 422
+
+
+DAY = date(2026, 6, 1)
+
+
+@pytest.fixture
+def seeded(pg_engine, pg_async_engine, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_ROWS", 4)  # several batches per export
+    with pg_engine.begin() as conn:
+        for location_id in (1, 2):
+            for offset in range(7):
+                conn.execute(text("""
+                    INSERT INTO daily_aggregates
+                        (location_id, date, max_aqi, mean_aqi, min_aqi, is_interpolated)
+                    VALUES (:loc, :date, :aqi, :aqi / 2.0, :aqi / 4, :interpolated)
+                """), {"loc": location_id, "date": DAY + timedelta(days=offset),
+                       "aqi": 100 * location_id + offset, "interpolated": offset == 3})
+        conn.execute(text("""
+            INSERT INTO observations (location_id, timestamp_utc, aqi, category, pollutant) VALUES
+                (1, '2026-06-01 08:00+00', 42, 'Good', 'PM2.5'),
+                (1, '2026-06-01 08:00+00', 55, 'Moderate', 'OZONE')
+        """))
+    return pg_engine
+
+
+def _get(path, **params):
+    response = TestClient(app).get(path, params=params)
+    assert response.status_code == 200
+    return response
+
+
+def test_csv_export_streams_the_filtered_rows(seeded):
+    body = _get(
+        "/export/daily_aggregates", format="csv", location_id=2,
+        start="2026-06-02T00:00:00", end="2026-06-06T00:00:00",
+    ).text
+
+    header, *rows = list(csv.reader(io.StringIO(body)))
+    assert header == ["location_id", "date", "max_aqi", "mean_aqi", "min_aqi", "is_interpolated"]
+    assert rows == [
+        ["2", str(DAY + timedelta(days=d)), str(200 + d), str((200 + d) / 2), str((200 + d) // 4), str(d == 3)]
+        for d in range(1, 6)
+    ]
+
+
+def test_ndjson_export_returns_every_row_once(seeded):
+    lines = _get("/export/daily_aggregates", format="ndjson").text.splitlines()
+    rows = [json.loads(line) for line in lines]
+
+    assert len(rows) == 14
+    assert [(r["location_id"], r["date"]) for r in rows] == [
+        (loc, str(DAY + timedelta(days=d))) for loc in (1, 2) for d in range(7)
+    ]
+    assert rows[0] == {
+        "location_id": 1, "date": "2026-06-01", "max_aqi": 100, "mean_aqi": 50.0,
+        "min_aqi": 25, "is_interpolated": False,
+    }
+
+    observations = [json.loads(line) for line in _get("/export/observations").text.splitlines()]
+    assert [(o["pollutant"], o["aqi"]) for o in observations] == [("OZONE", 55), ("PM2.5", 42)]
+    assert datetime.fromisoformat(observations[0]["timestamp_utc"]) == datetime(
+        2026, 6, 1, 8, tzinfo=timezone.utc
+    )
+
+
+def test_arrow_export_reassembles_across_batches(seeded):
+    data = _get("/export/daily_aggregates", format="arrow", location_id=1).content
+
+    table = pa.ipc.open_stream(io.BytesIO(data)).read_all()
+    assert table.num_rows == 7
+    assert table.column("max_aqi").to_pylist() == list(range(100, 107))
+    assert table.column("date").to_pylist()[-1] == DAY + timedelta(days=6)
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import src.api.main as api
+from src.api.cache import ResponseCache, etag_matches
+
+
+def test_concurrent_misses_build_once():
+    cache = ResponseCache()
+    calls = []
+
+    async def build():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return b"[]"
+
+    async def burst():
+        return await asyncio.gather(*(cache.get_or_build("k", build) for _ in range(8)))
+
+    entries = asyncio.run(burst())
+    assert len(calls) == 1
+    assert len({e.etag for e in entries}) == 1
+
+
+def test_invalidation_during_build_is_not_cached():
+    cache = ResponseCache()
+
+    async def stale_build():
+        cache.invalidate()  # a NOTIFY arrives while we are querying
+        return b"stale"
+
+    async def fresh_build():
+        return b"fresh"
+
+    assert asyncio.run(cache.get_or_build("k", stale_build)).body == b"stale"
+    assert asyncio.run(cache.get_or_build("k", fresh_build)).body == b"fresh"
+
+
+def test_ttl_expiry():
+    cache = ResponseCache(ttl_seconds=0.0)
+
+    async def build(body):
+        return body
+
+    asyncio.run(cache.get_or_build("k", lambda: build(b"one")))
+    assert asyncio.run(cache.get_or_build("k", lambda: build(b"two"))).body == b"two"
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches('"def"', '"abc"')
+
+
+def test_latest_forecasts_served_from_cache_with_etag(monkeypatch):
+    calls = []
+
+    async def build():
+        calls.append(1)
+        return json.dumps([{
+            "location_id": 1,
+            "location_name": "Portland",
+            "target_date": "2026-08-02",
+            "forecast_aqi": 42,
+            "model_name": "random_forest_v1",
+        }]).encode()
+
+    monkeypatch.setattr(api, "forecast_cache", ResponseCache())
+    monkeypatch.setattr(api, "build_latest_forecasts", build)
+    client = TestClient(api.app)
+
+    first = client.get("/forecasts/latest")
+    assert first.status_code == 200
+    assert first.json()[0]["location_name"] == "Portland"
+
+    etag = first.headers["etag"]
+    second = client.get("/forecasts/latest", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert len(calls) == 1
+
+
+def test_latest_body_orders_models_within_a_location(pg_engine, pg_async_engine):
+    with pg_engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO forecasts (location_id, target_date, forecast_aqi, model_name) VALUES
+                (2, '2026-08-29', 41, 'random_forest_v1'),
+                (1, '2026-08-29', 79, 'random_forest_v1'),
+                (1, '2026-08-29', 20, 'baseline_persistence'),
+                (2, '2026-08-29', 44, 'baseline_persistence')
+        """))
+
+    body = json.loads(asyncio.run(api.build_latest_forecasts()))
+
+    assert [(f["location_id"], f["model_name"]) for f in body] == [
+        (1, "baseline_persistence"), (1, "random_forest_v1"),
+        (2, "baseline_persistence"), (2, "random_forest_v1"),
+    ]
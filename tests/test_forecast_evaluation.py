@@ -0,0 +1,142 @@
+import math
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src.api.forecasts import accuracy_sql
+from src.api.main import app
+from src.backfill_interpolate import set_watermark
+from src.evaluate_forecasts import WATERMARK_NAME, run_evaluation
+from src.orchestrate import STAGES
+
+client = TestClient(app)
+
+END = date(2026, 3, 31)
+
+
+def _actual(conn, target_date, max_aqi, interpolated=False):
+    conn.execute(text("""
+        INSERT INTO daily_aggregates (location_id, date, max_aqi, mean_aqi, min_aqi, is_interpolated)
+        VALUES (1, :date, :max_aqi, :max_aqi / 2.0, :max_aqi / 4, :interpolated)
+    """), {"date": target_date, "max_aqi": max_aqi, "interpolated": interpolated})
+
+
+def _forecast(conn, target_date, forecast_aqi):
+    conn.execute(text("""
+        INSERT INTO forecasts (location_id, target_date, forecast_aqi, model_name, horizon_days)
+        VALUES (1, :date, :forecast_aqi, 'rf', 1)
+    """), {"date": target_date, "forecast_aqi": forecast_aqi})
+
+
+def _evaluations(engine):
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT target_date, actual_aqi, error FROM forecast_evaluations ORDER BY target_date"
+        )).all()
+    return [(r.target_date, r.actual_aqi, r.error) for r in rows]
+
+
+def test_evaluation_skips_estimated_and_unfinished_days(pg_engine):
+    today = date.today()
+    with pg_engine.begin() as conn:
+        _actual(conn, END - timedelta(days=1), 50)
+        _forecast(conn, END - timedelta(days=1), 60)
+        _actual(conn, END, 70, interpolated=True)
+        _forecast(conn, END, 60)
+        _actual(conn, today, 40)                  # still filling in
+        _forecast(conn, today, 45)
+
+    run_evaluation(full=True)
+
+    assert _evaluations(pg_engine) == [(END - timedelta(days=1), 50, 10)]
+
+
+def test_day_is_evaluated_once_it_is_over(pg_engine):
+    # Yesterday's aggregate last changed yesterday afternoon and the last
+    # run came after that, while the day was still in progress.
+    yesterday = date.today() - timedelta(days=1)
+    with pg_engine.begin() as conn:
+        _actual(conn, yesterday, 50)
+        _forecast(conn, yesterday, 65)
+        conn.execute(text("""
+            UPDATE daily_aggregates SET updated_at = CURRENT_DATE - INTERVAL '9 hours';
+            UPDATE forecasts SET created_at = CURRENT_DATE - INTERVAL '30 hours';
+        """))
+        set_watermark(
+            conn, WATERMARK_NAME,
+            conn.execute(text("SELECT CURRENT_DATE - INTERVAL '2 hours'")).scalar_one(),
+        )
+
+    run_evaluation()
+
+    assert _evaluations(pg_engine) == [(yesterday, 50, 15)]
+
+
+def test_evaluate_signal_moves_at_midnight(pg_engine):
+    signal = {s.name: s for s in STAGES}["evaluate"].signal
+    with pg_engine.begin() as conn:
+        assert signal(conn) is None
+        _actual(conn, END, 50)
+        assert signal(conn).endswith(f":{date.today()}")
+
+
+def test_rolling_accuracy_windows_use_calendar_days(pg_engine):
+    # Errors +10 and -20 within the last 7 days, +30 ten days earlier.
+    with pg_engine.begin() as conn:
+        for offset, actual, forecast in [(0, 50, 60), (3, 60, 40), (10, 20, 50)]:
+            _actual(conn, END - timedelta(days=offset), actual)
+            _forecast(conn, END - timedelta(days=offset), forecast)
+
+    run_evaluation(full=True)
+
+    assert [e[2] for e in _evaluations(pg_engine)] == [30, -20, 10]
+    with pg_engine.connect() as conn:
+        accuracy = {
+            r.window_days: r
+            for r in conn.execute(text(
+                "SELECT window_days, end_date, n, mae, rmse, bias FROM forecast_accuracy"
+            ))
+        }
+    assert set(accuracy) == {7, 30, 90}
+    assert {r.end_date for r in accuracy.values()} == {END}
+
+    week = accuracy[7]
+    assert week.n == 2
+    assert math.isclose(week.mae, 15)
+    assert math.isclose(week.rmse, math.sqrt(250))
+    assert math.isclose(week.bias, -5)
+
+    for window in (30, 90):
+        month = accuracy[window]
+        assert month.n == 3
+        assert math.isclose(month.mae, 20)
+        assert math.isclose(month.rmse, math.sqrt(1400 / 3))
+        assert math.isclose(month.bias, 20 / 3)
+
+
+def test_unchanged_pairs_are_not_rewritten(pg_engine):
+    with pg_engine.begin() as conn:
+        _actual(conn, END, 50)
+        _forecast(conn, END, 60)
+
+    run_evaluation(full=True)
+    with pg_engine.connect() as conn:
+        first = conn.execute(text("SELECT evaluated_at FROM forecast_evaluations")).scalar_one()
+    run_evaluation(full=True)
+    with pg_engine.connect() as conn:
+        second = conn.execute(text("SELECT evaluated_at FROM forecast_evaluations")).scalar_one()
+
+    assert first == second
+
+
+def test_accuracy_sql_applies_only_given_filters():
+    sql = accuracy_sql(has_location=True, has_model=False, has_window=True)
+    assert "a.location_id = :location_id" in sql
+    assert "a.window_days = :window_days" in sql
+    assert ":model_name" not in sql
+    assert "WHERE" not in accuracy_sql(False, False, False)
+
+
+def test_accuracy_rejects_invalid_parameters():
+    assert client.get("/forecasts/accuracy?window_days=week").status_code == 422
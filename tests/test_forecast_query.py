@@ -0,0 +1,106 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src.api.forecasts import ForecastQuery, forecast_query_sql, group_by_location
+from src.api.main import app
+
+
+def _row(loc, name, target_date=None, aqi=None):
+    return {
+        "location_id": loc, "location_name": name, "target_date": target_date,
+        "model_name": "random_forest_v1" if target_date else None, "forecast_aqi": aqi,
+        "forecast_q10": None, "forecast_q50": None, "forecast_q90": None, "exceedance_prob": None,
+    }
+
+
+def test_group_by_location_keeps_locations_without_forecasts():
+    rows = [
+        _row(1, "Portland", date(2026, 8, 1), 40),
+        _row(1, "Portland", date(2026, 8, 2), 55),
+        _row(2, "Eugene"),  # LEFT JOIN miss
+    ]
+    grouped = group_by_location(rows)
+
+    assert [g.location_id for g in grouped] == [1, 2]
+    assert [f.forecast_aqi for f in grouped[0].forecasts] == [40, 55]
+    assert grouped[1].forecasts == []
+
+
+def test_forecast_query_sql_filters_in_join():
+    sql = forecast_query_sql(ForecastQuery(location_ids=[1], start_date=date(2026, 8, 1), model_name="m"))
+    assert "l.id = ANY(:location_ids)" in sql
+    assert "f.target_date >= :start_date" in sql
+    assert "f.model_name = :model_name" in sql
+    assert ":end_date" not in sql
+
+
+def test_forecast_query_validation():
+    client = TestClient(app)
+    assert client.post("/forecasts/query", json={"location_ids": []}).status_code == 422
+    assert client.post("/forecasts/query", json={
+        "location_ids": [1], "start_date": "2026-08-02", "end_date": "2026-08-01",
+    }).status_code == 422
+
+
+@pytest.fixture
+def seeded(pg_engine, pg_async_engine):
+    with pg_engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO locations (id, name, latitude, longitude) VALUES (3, 'Eugene', 44.05, -123.09)
+        """))
+        conn.execute(text("""
+            INSERT INTO forecasts (location_id, target_date, forecast_aqi, model_name,
+                                   forecast_q10, forecast_q50, forecast_q90, exceedance_prob) VALUES
+                (1, '2026-08-01', 40, 'random_forest_v1', 30, 40, 52, 0.01),
+                (1, '2026-08-02', 55, 'random_forest_v1', 45, 55, 70, 0.05),
+                (1, '2026-08-02', 50, 'baseline_persistence', NULL, NULL, NULL, NULL),
+                (1, '2026-08-05', 90, 'random_forest_v1', 70, 90, 120, 0.30),
+                (2, '2026-08-02', 65, 'random_forest_v1', 50, 65, 80, 0.08)
+        """))
+    return pg_engine
+
+
+def _query(**body):
+    response = TestClient(app).post("/forecasts/query", json=body)
+    assert response.status_code == 200
+    return response.json()
+
+
+def _points(entry):
+    return [(f["target_date"], f["model_name"], f["forecast_aqi"]) for f in entry["forecasts"]]
+
+
+def test_query_groups_every_requested_location(seeded):
+    result = _query(location_ids=[3, 1, 2, 99, 1])
+
+    assert [(r["location_id"], r["location_name"]) for r in result] == [
+        (1, "Portland"), (2, "Salem"), (3, "Eugene"),   # 99 is unknown
+    ]
+    assert _points(result[0]) == [
+        ("2026-08-01", "random_forest_v1", 40),
+        ("2026-08-02", "baseline_persistence", 50),
+        ("2026-08-02", "random_forest_v1", 55),
+        ("2026-08-05", "random_forest_v1", 90),
+    ]
+    assert result[0]["forecasts"][0] == {
+        "target_date": "2026-08-01", "model_name": "random_forest_v1", "forecast_aqi": 40,
+        "forecast_q10": 30.0, "forecast_q50": 40.0, "forecast_q90": 52.0, "exceedance_prob": 0.01,
+    }
+    assert result[2]["forecasts"] == []
+
+
+def test_query_filters_by_date_range_and_model(seeded):
+    result = _query(
+        location_ids=[1, 2], start_date="2026-08-02", end_date="2026-08-04",
+        model_name="random_forest_v1",
+    )
+
+    assert _points(result[0]) == [("2026-08-02", "random_forest_v1", 55)]
+    assert _points(result[1]) == [("2026-08-02", "random_forest_v1", 65)]
+
+    # A location whose forecasts all fall outside the filter is still listed.
+    (portland,) = _query(location_ids=[1], start_date="2026-09-01")
+    assert portland["location_name"] == "Portland" and portland["forecasts"] == []
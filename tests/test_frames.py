@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from src.db.frames import AQI, DATE, LOCATION_ID, NAME, NULLABLE_AQI, read_frame
+
+ROWS_SQL = """
+    SELECT 1 AS location_id, 'Bend' AS name, '2026-05-01' AS date, 42 AS max_aqi, NULL AS pm25_max_aqi
+    UNION ALL SELECT 2, 'Salem', '2026-05-01', 61, 58
+    UNION ALL SELECT 1, 'Bend', '2026-05-02', 170, 170
+"""
+DTYPES = {
+    "location_id": LOCATION_ID, "name": NAME, "date": DATE,
+    "max_aqi": AQI, "pm25_max_aqi": NULLABLE_AQI,
+}
+
+
+@pytest.fixture
+def conn():
+    with create_engine("sqlite://").connect() as connection:
+        yield connection
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 1000])
+def test_read_frame_casts_to_compact_dtypes(conn, chunk_rows):
+    df = read_frame(conn, ROWS_SQL, DTYPES, chunk_rows=chunk_rows)
+
+    assert list(df.columns) == list(DTYPES)
+    assert df["location_id"].dtype == "int32"
+    assert df["max_aqi"].dtype == "int16"
+    assert df["pm25_max_aqi"].dtype == "Int16"
+    assert df["date"].dtype == "datetime64[s]"
+    assert isinstance(df["name"].dtype, pd.CategoricalDtype)
+    # Chunks with different categories are merged, not turned into object.
+    assert df["name"].tolist() == ["Bend", "Salem", "Bend"]
+    assert df["max_aqi"].tolist() == [42, 61, 170]
+    assert df["pm25_max_aqi"].isna().tolist() == [True, False, False]
+    assert (df["date"].iloc[2] - df["date"].iloc[0]).days == 1
+
+
+def test_read_frame_empty_result_keeps_dtypes(conn):
+    df = read_frame(conn, f"SELECT * FROM ({ROWS_SQL}) WHERE max_aqi > 500", DTYPES)
+
+    assert df.empty
+    assert df.dtypes.astype(str).to_dict() == {
+        "location_id": "int32", "name": "category", "date": "datetime64[s]",
+        "max_aqi": "int16", "pm25_max_aqi": "Int16",
+    }
+
+
+def test_read_frame_requires_the_declared_columns(conn):
+    with pytest.raises(ValueError, match="expected"):
+        read_frame(conn, "SELECT 1 AS location_id, 2 AS max_aqi", {"max_aqi": AQI, "location_id": LOCATION_ID})
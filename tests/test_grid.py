@@ -0,0 +1,86 @@
+import io
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import grid as grid_api
+from src.api.main import app
+from src.grid import GridSpec, idw, interpolate_grid, load_grid, save_grid
+
+SPEC = GridSpec(south=44.0, west=-124.0, north=46.0, east=-121.0, resolution_km=5.0)
+# Portland, Salem, Bend
+LATS = [45.5152, 44.9429, 44.0582]
+LONS = [-122.6784, -123.0351, -121.3153]
+VALUES = [40, 150, 90]
+
+
+def test_spec_cells_are_about_resolution_km():
+    rows, cols = SPEC.shape
+    assert 44 <= rows <= 45 and 47 <= cols <= 48  # 222 km x ~236 km
+    cell_rows, cell_cols, inside = SPEC.cells([45.9999, 44.0001, 47.0], [-123.9999, -121.0001, -122.0])
+    assert inside.tolist() == [True, True, False]
+    assert (cell_rows[0], cell_cols[0]) == (0, 0)
+    assert (cell_rows[1], cell_cols[1]) == (rows - 1, cols - 1)
+
+
+def test_idw_takes_site_value_on_site_and_weights_by_distance():
+    values = np.array([[10.0, 100.0], [10.0, 100.0], [10.0, 100.0]])
+    km = np.array([[0.0, 50.0], [10.0, 10.0], [10.0, 30.0]])
+    result = idw(values, km, power=2)
+    assert result[0] == pytest.approx(10.0, abs=1e-6)
+    assert result[1] == pytest.approx(55.0)
+    assert 10.0 < result[2] < 55.0
+
+
+def test_interpolate_grid_is_bounded_and_batch_independent():
+    whole = interpolate_grid(LATS, LONS, VALUES, SPEC, neighbors=8, power=2)
+    batched = interpolate_grid(LATS, LONS, VALUES, SPEC, neighbors=8, power=2, batch_cells=7)
+
+    assert whole.dtype == np.float32 and whole.shape == SPEC.shape
+    np.testing.assert_array_equal(whole, batched)
+    assert min(VALUES) <= whole.min() and whole.max() <= max(VALUES)
+    rows, cols, _ = SPEC.cells([LATS[1]], [LONS[1]])
+    assert whole[rows[0], cols[0]] == pytest.approx(150, abs=15)  # the cell containing Salem
+
+
+def test_saved_grid_is_memory_mapped(tmp_path):
+    grid = interpolate_grid(LATS, LONS, VALUES, SPEC)
+    save_grid(grid, {"rows": grid.shape[0], "cols": grid.shape[1]}, "forecasts", tmp_path)
+
+    loaded, meta = load_grid("forecasts", tmp_path)
+    assert isinstance(loaded, np.memmap)
+    np.testing.assert_array_equal(loaded, grid)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["forecasts.json", "forecasts.npy"]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    grid = interpolate_grid(LATS, LONS, VALUES, SPEC)
+    meta = {
+        "source": "forecasts", "as_of": "2026-05-02T00:00:00", "created_at": "2026-05-01T12:00:00+00:00",
+        "south": SPEC.south, "west": SPEC.west, "north": SPEC.north, "east": SPEC.east,
+        "resolution_km": SPEC.resolution_km, "rows": grid.shape[0], "cols": grid.shape[1],
+    }
+    save_grid(grid, meta, "forecasts", tmp_path)
+    monkeypatch.setattr(grid_api, "grid_store", grid_api.GridStore(tmp_path))
+    return TestClient(app)
+
+
+def test_grid_value_and_tiles(client):
+    assert client.get("/grid/forecasts").json()["rows"] == SPEC.shape[0]
+    assert client.get("/grid/observations").status_code == 404
+
+    value = client.get("/grid/forecasts/value", params={"lat": 45.5, "lon": -122.7}).json()
+    assert 40 <= value["aqi"] < 60
+    assert client.get("/grid/forecasts/value", params={"lat": 40.0, "lon": -122.7}).status_code == 404
+
+    # z=7 tile 20/45 covers the Portland/Salem area and extends past the grid.
+    response = client.get("/grid/forecasts/tiles/7/20/45.npy")
+    tile = np.load(io.BytesIO(response.content))
+    assert tile.shape == (256, 256) and tile.dtype == np.int16
+    assert (tile == grid_api.NODATA).any() and tile.max() <= 150
+
+    cached = client.get("/grid/forecasts/tiles/7/20/45.npy", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+    assert client.get("/grid/forecasts/tiles/7/0/0.npy").status_code == 404
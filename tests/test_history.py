@@ -0,0 +1,124 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src.api.history import SOURCES, _bind_time, downsample_sql, page_sql
+from src.api.main import app
+
+client = TestClient(app)
+
+
+def test_page_sql_uses_keyset_not_offset():
+    sql = page_sql(SOURCES["daily"], start=None, end=None, after=datetime(2026, 1, 5))
+    assert "date > :after" in sql
+    assert ":start" not in sql and ":end" not in sql
+    assert "OFFSET" not in sql.upper()
+    assert "ORDER BY date" in sql
+
+
+def test_hourly_source_groups_pollutants():
+    sql = downsample_sql(SOURCES["hourly"], start=datetime(2026, 1, 1), end=None, after=None)
+    assert "timestamp_utc >= :start" in sql
+    assert "GROUP BY timestamp_utc" in sql
+    assert "low_rank = 1 OR high_rank = 1" in sql
+
+
+def test_daily_cursor_binds_as_date():
+    assert _bind_time(SOURCES["daily"], datetime(2026, 1, 5, 0, 0)).isoformat() == "2026-01-05"
+    ts = datetime(2026, 1, 5, 3, 0)
+    assert _bind_time(SOURCES["hourly"], ts) is ts
+
+
+def test_history_rejects_invalid_parameters():
+    assert client.get("/locations/1/history?max_points=1").status_code == 422
+    assert client.get("/locations/1/history?resolution=weekly").status_code == 422
+    assert client.get("/locations/1/history?limit=0").status_code == 422
+
+
+START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def history(pg_engine, pg_async_engine):
+    with pg_engine.begin() as conn:
+        for day in range(25):
+            conn.execute(text("""
+                INSERT INTO daily_aggregates (location_id, date, max_aqi, mean_aqi, min_aqi)
+                VALUES (1, :date, :aqi, :aqi / 2.0, :aqi / 4)
+            """), {"date": date(2026, 3, 1) + timedelta(days=day), "aqi": 20 + day})
+        for hour in range(100):
+            aqi = {37: 300, 71: 1}.get(hour, 50 + hour % 10)
+            for pollutant, value in (("PM2.5", aqi), ("OZONE", min(aqi, 40))):
+                conn.execute(text("""
+                    INSERT INTO observations (location_id, timestamp_utc, aqi, pollutant)
+                    VALUES (1, :ts, :aqi, :pollutant)
+                """), {"ts": START + timedelta(hours=hour), "aqi": value, "pollutant": pollutant})
+    return pg_engine
+
+
+def _pages(params):
+    pages, after = [], None
+    while True:
+        query = dict(params, **({"after": after} if after else {}))
+        body = client.get("/locations/1/history", params=query).json()
+        pages.append(body["points"])
+        after = body["next_cursor"]
+        if after is None:
+            return pages
+
+
+def test_daily_pages_have_no_gaps_or_duplicates(history):
+    pages = _pages({"resolution": "daily", "limit": 10})
+
+    assert [len(p) for p in pages] == [10, 10, 5]
+    days = [p["timestamp"][:10] for page in pages for p in page]
+    assert days == [str(date(2026, 3, 1) + timedelta(days=d)) for d in range(25)]
+    assert [p["aqi"] for page in pages for p in page] == list(range(20, 45))
+
+
+def test_hourly_pages_take_the_max_over_pollutants(history):
+    pages = _pages({"resolution": "hourly", "limit": 30})
+
+    points = [p for page in pages for p in page]
+    assert [len(p) for p in pages] == [30, 30, 30, 10]
+    assert len({p["timestamp"] for p in points}) == 100
+    assert points[37]["aqi"] == 300 and points[0]["aqi"] == 50
+
+
+def test_downsampled_buckets_keep_min_and_max(history):
+    body = client.get(
+        "/locations/1/history", params={"resolution": "hourly", "max_points": 10}
+    ).json()
+
+    assert body["downsampled"]
+    assert len(body["points"]) <= 10
+    timestamps = [p["timestamp"] for p in body["points"]]
+    assert timestamps == sorted(timestamps)
+
+    # 100 hourly points in 5 equal buckets: each keeps its lowest and highest.
+    def bucket(hour):
+        return min(hour * 5 // 99, 4)
+
+    hourly = {p["timestamp"]: p["aqi"] for page in _pages({"resolution": "hourly"}) for p in page}
+    full, kept = {}, {}
+    for hour, (ts, aqi) in enumerate(sorted(hourly.items())):
+        full.setdefault(bucket(hour), []).append(aqi)
+        if ts in timestamps:
+            kept.setdefault(bucket(hour), []).append(aqi)
+    assert {b: (min(v), max(v)) for b, v in kept.items()} == {b: (min(v), max(v)) for b, v in full.items()}
+    assert 300 in kept[bucket(37)] and 1 in kept[bucket(71)]
+
+
+def test_short_range_is_returned_whole(history):
+    body = client.get("/locations/1/history", params={
+        "resolution": "daily", "max_points": 50,
+        "start": "2026-03-05T00:00:00", "end": "2026-03-09T00:00:00",
+    }).json()
+    assert not body["downsampled"]
+    assert [p["aqi"] for p in body["points"]] == [24, 25, 26, 27, 28]
+
+
+def test_unknown_location_is_404(history):
+    assert client.get("/locations/99/history").status_code == 404
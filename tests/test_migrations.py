@@ -0,0 +1,47 @@
+from sqlalchemy import text
+
+from src.alerts import ensure_notification_tables
+from src.backfill_interpolate import ensure_backfill_schema
+from src.db.migrations import add_missing_columns
+from src.evaluate_forecasts import ensure_evaluation_schema
+from src.features.build_features import ensure_pollutant_columns
+from src.forecast_and_notify import ensure_forecast_columns
+
+
+def _locks(conn, table, mode):
+    return conn.execute(text("""
+        SELECT COUNT(*) FROM pg_locks
+        WHERE pid = pg_backend_pid() AND relation = to_regclass(:table) AND mode = :mode
+    """), {"table": table, "mode": mode}).scalar_one()
+
+
+def _exclusive_locks(conn, table):
+    return _locks(conn, table, "AccessExclusiveLock")
+
+
+def test_only_missing_columns_are_added(pg_engine):
+    with pg_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE scratch (a INTEGER)"))
+        assert add_missing_columns(conn, "scratch", {"a": "INTEGER", "b": "TEXT"}) == ["b"]
+        assert add_missing_columns(conn, "scratch", {"a": "INTEGER", "b": "TEXT"}) == []
+
+
+def test_up_to_date_schema_takes_no_exclusive_lock(pg_engine):
+    with pg_engine.begin() as conn:
+        ensure_backfill_schema(conn)
+        ensure_pollutant_columns(conn)
+        assert _exclusive_locks(conn, "daily_aggregates") == 0
+
+
+def test_up_to_date_forecast_columns_take_no_exclusive_lock(pg_engine):
+    with pg_engine.begin() as conn:
+        ensure_evaluation_schema(conn)
+        ensure_forecast_columns(conn)
+        assert _exclusive_locks(conn, "forecasts") == 0
+
+
+def test_existing_notification_tables_are_not_locked(pg_engine):
+    with pg_engine.begin() as conn:
+        ensure_notification_tables(conn)
+        # CREATE INDEX IF NOT EXISTS would take a SHARE lock on the outbox.
+        assert _locks(conn, "notification_outbox", "ShareLock") == 0
@@ -0,0 +1,38 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src.api import nearest
+from src.api.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def forecasts(pg_engine, pg_async_engine, monkeypatch):
+    monkeypatch.setattr(nearest, "location_index", nearest.LocationIndexCache())
+    with pg_engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO forecasts (location_id, target_date, forecast_aqi, model_name, created_at) VALUES
+                (1, '2026-08-28', 30, 'random_forest_v1', NOW() - INTERVAL '1 day'),
+                (1, '2026-08-29', 79, 'random_forest_v1', NOW()),
+                (1, '2026-08-29', 20, 'baseline_persistence', NOW() - INTERVAL '20 minutes'),
+                (2, '2026-08-29', 41, 'random_forest_v1', NOW() - INTERVAL '1 hour'),
+                (2, '2026-08-29', 44, 'baseline_persistence', NOW() - INTERVAL '1 hour')
+        """))
+    return pg_engine
+
+
+def test_nearest_returns_the_newest_forecast_per_location(forecasts):
+    response = client.get("/forecasts/nearest", params={"lat": 45.52, "lon": -122.68, "k": 2})
+    assert response.status_code == 200
+    body = response.json()
+
+    assert [r["location_id"] for r in body] == [1, 2]
+    assert (body[0]["target_date"], body[0]["model_name"], body[0]["forecast_aqi"]) == (
+        str(date(2026, 8, 29)), "random_forest_v1", 79,
+    )
+    # Written together: the model name decides, the same way every time.
+    assert (body[1]["model_name"], body[1]["forecast_aqi"]) == ("baseline_persistence", 44)
@@ -0,0 +1,100 @@
+import socketserver
+import threading
+from email import message_from_bytes
+
+import pytest
+
+from src.alerts import EVENT_ALERT, EVENT_ALL_CLEAR, SMTPSession
+from src.deliver_notifications import plan_messages
+
+
+class _StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, MAIL, RCPT, DATA, QUIT."""
+
+    def handle(self):
+        self.server.connections += 1
+        self.wfile.write(b"220 localhost stand-in\r\n")
+        in_data, lines = False, []
+        for line in self.rfile:
+            if in_data:
+                if line == b".\r\n":
+                    self.server.messages.append(message_from_bytes(b"".join(lines)))
+                    in_data, lines = False, []
+                    self.wfile.write(b"250 OK\r\n")
+                else:
+                    lines.append(line)
+                continue
+
+            command = line[:4].upper()
+            if command == b"DATA":
+                in_data = True
+                self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+            elif command == b"QUIT":
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 OK\r\n")
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _StandInSMTPHandler)
+    server.connections = 0
+    server.messages = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _event(outbox_id, location_id, event_type=EVENT_ALERT):
+    return {
+        "id": outbox_id,
+        "event_type": event_type,
+        "location_id": location_id,
+        "payload": {
+            "location_name": f"Loc {location_id}",
+            "forecast_aqi": 120,
+            "target_date": "2026-08-01",
+            "threshold": 100,
+        },
+    }
+
+
+def test_session_sends_many_messages_over_one_connection(smtp_server):
+    host, port = smtp_server.server_address
+    with SMTPSession(host=host, port=port, sender="aqi@example.com", password=None, starttls=False) as session:
+        for i in range(3):
+            session.send(f"user{i}@example.com", f"Subject {i}", "body")
+
+    assert smtp_server.connections == 1
+    assert [m["To"] for m in smtp_server.messages] == [
+        "user0@example.com", "user1@example.com", "user2@example.com",
+    ]
+
+
+def test_plan_messages_fans_out_and_digests_bursts():
+    events = [_event(1, 1), _event(2, 2), _event(3, 3), _event(4, 1, EVENT_ALL_CLEAR)]
+    recipients = {
+        1: ["a@example.com", "ops@example.com"],
+        2: ["ops@example.com"],
+        3: ["ops@example.com"],
+    }
+
+    messages = plan_messages(events, recipients, delivered=set(), digest_min_events=3)
+    by_recipient = {r: [e["id"] for e in batch] for r, batch in messages if len(batch) > 1}
+
+    # ops@ is subscribed to everything in the burst: one digest.
+    assert by_recipient == {"ops@example.com": [1, 2, 3, 4]}
+    # a@ has two events: below the digest threshold, so two messages.
+    assert sorted(e["id"] for r, batch in messages if r == "a@example.com" for e in batch) == [1, 4]
+
+
+def test_plan_messages_skips_recipients_already_delivered():
+    events = [_event(1, 1)]
+    recipients = {1: ["a@example.com", "b@example.com"]}
+
+    messages = plan_messages(events, recipients, delivered={(1, "a@example.com")})
+
+    assert [r for r, _ in messages] == ["b@example.com"]
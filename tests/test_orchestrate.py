@@ -0,0 +1,39 @@
+import pytest
+
+from src.orchestrate import STAGES, Orchestrator, Stage, execution_order, should_run
+
+
+def test_execution_order_respects_upstream():
+    order = execution_order(STAGES)
+    for stage in STAGES:
+        for parent in stage.upstream:
+            assert order.index(parent) < order.index(stage.name)
+    assert order[0] == "ingest"
+
+
+def test_train_and_evaluate_are_independent():
+    by_name = {s.name: s for s in STAGES}
+    assert by_name["train"].upstream == ("backfill",)
+    assert by_name["evaluate"].upstream == ("backfill",)
+
+
+def test_cycles_and_unknown_stages_are_rejected():
+    with pytest.raises(ValueError, match="cycle"):
+        execution_order([Stage("a", "m:f", upstream=("b",)), Stage("b", "m:f", upstream=("a",))])
+    with pytest.raises(ValueError, match="Unknown stage"):
+        Orchestrator([Stage("a", "m:f", upstream=("missing",))])
+
+
+def test_should_run_only_when_inputs_moved():
+    assert should_run("42", None)
+    assert should_run("43", "42")
+    assert not should_run("42", "42")
+    assert not should_run(None, None)  # nothing to process yet
+
+
+def test_failure_blocks_downstream_only():
+    orch = Orchestrator()
+    orch.status = {"ingest": "success", "aggregate": "success", "backfill": "success",
+                   "train": "failed"}
+    assert orch._blocked("forecast")
+    assert not orch._blocked("evaluate") and orch._ready("evaluate")
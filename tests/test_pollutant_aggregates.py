@@ -0,0 +1,76 @@
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.features.build_features import (
+    POLLUTANT_LAG_COLUMNS,
+    add_pollutant_lags,
+    pollutant_columns,
+    run_daily_aggregation,
+)
+from src.models.train_ml_model import FEATURE_COLUMNS, add_lag_features, feature_columns
+
+DAY = date(2026, 5, 1)
+
+
+def _observe(conn, location_id, hour, pollutant, aqi):
+    conn.execute(text("""
+        INSERT INTO observations (location_id, timestamp_utc, aqi, pollutant)
+        VALUES (:loc, CAST(:ts AS timestamptz), :aqi, :pollutant)
+    """), {"loc": location_id, "ts": f"{DAY} {hour:02d}:00+00", "aqi": aqi, "pollutant": pollutant})
+
+
+def test_per_pollutant_values_and_dominant_pollutant(pg_engine):
+    with pg_engine.begin() as conn:
+        _observe(conn, 1, 8, "PM2.5", 40)
+        _observe(conn, 1, 8, "OZONE", 55)
+        _observe(conn, 1, 12, "PM2.5", 80)
+        _observe(conn, 1, 12, "o3", 30)      # matched case-insensitively
+        _observe(conn, 2, 8, "PM2.5", 70)
+        _observe(conn, 2, 8, "OZONE", 70)    # tie: the first pollutant by name wins
+
+    assert run_daily_aggregation(pairs=[(1, DAY), (2, DAY)]) == {1, 2}
+
+    columns = ["max_aqi", "mean_aqi", "min_aqi"] + pollutant_columns() + ["dominant_pollutant"]
+    with pg_engine.connect() as conn:
+        rows = {
+            r.location_id: r._mapping
+            for r in conn.execute(text(f"SELECT location_id, {', '.join(columns)} FROM daily_aggregates"))
+        }
+
+    assert {c: rows[1][c] for c in columns} == {
+        "max_aqi": 80, "mean_aqi": 51.25, "min_aqi": 30,
+        "pm25_max_aqi": 80, "pm25_mean_aqi": 60.0, "pm25_min_aqi": 40,
+        "ozone_max_aqi": 55, "ozone_mean_aqi": 42.5, "ozone_min_aqi": 30,
+        "pm10_max_aqi": None, "pm10_mean_aqi": None, "pm10_min_aqi": None,
+        "dominant_pollutant": "PM2.5",
+    }
+    assert rows[2]["pm25_max_aqi"] == rows[2]["ozone_max_aqi"] == 70
+    assert rows[2]["dominant_pollutant"] == "OZONE"
+
+
+def test_pollutant_lags_shift_within_location_and_fill_missing():
+    df = pd.DataFrame({
+        "location_id": [1, 1, 1, 2, 2],
+        "date": pd.to_datetime(["2026-05-01", "2026-05-02", "2026-05-03", "2026-05-01", "2026-05-02"]),
+        "max_aqi": [50, 60, 70, 20, 30],
+        "pm25_max_aqi": [50, None, 70, 20, 30],
+        "ozone_max_aqi": [40, 60, None, None, None],
+        "pm10_max_aqi": [None] * 5,
+    })
+    out = add_pollutant_lags(df.copy())
+    assert out["pm25_lag1"].tolist() == [0.0, 50.0, 0.0, 0.0, 20.0]
+    assert out["ozone_lag1"].tolist() == [0.0, 40.0, 60.0, 0.0, 0.0]
+    assert out["pm10_lag1"].tolist() == [0.0] * 5
+
+
+def test_lag_features_only_include_pollutants_when_loaded():
+    df = pd.DataFrame({
+        "location_id": [1, 1],
+        "date": pd.to_datetime(["2026-05-01", "2026-05-02"]),
+        "max_aqi": [50, 60],
+    })
+    assert not set(POLLUTANT_LAG_COLUMNS) & set(add_lag_features(df).columns)
+    assert feature_columns() == FEATURE_COLUMNS
+    assert feature_columns(pollutant_lags=True) == FEATURE_COLUMNS + POLLUTANT_LAG_COLUMNS
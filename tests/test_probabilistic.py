@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from src.models.probabilistic import forecast_distribution, per_tree_predictions
+
+
+def _forest():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 150, size=(300, 5)), columns=list("abcde"))
+    y = X.mean(axis=1) + rng.normal(0, 10, len(X))
+    return RandomForestRegressor(n_estimators=25, random_state=0).fit(X, y), X
+
+
+def test_per_tree_matrix_matches_individual_trees():
+    forest, X = _forest()
+    matrix = per_tree_predictions(forest, X.iloc[:20])
+
+    assert matrix.shape == (25, 20)
+    expected = forest.estimators_[3].predict(X.iloc[:20].to_numpy())
+    np.testing.assert_allclose(matrix[3], expected)
+
+
+def test_distribution_mean_is_point_forecast_and_probabilities_are_bounded():
+    forest, X = _forest()
+    dist = forecast_distribution(forest, X.iloc[:50], threshold=100)
+
+    np.testing.assert_allclose(dist["forecast"], forest.predict(X.iloc[:50]))
+    assert dist["exceedance_prob"].between(0, 1).all()
+    assert (dist["forecast_q10"] <= dist["forecast_q50"]).all()
+    assert (dist["forecast_q50"] <= dist["forecast_q90"]).all()
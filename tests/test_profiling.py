@@ -0,0 +1,44 @@
+import json
+
+from sqlalchemy import create_engine, text
+
+from src import profiling
+from src.profiling import install_slow_query_log, parameter_shape, profiled
+
+
+def test_parameter_shape_hides_values():
+    assert parameter_shape({"ids": [1, 2, 3], "since": "2026-01-01", "n": 5}) == {
+        "ids": "list[3]", "since": "str", "n": "int",
+    }
+    assert parameter_shape([{"a": 1}, {"a": 2}]) == {"sets": 2, "first": {"a": "int"}}
+
+
+def test_profiled_writes_stats_and_summary(tmp_path):
+    with profiled("aggregate-abc/1", output_dir=tmp_path) as path:
+        sum(range(1000))
+    assert path.parent == tmp_path
+    assert path.name.startswith("aggregate-abc_1-")
+    assert path.exists() and path.with_suffix(".txt").exists()
+
+
+def test_nested_profile_is_skipped(tmp_path):
+    with profiled("outer", output_dir=tmp_path) as outer:
+        with profiled("inner", output_dir=tmp_path) as inner:
+            pass
+    assert outer is not None and inner is None
+    assert len(list(tmp_path.glob("*.prof"))) == 1
+
+
+def test_slow_query_log_records_statements_over_threshold(tmp_path, monkeypatch):
+    log_path = tmp_path / "slow.jsonl"
+    monkeypatch.setattr(profiling, "SLOW_QUERY_LOG_PATH", log_path)
+    engine = create_engine("sqlite://")
+    install_slow_query_log(engine, threshold_ms=0)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT   :x  +  1"), {"x": 41})
+
+    entry = json.loads(log_path.read_text().splitlines()[-1])
+    assert entry["statement"] == "SELECT ? + 1"
+    assert entry["stage"] is None
+    assert entry["duration_ms"] >= 0
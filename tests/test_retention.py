@@ -0,0 +1,129 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import text
+
+from src import retention
+from src.retention import archive_month, merge_tiers, month_bounds, months_between, read_observations
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_month_bounds_handle_year_end():
+    assert month_bounds(_utc(2025, 12, 17, 5)) == (_utc(2025, 12, 1), _utc(2026, 1, 1))
+    assert month_bounds(_utc(2026, 2, 1)) == (_utc(2026, 2, 1), _utc(2026, 3, 1))
+
+
+def test_months_between_lists_overlapping_partitions_only():
+    assert months_between(_utc(2025, 11, 20), _utc(2026, 2, 1)) == [
+        "month=2025-11", "month=2025-12", "month=2026-01",
+    ]
+    assert months_between(_utc(2026, 3, 5), _utc(2026, 3, 6)) == ["month=2026-03"]
+
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=["id", "location_id", "timestamp_utc", "aqi", "category", "pollutant", "raw_json"])
+
+
+def test_merge_tiers_prefers_hot_rows_and_sorts():
+    hot = _frame([(10, 1, "2026-05-02T00:00:00Z", 55, "Moderate", "PM2.5", "{}")])
+    archived = _frame([
+        (3, 1, "2026-05-02T00:00:00Z", 40, "Good", "PM2.5", "{}"),  # left behind by a crash
+        (2, 1, "2026-05-01T00:00:00Z", 30, "Good", "PM2.5", "{}"),
+        (1, 2, "2026-05-01T00:00:00Z", 20, "Good", "OZONE", "{}"),
+    ])
+    merged = merge_tiers(hot, archived)
+    assert list(merged.columns) == ["location_id", "timestamp_utc", "aqi", "category", "pollutant", "raw_json"]
+    assert merged[["location_id", "aqi"]].values.tolist() == [[1, 30], [1, 55], [2, 20]]
+
+
+def test_merge_tiers_with_no_rows_keeps_columns():
+    merged = merge_tiers(_frame([]), _frame([]))
+    assert merged.empty
+    assert "id" not in merged.columns
+
+
+CUTOFF = _utc(2026, 5, 15)
+
+
+def _observe(engine, *rows):
+    with engine.begin() as conn:
+        for location_id, ts, aqi in rows:
+            conn.execute(text("""
+                INSERT INTO observations (location_id, timestamp_utc, aqi, category, pollutant, raw_json)
+                VALUES (:loc, :ts, :aqi, 'Good', 'PM2.5', '{}')
+            """), {"loc": location_id, "ts": ts, "aqi": aqi})
+
+
+def _hot_aqi(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT aqi FROM observations ORDER BY id")).scalars().all()
+
+
+@pytest.fixture
+def april(pg_engine):
+    _observe(
+        pg_engine,
+        (1, _utc(2026, 4, 1, 0), 10),
+        (2, _utc(2026, 4, 30, 23), 20),
+        (1, _utc(2026, 5, 1, 0), 30),     # next month: stays
+    )
+    return pg_engine
+
+
+def test_archive_month_moves_rows_to_parquet(april, tmp_path):
+    assert archive_month(_utc(2026, 4, 1), CUTOFF, tmp_path) == 2
+
+    (part,) = (tmp_path / "month=2026-04").iterdir()
+    assert part.name.startswith("part-") and part.suffix == ".parquet"
+    assert sorted(pq.read_table(part).column("aqi").to_pylist()) == [10, 20]
+    assert _hot_aqi(april) == [30]
+
+    both = read_observations(_utc(2026, 4, 1), _utc(2026, 6, 1), archive_path=tmp_path)
+    assert both["aqi"].tolist() == [10, 30, 20]
+
+
+def test_short_write_rolls_back_and_removes_file(april, tmp_path, monkeypatch):
+    def short(conn, params):
+        batches = list(real_batches(conn, params))
+        yield batches[0].slice(0, batches[0].num_rows - 1)
+
+    real_batches = retention._batches
+    monkeypatch.setattr(retention, "_batches", short)
+
+    with pytest.raises(RuntimeError, match="row count mismatch"):
+        archive_month(_utc(2026, 4, 1), CUTOFF, tmp_path)
+
+    assert list((tmp_path / "month=2026-04").iterdir()) == []
+    assert _hot_aqi(april) == [10, 20, 30]
+
+
+def test_delete_count_mismatch_rolls_back_and_removes_file(april, tmp_path):
+    # A trigger that keeps one row makes the DELETE come up short.
+    with april.begin() as conn:
+        conn.execute(text("""
+            CREATE FUNCTION keep_aqi_20() RETURNS trigger AS $$
+            BEGIN
+                IF OLD.aqi = 20 THEN RETURN NULL; END IF;
+                RETURN OLD;
+            END $$ LANGUAGE plpgsql
+        """))
+        conn.execute(text("""
+            CREATE TRIGGER keep_aqi_20 BEFORE DELETE ON observations
+            FOR EACH ROW EXECUTE FUNCTION keep_aqi_20()
+        """))
+
+    with pytest.raises(RuntimeError, match="deleted 1 row"):
+        archive_month(_utc(2026, 4, 1), CUTOFF, tmp_path)
+
+    assert list((tmp_path / "month=2026-04").iterdir()) == []
+    assert _hot_aqi(april) == [10, 20, 30]
+
+
+def test_archive_month_with_nothing_to_move(april, tmp_path):
+    assert archive_month(_utc(2026, 3, 1), CUTOFF, tmp_path) == 0
+    assert _hot_aqi(april) == [10, 20, 30]
@@ -0,0 +1,50 @@
+from src.orchestrate import pipeline_lock
+from src.shard_worker import ShardLocks, fair_share, plan_rebalance, shard_of
+
+
+def test_fair_share_covers_every_shard():
+    for shards in (1, 5, 8, 16):
+        for workers in range(1, 20):
+            assert fair_share(shards, workers) * workers >= shards
+    assert fair_share(8, 3) == 3
+    assert fair_share(8, 0) == 8  # counting query raced with our own connection
+
+
+def test_rebalance_releases_excess_highest_first():
+    release, claim = plan_rebalance({0, 1, 2, 3, 4}, target=3, num_shards=8)
+    assert release == [3, 4]
+    assert claim == []
+
+
+def test_rebalance_probes_free_shards_from_worker_offset():
+    release, claim = plan_rebalance({5}, target=3, num_shards=8, start=5)
+    assert release == []
+    assert claim == [6, 7, 0, 1, 2, 3, 4]
+
+
+def test_shard_of_is_stable_modulo():
+    assert [shard_of(i, 4) for i in range(1, 9)] == [1, 2, 3, 0, 1, 2, 3, 0]
+
+
+def test_shard_locks_claim_release_and_takeover(pg_engine):
+    with ShardLocks(num_shards=4) as first:
+        assert first.rebalance() == {0, 1, 2, 3}
+
+        with ShardLocks(num_shards=4) as second:
+            assert second.rebalance() == set()          # everything is taken
+            assert first.rebalance() == {0, 1}          # first sheds down to its share
+            assert second.rebalance() == {2, 3}
+
+        # second's connection is gone, so its locks are too
+        assert first.rebalance() == {0, 1, 2, 3}
+
+
+def test_shard_cycles_share_the_pipeline_lock(pg_engine):
+    with pipeline_lock(shared=True) as worker_a, pipeline_lock(shared=True) as worker_b:
+        assert worker_a and worker_b
+        with pipeline_lock() as cron:
+            assert not cron
+    with pipeline_lock() as cron:
+        assert cron
+        with pipeline_lock(shared=True) as worker:
+            assert not worker
@@ -0,0 +1,33 @@
+import numpy as np
+
+from src.spatial import LocationIndex
+
+# Portland, Salem, Seattle, plus points on either side of the antimeridian
+IDS = [1, 2, 3, 4, 5]
+LATS = [45.5152, 44.9429, 47.6062, 10.0, 10.0]
+LONS = [-122.6784, -123.0351, -122.3321, 179.9, -179.9]
+
+
+def test_nearest_orders_by_great_circle_distance():
+    index = LocationIndex(IDS, LATS, LONS)
+    ids, km = index.nearest(45.5, -122.6, k=3)
+
+    assert ids.tolist() == [1, 2, 3]
+    assert np.all(np.diff(km) > 0)
+    assert 230 < km[2] < 240  # Portland -> Seattle is ~234 km
+
+
+def test_nearest_across_antimeridian():
+    index = LocationIndex(IDS, LATS, LONS)
+    ids, km = index.nearest(10.0, 179.95, k=2)
+
+    assert set(ids.tolist()) == {4, 5}
+    assert km.max() < 20
+
+
+def test_k_larger_than_index_and_empty_index():
+    ids, _ = LocationIndex(IDS[:2], LATS[:2], LONS[:2]).nearest(45.0, -123.0, k=10)
+    assert len(ids) == 2
+
+    ids, km = LocationIndex([], [], []).nearest(45.0, -123.0, k=3)
+    assert len(ids) == 0 and len(km) == 0
@@ -0,0 +1,84 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from src import telemetry
+
+
+@pytest.fixture
+def captured(monkeypatch, tmp_path):
+    persisted = []
+    monkeypatch.setattr(telemetry, "_persist", persisted.append)
+    monkeypatch.setattr(telemetry, "EVENTS_LOG_PATH", tmp_path / "events.jsonl")
+    monkeypatch.setenv(telemetry.RUN_ID_ENV, "run-1")
+    return persisted, tmp_path / "events.jsonl"
+
+
+def test_tracked_stage_records_counters(captured):
+    persisted, log_path = captured
+
+    @telemetry.tracked_stage("ingest")
+    def stage():
+        telemetry.record(api_calls=2, retries=1)
+        telemetry.record(rows_read=10, rows_written=7)
+        return "done"
+
+    assert stage() == "done"
+    telemetry.record(rows_read=99)  # outside a stage: ignored
+
+    (metrics,) = persisted
+    assert (metrics.stage, metrics.run_id, metrics.status) == ("ingest", "run-1", "success")
+    assert (metrics.rows_read, metrics.rows_written, metrics.api_calls, metrics.retries) == (10, 7, 2, 1)
+    assert metrics.duration_s >= 0
+
+    event = json.loads(log_path.read_text().splitlines()[-1])
+    assert event["stage"] == "ingest"
+    assert event["rows_written"] == 7
+
+
+def test_failed_stage_is_recorded_and_reraised(captured):
+    persisted, _ = captured
+
+    with pytest.raises(RuntimeError):
+        with telemetry.track_stage("forecast"):
+            raise RuntimeError("boom")
+
+    assert persisted[0].status == "failed"
+    assert persisted[0].error == "RuntimeError: boom"
+
+
+def test_format_prometheus():
+    finished = datetime(2026, 8, 1, tzinfo=timezone.utc)
+    latest = [{
+        "stage": "ingest", "finished_at": finished, "duration_s": 1.5, "rows_read": 10,
+        "rows_written": 7, "api_calls": 3, "retries": 0, "peak_memory_mb": None,
+        "status": "success",
+    }]
+    body = telemetry.format_prometheus(
+        latest,
+        [{"stage": "ingest", "finished_at": finished}],
+        [{"stage": "ingest", "status": "success", "n": 4}],
+    )
+
+    lines = body.splitlines()
+    assert 'aqi_stage_last_duration_seconds{stage="ingest"} 1.5' in lines
+    assert 'aqi_stage_last_success{stage="ingest"} 1' in lines
+    assert 'aqi_stage_runs_total{stage="ingest",status="success"} 4' in lines
+    assert f'aqi_stage_last_success_timestamp_seconds{{stage="ingest"}} {finished.timestamp():.3f}' in lines
+    assert not any(line.startswith("aqi_stage_last_peak_memory_megabytes{") for line in lines)
+
+
+@pytest.mark.skipif(not telemetry._reset_peak_rss(), reason="needs a resettable peak RSS (Linux)")
+def test_peak_memory_is_per_stage(captured):
+    persisted, _ = captured
+
+    with telemetry.track_stage("train"):
+        block = bytearray(200 * 1024 * 1024)
+        block[::4096] = b"x" * len(block[::4096])  # touch every page
+        del block
+    with telemetry.track_stage("deliver"):
+        pass
+
+    heavy, light = persisted
+    assert heavy.peak_memory_mb - light.peak_memory_mb > 150